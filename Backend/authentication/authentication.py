@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from .models import APIKey
@@ -40,9 +44,11 @@ class APIKeyAuthentication(TokenAuthentication):
         if not token.is_active:
             raise AuthenticationFailed('API key is inactive.')
 
-        # Update last_used timestamp
-        from django.utils import timezone
-        token.last_used = timezone.now()
-        token.save(update_fields=['last_used'])
+        # Update last_used at most once per API_KEY_LAST_USED_SECONDS, so
+        # authenticating is a single SELECT for a busy key
+        now = timezone.now()
+        if token.last_used is None or now - token.last_used >= timedelta(seconds=settings.API_KEY_LAST_USED_SECONDS):
+            model.objects.filter(pk=token.pk).update(last_used=now)
+            token.last_used = now
 
         return (token.user, token)
@@ -0,0 +1,126 @@
+"""
+Tests for the authentication app
+"""
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from camera.models import Room
+from .models import APIKey
+from .throttling import parse_rate
+
+
+class TokenBucketThrottleTests(TestCase):
+    """Test the per API key and per endpoint token buckets"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(
+            THROTTLE_STORE='shm',
+            THROTTLE_SHM_PATH=str(Path(tmp.name) / 'throttle'),
+            REST_FRAMEWORK=self.rest_framework(api_key='5/min', endpoint='3/min'),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.key = APIKey.objects.create(user=User.objects.create_user('integration'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'ApiKey {self.key.key}')
+
+    @staticmethod
+    def rest_framework(**rates):
+        from django.conf import settings
+        return dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)
+
+    def test_endpoint_bucket(self):
+        """Test a key is limited per endpoint and told when to retry"""
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/v1/camera-counts/').status_code, 200)
+        response = self.client.get('/api/v1/camera-counts/')
+        self.assertEqual(response.status_code, 429)
+        # 3/min refills one token every 20 seconds
+        self.assertEqual(response['Retry-After'], '20')
+        # Other endpoints still have their own bucket
+        self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 200)
+
+    def test_api_key_bucket(self):
+        """Test the per key bucket spans every endpoint"""
+        statuses = [self.client.get(url).status_code for url in ('/api/v1/rooms/', '/api/v1/cameras/') * 3]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+    def test_requests_without_key_are_limited_per_ip(self):
+        """Test requests without an API key share one bucket per client IP"""
+        with override_settings(REST_FRAMEWORK=self.rest_framework(api_key='5/min', endpoint='3/min', anon='2/min')):
+            client = APIClient()
+            statuses = [client.get(url).status_code for url in ('/api/v1/rooms/', '/api/v1/cameras/', '/api/v1/rooms/')]
+            self.assertEqual(statuses, [200, 200, 429])
+            self.assertEqual(client.get('/api/v1/rooms/', REMOTE_ADDR='10.0.0.9').status_code, 200)
+            # API key clients have their own buckets
+            self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 200)
+
+    async def test_async_views_share_the_buckets(self):
+        """Test the /api/v1/async/ views are throttled with their DRF endpoint"""
+        room = await Room.objects.acreate(name='Throttled', camera_ip='10.0.0.1')
+        client, headers = AsyncClient(), {'Authorization': f'ApiKey {self.key.key}'}
+        statuses = [
+            (await client.get(url, headers=headers)).status_code
+            for url in [f'/api/v1/async/rooms/{room.id}/counts/'] * 2 + [f'/api/v1/rooms/{room.id}/counts/']
+        ]
+        response = await client.get(f'/api/v1/async/rooms/{room.id}/counts/', headers=headers)
+        self.assertEqual(statuses + [response.status_code], [200, 200, 200, 429])
+        self.assertEqual(response['Retry-After'], '20')
+
+    def test_cache_store(self):
+        """Test the Django cache store enforces the same limits"""
+        with override_settings(THROTTLE_STORE='cache', CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }):
+            statuses = [self.client.get('/api/v1/cameras/').status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_refill(self):
+        """Test the bucket refills at the configured rate"""
+        self.assertEqual(parse_rate('600/min'), (0.1, 0.1 * 599))
+        with mock.patch('authentication.throttling.time.time', return_value=1000.0) as clock:
+            statuses = [self.client.get('/api/v1/rooms/').status_code for _ in range(4)]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+            clock.return_value = 1019.0
+            self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 429)
+            clock.return_value = 1020.0
+            self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 200)
+
+
+class APIKeyAuthenticationTests(TestCase):
+    """Test API key authentication"""
+
+    def setUp(self):
+        self.key = APIKey.objects.create(user=User.objects.create_user('integration'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'ApiKey {self.key.key}')
+
+    def last_used_writes(self, requests):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 200)
+        return [query for query in queries if query['sql'].startswith('UPDATE "authentication_apikey"')]
+
+    def test_last_used_is_written_once_per_interval(self):
+        """Test a busy key does not write last_used on every request"""
+        self.assertEqual(len(self.last_used_writes(3)), 1)
+        self.key.refresh_from_db()
+        self.assertIsNotNone(self.key.last_used)
+
+        with override_settings(API_KEY_LAST_USED_SECONDS=0):
+            self.assertEqual(len(self.last_used_writes(2)), 2)
+
+    def test_invalid_key(self):
+        """Test an unknown key is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='ApiKey not-a-key')
+        self.assertEqual(self.client.get('/api/v1/rooms/').status_code, 401)
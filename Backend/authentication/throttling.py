@@ -0,0 +1,187 @@
+"""
+Token-bucket rate limiting per API key, per endpoint and per client IP
+Requests authenticated with an API key (APIKeyAuthentication) are limited by
+two buckets: one per key across the whole API (scope 'api_key') and one per
+key and endpoint (scope 'endpoint'). Requests without an API key (the
+dashboard) share one bucket per client IP (scope 'anon'). Rates come from
+DEFAULT_THROTTLE_RATES in DRF's "<requests>/<period>" form; a rate of
+600/min lets a client burst 600 requests and then refills at 10 per second.
+
+Each bucket is a single number, its theoretical arrival time (GCRA, the
+token bucket written as one timestamp), so a check is one read and one write:
+
+  shm    an mmap'ed table in THROTTLE_SHM_PATH shared by every process on
+         the host, each slot guarded by a byte-range lock (default)
+  cache  the Django cache (THROTTLE_CACHE_ALIAS), shared across hosts;
+         concurrent requests of one key may race and over-admit slightly
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .models import APIKey
+
+try:
+    import fcntl
+except ImportError:  # Windows: no byte-range locks, use the cache store
+    fcntl = None
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate: str):
+    """'600/min' -> (interval between tokens in seconds, burst tolerance in seconds)"""
+    num, period = rate.split('/')
+    num = int(num)
+    if num <= 0:
+        raise ValueError(f'Invalid throttle rate "{rate}"')
+    interval = PERIODS[period[0]] / num
+    return interval, interval * (num - 1)
+
+
+def bucket_id(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+class SharedMemoryStore:
+    """
+    Direct-mapped table of (bucket id, arrival time) slots in a shared mmap
+    A key that lands on a slot held by another key takes it over and starts
+    with a full bucket, which only ever errs on the side of admitting.
+    """
+    SLOT = struct.Struct('<Qd')
+
+    def __init__(self, path: str, slots: int):
+        self.slots = slots
+        size = slots * self.SLOT.size
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # Byte-range locks exclude other processes only; threads share this one
+        self._lock = threading.Lock()
+
+    def update(self, key: str, step: Callable[[Optional[float]], Optional[float]]):
+        ident = bucket_id(key)
+        offset = (ident % self.slots) * self.SLOT.size
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                stored, value = self.SLOT.unpack_from(self._map, offset)
+                new = step(value if stored == ident else None)
+                if new is not None:
+                    self.SLOT.pack_into(self._map, offset, ident, new)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+
+
+class CacheStore:
+    """Buckets in the Django cache (read, then write; not atomic)"""
+
+    def __init__(self, alias: str):
+        self.cache = caches[alias]
+
+    def update(self, key: str, step: Callable[[Optional[float]], Optional[float]]):
+        cache_key = f'throttle:{bucket_id(key):x}'
+        new = step(self.cache.get(cache_key))
+        if new is not None:
+            # Kept a little past the moment the bucket is full again
+            self.cache.set(cache_key, new, timeout=max(1, int(new - time.time()) + 1))
+
+
+_stores = {}
+
+
+def get_store():
+    """The configured store, one per process (and per settings, for tests)"""
+    if settings.THROTTLE_STORE == 'shm' and fcntl is not None:
+        config = ('shm', settings.THROTTLE_SHM_PATH, settings.THROTTLE_SHM_SLOTS)
+    else:
+        config = ('cache', settings.THROTTLE_CACHE_ALIAS)
+    if config not in _stores:
+        _stores[config] = SharedMemoryStore(*config[1:]) if config[0] == 'shm' else CacheStore(*config[1:])
+    return _stores[config]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class: subclasses set scope and get_bucket_key()
+    wait() gives DRF the Retry-After of a rejected request
+    """
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_bucket_key(self, request, view) -> Optional[str]:
+        """Bucket of this request, or None to not throttle it"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        key = self.get_bucket_key(request, view) if rate else None
+        if key is None:
+            return True
+        interval, tolerance = parse_rate(rate)
+        now = time.time()
+        allowed = True
+
+        def step(arrival):
+            nonlocal allowed
+            arrival = max(arrival or now, now)
+            if arrival - now > tolerance:
+                allowed = False
+                self.retry_after = arrival - tolerance - now
+                return None
+            return arrival + interval
+
+        get_store().update(f'{self.scope}:{key}', step)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+def api_key(request) -> Optional[str]:
+    return request.auth.key if isinstance(request.auth, APIKey) else None
+
+
+class APIKeyRateThrottle(TokenBucketThrottle):
+    """One bucket per API key for the whole API"""
+    scope = 'api_key'
+
+    def get_bucket_key(self, request, view):
+        return api_key(request)
+
+
+class EndpointRateThrottle(TokenBucketThrottle):
+    """One bucket per API key and endpoint (view and action)"""
+    scope = 'endpoint'
+
+    def get_bucket_key(self, request, view):
+        key = api_key(request)
+        if key is None:
+            return None
+        return f"{key}:{view.__class__.__name__}.{getattr(view, 'action', None) or request.method}"
+
+
+class AnonymousRateThrottle(TokenBucketThrottle):
+    """One bucket per client IP for requests without an API key"""
+    scope = 'anon'
+
+    def get_bucket_key(self, request, view):
+        if api_key(request) is not None:
+            return None
+        return self.get_ident(request)
@@ -0,0 +1,138 @@
+"""
+Concurrent live stream capacity: gunicorn sync workers vs ASGI
+Usage: python benchmarks/bench_asgi_connections.py [--connections 200] [--workers 4]
+
+Seeds a SQLite database, then for each server opens --connections Server-Sent
+Events streams at once and counts how many are accepted within --timeout
+seconds. While those streams are held open it times plain count history
+requests, which show whether the server still has capacity left.
+
+  gunicorn sync    gunicorn config.wsgi:application, --workers sync workers,
+                   DRF live endpoint (/api/v1/rooms/{id}/live/)
+  uvicorn (ASGI)   uvicorn config.asgi:application, one process,
+                   async live endpoint (/api/v1/async/rooms/{id}/live/)
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def variants(port, workers):
+    return {
+        'gunicorn sync': {
+            'command': ['gunicorn', 'config.wsgi:application', '--workers', str(workers),
+                        '--bind', f'127.0.0.1:{port}', '--timeout', '300', '--log-level', 'warning'],
+            'live': '/api/v1/rooms/1/live/',
+            'counts': '/api/v1/rooms/1/counts/',
+        },
+        'uvicorn (ASGI)': {
+            'command': ['uvicorn', 'config.asgi:application', '--port', str(port), '--log-level', 'warning'],
+            'live': '/api/v1/async/rooms/1/live/',
+            'counts': '/api/v1/async/rooms/1/counts/',
+        },
+    }
+
+
+async def open_stream(port, path, timeout):
+    """Open one SSE stream; returns the open writer, or None if not accepted in time"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n'.encode())
+        await writer.drain()
+        data = b''
+        while b'retry:' not in data:
+            chunk = await asyncio.wait_for(reader.read(1024), timeout)
+            if not chunk:
+                return None
+            data += chunk
+        return writer
+    except (asyncio.TimeoutError, OSError):
+        return None
+
+
+async def timed_get(port, path, timeout):
+    """Milliseconds for one GET, or None if it did not complete in time"""
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+        await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+    except (asyncio.TimeoutError, OSError):
+        return None
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(port, variant, connections, timeout):
+    streams = await asyncio.gather(*(open_stream(port, variant['live'], timeout) for _ in range(connections)))
+    accepted = [writer for writer in streams if writer is not None]
+    latencies = [await timed_get(port, variant['counts'], timeout) for _ in range(10)]
+    for writer in accepted:
+        writer.close()
+    served = [ms for ms in latencies if ms is not None]
+    return len(accepted), served, len(latencies)
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DEBUG='False',
+            CACHE_URL='locmemcache://', LIVE_STREAM_MAX_SECONDS='120',
+        )
+        manage = [sys.executable, 'manage.py']
+        subprocess.run([*manage, 'migrate', '--verbosity', '0'], env=env, cwd=BACKEND_DIR, check=True)
+        subprocess.run([*manage, 'shell', '-c', (
+            "from camera.models import Room, CameraCount\n"
+            "room = Room.objects.create(name='Bench Room', camera_ip='10.0.0.1')\n"
+            "for i in range(100): CameraCount.objects.create(room=room, people_count=i)"
+        )], env=env, cwd=BACKEND_DIR, check=True)
+
+        print(f'{args.connections} concurrent live streams, {args.timeout:.0f}s timeout')
+        port = free_port()
+        for name, variant in variants(port, args.workers).items():
+            server = subprocess.Popen(variant['command'], env=env, cwd=BACKEND_DIR)
+            try:
+                wait_for_port(port)
+                accepted, served, attempted = asyncio.run(measure(port, variant, args.connections, args.timeout))
+            finally:
+                server.terminate()
+                server.wait()
+            latency = f'{statistics.median(served):7.1f} ms median' if served else '  timed out'
+            print(f'  {name:<16} {accepted:5d} streams accepted   counts GET while open: '
+                  f'{len(served)}/{attempted} served, {latency}')
+
+
+if __name__ == '__main__':
+    main()
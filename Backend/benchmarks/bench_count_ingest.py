@@ -0,0 +1,90 @@
+"""
+Count ingest rate: bulk endpoint vs one save() per count
+Usage: python benchmarks/bench_count_ingest.py [--records 5000] [--batch 1000] [--rooms 10]
+
+Migrates a fresh SQLite database and, in process, posts --records counts to
+POST /api/v1/camera-counts/bulk/ in requests of --batch records, then posts
+the same requests again (a full retry, every record a duplicate). For
+comparison the same number of counts is written with CameraCount.save(),
+the path the camera workers use. Rates are records per second.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def records(rooms, count, start):
+    return [
+        {
+            'room': rooms[index % len(rooms)],
+            'bucket_start': (start + timedelta(seconds=index)).isoformat(),
+            'people_count': index % 40,
+            'frames_processed': 30,
+            'inference_time_ms': 35.0,
+        }
+        for index in range(count)
+    ]
+
+
+def post_all(client, payload, batch):
+    started = time.perf_counter()
+    created = 0
+    for offset in range(0, len(payload), batch):
+        response = client.post('/api/v1/camera-counts/bulk/', payload[offset:offset + batch], format='json')
+        assert response.status_code in (200, 201), response.content
+        created += response.data['created']
+    return created, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DEBUG='False', CACHE_URL='locmemcache://',
+            DJANGO_SETTINGS_MODULE='config.settings', COUNT_INGEST_MAX_RECORDS=str(max(args.batch, 10000)),
+        )
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BACKEND_DIR, check=True)
+        sys.path.insert(0, str(BACKEND_DIR))
+        import django
+        django.setup()
+        import logging
+        logging.disable(logging.INFO)
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+        from camera.models import CameraCount, Room
+
+        rooms = [Room.objects.create(name=f'Bench {i}', camera_ip=f'10.0.0.{i}').id for i in range(args.rooms)]
+        start = timezone.now() - timedelta(days=2)
+        payload = records(rooms, args.records, start)
+        client = APIClient()
+
+        print(f'{args.records} counts over {args.rooms} rooms, {args.batch} per bulk request')
+        created, elapsed = post_all(client, payload, args.batch)
+        print(f'  bulk insert       {created:6d} created  {args.records / elapsed:9.0f} records/s')
+        created, elapsed = post_all(client, payload, args.batch)
+        print(f'  bulk retry        {created:6d} created  {args.records / elapsed:9.0f} records/s')
+
+        started = time.perf_counter()
+        for index in range(args.records):
+            CameraCount.objects.create(
+                room_id=rooms[index % len(rooms)], timestamp=start + timedelta(days=1, seconds=index),
+                people_count=index % 40, frames_processed=30, inference_time_ms=35.0,
+            )
+        elapsed = time.perf_counter() - started
+        print(f'  save() per count  {args.records:6d} created  {args.records / elapsed:9.0f} records/s')
+
+
+if __name__ == '__main__':
+    main()
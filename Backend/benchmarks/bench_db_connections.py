@@ -0,0 +1,98 @@
+"""
+Request throughput with and without persistent database connections
+Usage: python benchmarks/bench_db_connections.py [--requests 2000] [--rooms 100]
+
+Serves the API from a single-threaded WSGI server against a seeded SQLite
+database twice: once as before (DB_CONN_MAX_AGE=0, SQLITE_CONCURRENCY_MODE
+off, so every request reconnects) and once with the current defaults.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+VARIANTS = {
+    'reconnect per request': {'DB_CONN_MAX_AGE': '0', 'SQLITE_CONCURRENCY_MODE': 'False'},
+    'persistent + WAL': {'DB_CONN_MAX_AGE': '60', 'SQLITE_CONCURRENCY_MODE': 'True'},
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def run_variant(requests, rooms, path):
+    """Child process: seed a database, serve it and time `requests` GETs"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.core.wsgi import get_wsgi_application
+    from camera.models import CameraCount, Room
+
+    call_command('migrate', verbosity=0)
+    for i in range(rooms):
+        room = Room.objects.create(name=f'Room {i}', camera_ip=f'10.0.0.{i}')
+        CameraCount.objects.create(room=room, people_count=i)
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    def get():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        assert response.status == 200, response.status
+
+    for _ in range(20):
+        get()
+    started = time.perf_counter()
+    for _ in range(requests):
+        get()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    print(json.dumps({'rps': requests / elapsed, 'ms': elapsed / requests * 1000}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--path', default='/api/v1/rooms/1/')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_variant(args.requests, args.rooms, args.path)
+        return
+
+    print(f'{args.requests} x GET {args.path}')
+    for name, overrides in VARIANTS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DEBUG='False', **overrides)
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--requests', str(args.requests),
+                 '--rooms', str(args.rooms), '--path', args.path],
+                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'  {name:<24} {result["rps"]:8.0f} req/s  {result["ms"]:6.2f} ms/req')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Free-classroom query: busy intervals with bisect vs a scan of every session
+Usage: python benchmarks/bench_free_classrooms.py [--sessions 10000] [--queries 2000]
+
+Builds the per-classroom busy intervals of the synthetic timetable of
+bench_load_timetable.py (50 classrooms) and times random day/start/end
+queries against a loop over all sessions that answers the same question.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_load_timetable import synthetic_timetable  # noqa: E402
+
+
+def scan(sessions, day, start, end):
+    from timetable.times import day_of_week, parse_interval
+    classrooms, busy = set(), set()
+    for session in sessions:
+        classroom = session.data['Classroom']
+        classrooms.add(classroom)
+        session_start, session_end = parse_interval(session.data['Time'])
+        if day_of_week(session.day) == day and session_start < end and session_end > start:
+            busy.add(classroom)
+    return sorted(classrooms - busy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, str(BACKEND_DIR))
+    import django
+    django.setup()
+    from timetable.store import TimetableSnapshot
+
+    snapshot = TimetableSnapshot.build(synthetic_timetable(args.sessions))
+    started = time.perf_counter()
+    availability = snapshot.classroom_availability[snapshot.latest_term]
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(0)
+    queries = []
+    for _ in range(args.queries):
+        start = rng.randrange(7 * 60, 18 * 60)
+        queries.append((rng.randrange(5), start, start + rng.choice([30, 60, 120])))
+
+    started = time.perf_counter()
+    indexed = [[slot.classroom for slot in availability.query(*query) if slot.free] for query in queries]
+    indexed_us = (time.perf_counter() - started) / len(queries) * 1e6
+
+    scan_queries = queries[:max(len(queries) // 20, 1)]
+    started = time.perf_counter()
+    scanned = [scan(snapshot.sessions, *query) for query in scan_queries]
+    scan_us = (time.perf_counter() - started) / len(scan_queries) * 1e6
+    assert scanned == indexed[:len(scan_queries)], 'results differ'
+
+    print(f'{args.sessions} sessions, {len(availability.classrooms)} classrooms, built in {build_ms:.1f} ms')
+    print(f'  busy intervals + bisect {indexed_us:10.1f} us/query')
+    print(f'  scan of every session   {scan_us:10.1f} us/query')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Timetable load time: row-by-row get_or_create vs --bulk
+Usage: python benchmarks/bench_load_timetable.py [--sessions 10000] [--skip-row-by-row]
+
+Generates a synthetic term of --sessions sessions (cohorts x sections x days
+x sessions, 300 instructors, 400 courses), then loads it into a fresh SQLite
+database with `load_timetable` and with `load_timetable --bulk`.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+def synthetic_timetable(sessions):
+    per_day = 6
+    sections = -(-sessions // (len(DAYS) * per_day))
+    term, count = {}, 0
+    for index in range(sections):
+        days = term.setdefault(f'CO{index // 4:03d}_2025_Section_{"ABCD"[index % 4]}', {})
+        for day in DAYS:
+            for slot in range(per_day):
+                if count == sessions:
+                    return {'Term_1_Bench': term}
+                count += 1
+                days.setdefault(day, {})[f'Session {slot + 1}'] = {
+                    'Course': f'Course {count % 400} Applied Studies',
+                    'Instructor': f'Instructor {count % 300}, X.',
+                    'Classroom': f'Room {count % 50}',
+                    'Type': 'Lecture',
+                    'Time': f'{8 + slot}:00-{9 + slot}:00',
+                }
+    return {'Term_1_Bench': term}
+
+
+def timed_load(env, json_path, *args):
+    manage = [sys.executable, 'manage.py']
+    subprocess.run([*manage, 'migrate', '--verbosity', '0'], env=env, cwd=BACKEND_DIR, check=True)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [*manage, 'load_timetable', '--json-file', str(json_path), *args],
+        env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return time.perf_counter() - started, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--skip-row-by-row', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / 'timetable.json'
+        json_path.write_text(json.dumps(synthetic_timetable(args.sessions)))
+        variants = {'--bulk': ['--bulk']}
+        if not args.skip_row_by_row:
+            variants = {'row by row': [], **variants}
+
+        print(f'{args.sessions} sessions')
+        for index, (name, extra) in enumerate(variants.items()):
+            env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / f'bench{index}.sqlite3'),
+                       DEBUG='False', CACHE_URL='locmemcache://')
+            elapsed, output = timed_load(env, json_path, *extra)
+            print(f'  {name:<12} {elapsed:7.2f}s  ({args.sessions / elapsed:7.0f} sessions/s, '
+                  f'{len(output.splitlines())} output lines)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Timetable sync time against the size of the change
+Usage: python benchmarks/bench_sync_timetable.py [--sessions 10000] [--changes 0 1 10 100 1000]
+
+Syncs the synthetic timetable of bench_load_timetable.py into a fresh SQLite
+database, then for each --changes count moves that many sessions to another
+classroom (spread over as many sections as possible) and times sync() of the
+result. --full diffs every section for comparison.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_load_timetable import synthetic_timetable  # noqa: E402
+
+
+def change(data, count, round_):
+    """Move count sessions, one per section in turn, to a classroom named after round_"""
+    sessions = [
+        session for days in data['Term_1_Bench'].values()
+        for sessions in days.values() for session in sessions.values()
+    ]
+    step = max(len(sessions) // max(count, 1), 1)
+    for session in sessions[::step][:count]:
+        session['Classroom'] = f'Bench {round_}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--changes', type=int, nargs='+', default=[0, 1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DJANGO_SETTINGS_MODULE='config.settings', CACHE_URL='locmemcache://', DEBUG='False',
+                          SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'))
+        sys.path.insert(0, str(BACKEND_DIR))
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from timetable.loader import parse_sessions, sync
+
+        call_command('migrate', verbosity=0)
+        data = synthetic_timetable(args.sessions)
+        started = time.perf_counter()
+        sync(parse_sessions(data)[0])
+        print(f'{args.sessions} sessions, initial sync {time.perf_counter() - started:.2f}s')
+
+        for round_, count in enumerate(args.changes):
+            change(data, count, round_)
+            rows = parse_sessions(data)[0]
+            # The --full run follows the incremental one, so it only diffs
+            for full in (False, True):
+                started = time.perf_counter()
+                result = sync(rows, full=full)
+                elapsed = time.perf_counter() - started
+                label = f'{count} changed' + (', --full' if full else '')
+                print(f'  {label:<22} {elapsed * 1000:8.1f} ms  '
+                      f'({result.sections_changed} of {result.sections} sections, {result.updated} updated)')
+
+
+if __name__ == '__main__':
+    main()
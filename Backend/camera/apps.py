@@ -0,0 +1,16 @@
+"""
+Camera app initialization
+"""
+from django.apps import AppConfig
+
+
+class CameraConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'camera'
+
+    def ready(self):
+        from core.versioning import bump_on_change
+        from .models import Camera, Room
+        # New counts bump their versions in CameraCount.save (see COUNT_DATA_VERSIONS)
+        bump_on_change(Room, 'rooms')
+        bump_on_change(Camera, 'cameras')
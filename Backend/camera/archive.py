@@ -0,0 +1,273 @@
+"""
+Columnar archive for historical counts
+Counts that age out of the online retention window are written to one file
+per room (or camera) per month:
+
+    <COUNT_ARCHIVE_DIR>/<room|camera>/<id>/<YYYY-MM>.cnt
+
+Each file is a 16 byte header (magic, row count) followed by fixed-width
+little-endian columns, each stored contiguously and sorted by timestamp:
+
+    timestamp          int64   epoch seconds
+    people_count       int32
+    frames_processed   int32
+    inference_time_ms  float32
+    id                 int64    CameraCount primary key
+
+Rows are de-duplicated on their CameraCount id, never on the timestamp
+alone: counts are stored to the second and two rows of one room may share
+it. Files written before the id column (NAVACNT1) read back with id 0 and
+are never de-duplicated.
+
+Files are read through numpy.memmap, so a range read is two binary searches
+over the timestamp column and only touches the pages it returns.
+
+Writers hold an exclusive lock on <owner dir>/.lock while they read, merge
+and replace a month file, so concurrent retention runs cannot drop each
+other's rows. Files are only ever replaced (os.replace), never rewritten in
+place, so readers need no lock: they see either the old or the new file.
+"""
+import os
+import struct
+import tempfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+MAGIC = b'NAVACNT2'
+LEGACY_MAGIC = b'NAVACNT1'
+HEADER = struct.Struct('<8sQ')
+COLUMNS = (
+    ('timestamp', np.dtype('<i8')),
+    ('people_count', np.dtype('<i4')),
+    ('frames_processed', np.dtype('<i4')),
+    ('inference_time_ms', np.dtype('<f4')),
+    ('id', np.dtype('<i8')),
+)
+# NAVACNT1 files have every column but the id
+LEGACY_COLUMNS = COLUMNS[:-1]
+
+_write_lock = threading.Lock()
+
+
+def archive_enabled() -> bool:
+    """Whether COUNT_ARCHIVE_DIR is configured"""
+    return bool(settings.COUNT_ARCHIVE_DIR)
+
+
+def empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+
+def month_key(epoch: int) -> str:
+    stamp = datetime.fromtimestamp(int(epoch), tz=dt_timezone.utc)
+    return f'{stamp.year:04d}-{stamp.month:02d}'
+
+
+def month_path(kind: str, owner_id: int, month: str) -> Path:
+    return Path(settings.COUNT_ARCHIVE_DIR) / kind / str(owner_id) / f'{month}.cnt'
+
+
+def iter_months(start_epoch: int, end_epoch: int) -> Iterable[str]:
+    """Yield the YYYY-MM keys of every month overlapping [start, end)"""
+    start = datetime.fromtimestamp(start_epoch, tz=dt_timezone.utc)
+    end = datetime.fromtimestamp(max(end_epoch - 1, start_epoch), tz=dt_timezone.utc)
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f'{year:04d}-{month:02d}'
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def open_month(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-map every column of an archive file (read-only)"""
+    # Header and columns come from one open file, even if it is replaced meanwhile
+    with open(path, 'rb') as f:
+        magic, rows = HEADER.unpack(f.read(HEADER.size))
+        if magic not in (MAGIC, LEGACY_MAGIC):
+            raise ValueError(f'{path} is not a count archive')
+        if not rows:
+            return empty_columns()
+
+        columns = {}
+        offset = HEADER.size
+        for name, dtype in (COLUMNS if magic == MAGIC else LEGACY_COLUMNS):
+            columns[name] = np.memmap(f, dtype=dtype, mode='r', offset=offset, shape=(rows,))
+            offset += rows * dtype.itemsize
+    columns.setdefault('id', np.zeros(rows, dtype=COLUMNS[-1][1]))
+    return columns
+
+
+@contextmanager
+def owner_lock(kind: str, owner_id: int):
+    """Exclusive lock on the archive of one owner, across threads and processes"""
+    directory = Path(settings.COUNT_ARCHIVE_DIR) / kind / str(owner_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(directory / '.lock', 'ab') as lock_file:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def write_month(path: Path, columns: Dict[str, np.ndarray]):
+    """Write an archive file atomically (temp file + rename)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = len(columns['timestamp'])
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, rows))
+            for name, dtype in COLUMNS:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def append_rows(kind: str, owner_id: int, columns: Dict[str, np.ndarray]):
+    """
+    Merge rows into the archive of one owner
+    Rows are split by month and merged with any existing file under the
+    owner's lock. Rows are de-duplicated on their id (last write wins), so
+    re-archiving the same rows after an interrupted retention run is harmless.
+    """
+    months = np.array([month_key(ts) for ts in columns['timestamp']])
+    with owner_lock(kind, owner_id):
+        for month in np.unique(months):
+            mask = months == month
+            _merge_month(month_path(kind, owner_id, month), {name: columns[name][mask] for name, _ in COLUMNS})
+
+
+def _merge_month(path: Path, rows: Dict[str, np.ndarray]):
+    """Merge rows into one month file; the caller holds the owner's lock"""
+    parts = [rows]
+    if path.exists():
+        existing = open_month(path)
+        parts.insert(0, {name: np.array(existing[name]) for name, _ in COLUMNS})
+        del existing
+
+    merged = {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
+    # Stable sort by timestamp then id, then keep the last occurrence of each id
+    order = np.lexsort((merged['id'], merged['timestamp']))
+    merged = {name: values[order] for name, values in merged.items()}
+    timestamps, ids = merged['timestamp'], merged['id']
+    duplicate = (timestamps[1:] == timestamps[:-1]) & (ids[1:] == ids[:-1]) & (ids[1:] != 0)
+    keep = np.append(~duplicate, True)
+    write_month(path, {name: values[keep] for name, values in merged.items()})
+
+
+def archive_count_rows(rows):
+    """
+    Archive raw count rows under their room and camera
+
+    Args:
+        rows: Iterable of (id, camera_id, room_id, people_count, frames_processed,
+              inference_time_ms, timestamp) tuples, as read by retention
+    """
+    owners = defaultdict(list)
+    for count_id, camera_id, room_id, people_count, frames, inference_ms, timestamp in rows:
+        row = (int(timestamp.timestamp()), people_count, frames, inference_ms, count_id)
+        if room_id:
+            owners[('room', room_id)].append(row)
+        if camera_id:
+            owners[('camera', camera_id)].append(row)
+
+    for (kind, owner_id), owner_rows in owners.items():
+        values = list(zip(*owner_rows))
+        append_rows(kind, owner_id, {
+            name: np.array(column, dtype=dtype)
+            for (name, dtype), column in zip(COLUMNS, values)
+        })
+
+
+def read_range(kind: str, owner_id: int, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+    """
+    Read archived counts of one owner with start <= timestamp < end
+
+    Returns:
+        dict: Column name -> array, sorted by timestamp
+    """
+    start_epoch, end_epoch = int(start.timestamp()), int(end.timestamp())
+    parts = []
+    for month in iter_months(start_epoch, end_epoch):
+        path = month_path(kind, owner_id, month)
+        if not path.exists():
+            continue
+        columns = open_month(path)
+        lo = np.searchsorted(columns['timestamp'], start_epoch, side='left')
+        hi = np.searchsorted(columns['timestamp'], end_epoch, side='left')
+        if hi > lo:
+            parts.append({name: np.array(values[lo:hi]) for name, values in columns.items()})
+
+    if not parts:
+        return empty_columns()
+    return {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
+
+
+def to_rows(columns: Dict[str, np.ndarray], newest_first: bool = False, limit: Optional[int] = None):
+    """Convert archive columns to count dicts shaped like RoomCountSerializer output"""
+    indexes = range(len(columns['timestamp']))
+    if newest_first:
+        indexes = reversed(indexes)
+    rows = []
+    for i in indexes:
+        if limit is not None and len(rows) >= limit:
+            break
+        rows.append({
+            'id': int(columns['id'][i]) or None,
+            'people_count': int(columns['people_count'][i]),
+            'frames_processed': int(columns['frames_processed'][i]),
+            'inference_time_ms': round(float(columns['inference_time_ms'][i]), 2),
+            'timestamp': datetime.fromtimestamp(int(columns['timestamp'][i]), tz=dt_timezone.utc),
+        })
+    return rows
+
+
+def without_ids(columns: Dict[str, np.ndarray], ids) -> Dict[str, np.ndarray]:
+    """Drop archived rows whose id is in ids"""
+    ids = np.fromiter(ids, dtype=np.int64)
+    if not len(ids):
+        return columns
+    keep = ~np.isin(columns['id'], ids)
+    return {name: values[keep] for name, values in columns.items()}
+
+
+def to_buckets(columns: Dict[str, np.ndarray], bucket_seconds: int):
+    """Aggregate archive columns into buckets shaped like history.bucketed_counts output"""
+    timestamps = columns['timestamp']
+    if not len(timestamps):
+        return []
+    buckets = timestamps - timestamps % bucket_seconds
+    starts, first = np.unique(buckets, return_index=True)
+    samples = np.diff(np.append(first, len(buckets)))
+    counts = columns['people_count'].astype(np.int64)
+    return [
+        {
+            'timestamp': datetime.fromtimestamp(int(bucket), tz=dt_timezone.utc),
+            'people_count': round(float(total) / int(n), 2),
+            'people_count_max': int(peak),
+            'samples': int(n),
+            'frames_processed': int(frames),
+            'inference_time_ms': round(float(inference) / int(n), 2),
+        }
+        for bucket, total, peak, n, frames, inference in zip(
+            starts,
+            np.add.reduceat(counts, first),
+            np.maximum.reduceat(counts, first),
+            samples,
+            np.add.reduceat(columns['frames_processed'].astype(np.int64), first),
+            np.add.reduceat(columns['inference_time_ms'].astype(np.float64), first),
+        )
+    ]
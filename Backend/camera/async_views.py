@@ -0,0 +1,130 @@
+"""
+Async camera views for ASGI deployments (see config/asgi.py)
+GET /api/v1/async/rooms/{id}/counts/ - Count history for a room
+GET /api/v1/async/rooms/{id}/live/ - Stream new counts for a room (Server-Sent Events)
+GET /api/v1/async/rooms/live/ - Stream new counts for every room
+GET /api/v1/async/cameras/{id}/counts/ - Count history for a camera
+GET /api/v1/async/cameras/{id}/latest-count/ - Latest count of a camera
+GET /api/v1/async/cameras/{id}/live/ - Stream new counts for a camera
+
+Same parameters and response bodies as the DRF endpoints of the same name,
+on Django's async ORM, so a waiting request holds a coroutine rather than a
+worker thread. Each view first runs the checks of its DRF action
+(authentication, permissions, throttles and conditional GET, see
+drf_action), so both URLs behave the same to clients. Keyset pages
+(?cursor=/?page_size=) stay on the DRF endpoints.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from core.mixins import parse_field_list
+from .history import HistoryParamError, acount_history, parse_history_params, serialize_history
+from .live import broker, live_response, snapshot_events
+from .models import Camera, CameraCount, Room
+from .serializers import CameraCountDetailSerializer, CameraCountSerializer, RoomCountSerializer
+from .views import CameraViewSet, RoomViewSet
+
+
+def drf_action(viewset, action):
+    """
+    Run an async GET view behind the checks of a DRF viewset action
+    The viewset's initial() (authentication, permissions, throttles sharing
+    the action's buckets, ConditionalGetMixin) runs in a thread, as it reads
+    the database and cache; its rejections (401, 429, 304) are returned as
+    the DRF endpoint would return them, and finalize_response() adds the
+    same ETag and headers to the async response.
+    """
+    # renderer_classes and the like given to @action
+    initkwargs = getattr(getattr(viewset, action), 'kwargs', {})
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return HttpResponseNotAllowed(['GET', 'HEAD'])
+            view = viewset(**initkwargs)
+            view.action_map = {'get': action, 'head': action}
+            view.args, view.kwargs = args, kwargs
+            drf_request = view.request = view.initialize_request(request, *args, **kwargs)
+            view.headers = view.default_response_headers
+            try:
+                await sync_to_async(view.initial)(drf_request, *args, **kwargs)
+            except Exception as exc:
+                response = await sync_to_async(view.handle_exception)(exc)
+            else:
+                response = await view_func(request, *args, **kwargs)
+            return view.finalize_response(drf_request, response, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def sparse_fieldsets(request):
+    return {
+        'fields': parse_field_list(request.GET.get('fields')),
+        'expand': parse_field_list(request.GET.get('expand')),
+    }
+
+
+def not_found(message='Not found.'):
+    return JsonResponse({'error': message}, status=404)
+
+
+async def history_response(request, counts, serializer_class, owner):
+    """Async counterpart of views._count_history_response (without keyset pages)"""
+    try:
+        query = parse_history_params(request.GET)
+    except HistoryParamError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    history = await acount_history(counts, query, owner=owner)
+    if query.is_bucketed:
+        return JsonResponse(history)
+    return JsonResponse(serialize_history(history, serializer_class, sparse_fieldsets(request)), safe=False)
+
+
+@drf_action(RoomViewSet, 'counts')
+async def room_counts(request, pk):
+    if not await Room.objects.filter(pk=pk).aexists():
+        return not_found()
+    return await history_response(request, CameraCount.objects.filter(room_id=pk), RoomCountSerializer, ('room', pk))
+
+
+@drf_action(CameraViewSet, 'counts')
+async def camera_counts(request, pk):
+    if not await Camera.objects.filter(pk=pk).aexists():
+        return not_found()
+    counts = CameraCount.objects.filter(camera_id=pk).select_related('camera', 'room')
+    return await history_response(request, counts, CameraCountDetailSerializer, ('camera', pk))
+
+
+@drf_action(CameraViewSet, 'latest_count')
+async def camera_latest_count(request, pk):
+    latest = await CameraCount.objects.filter(camera_id=pk).select_related('camera', 'room').afirst()
+    if latest is None:
+        if not await Camera.objects.filter(pk=pk).aexists():
+            return not_found()
+        return JsonResponse({'message': 'No counts available yet'}, status=404)
+    return JsonResponse(CameraCountSerializer(latest, **sparse_fieldsets(request)).data)
+
+
+@drf_action(RoomViewSet, 'live')
+async def room_live(request, pk):
+    room = await Room.objects.filter(pk=pk).afirst()
+    if room is None:
+        return not_found()
+    return live_response(request, channels=[f'room:{room.id}'], initial=snapshot_events(room, 'room'))
+
+
+@drf_action(RoomViewSet, 'live_all')
+async def rooms_live(request):
+    return live_response(request, prefix='room:', initial=broker.latest('room:'))
+
+
+@drf_action(CameraViewSet, 'live')
+async def camera_live(request, pk):
+    camera = await Camera.objects.filter(pk=pk).afirst()
+    if camera is None:
+        return not_found()
+    return live_response(request, channels=[f'camera:{camera.id}'], initial=snapshot_events(camera, 'camera'))
@@ -0,0 +1,75 @@
+"""
+Streaming count export
+Counts are read with values_list() through QuerySet.iterator(), so no model
+instances are built and only one chunk of rows is in memory at a time;
+output is written in batches of the same size as they are fetched. Memory
+stays flat whatever the size of the export and the first bytes go out as
+soon as the first chunk is read. Under ASGI the same chunks are served
+through astream(), since Django 4.2 would buffer a sync stream whole there.
+
+On PostgreSQL the iterator uses a server-side cursor, except behind
+PgBouncer (DB_PGBOUNCER), where the driver buffers the whole result.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+COLUMNS = ('id', 'camera_id', 'room_id', 'people_count', 'frames_processed', 'inference_time_ms', 'timestamp')
+
+
+def export_rows(queryset, chunk_size=None):
+    """Iterate (id, camera_id, ..., timestamp) tuples, oldest first"""
+    chunk_size = chunk_size or settings.COUNT_EXPORT_CHUNK_SIZE
+    return queryset.order_by('timestamp', 'id').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def csv_stream(rows, chunk_size=None):
+    """Yield CSV text: a header line, then one batch of lines per chunk"""
+    chunk_size = chunk_size or settings.COUNT_EXPORT_CHUNK_SIZE
+    yield ','.join(COLUMNS) + '\r\n'
+    for batch in batches(rows, chunk_size):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerows(row[:-1] + (row[-1].isoformat(),) for row in batch)
+        yield output.getvalue()
+
+
+def ndjson_stream(rows, chunk_size=None):
+    """Yield newline-delimited JSON, one object per count, batched per chunk"""
+    chunk_size = chunk_size or settings.COUNT_EXPORT_CHUNK_SIZE
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    for batch in batches(rows, chunk_size):
+        yield ''.join(
+            dumps(dict(zip(COLUMNS, row[:-1] + (row[-1].isoformat(),)))) + '\n'
+            for row in batch
+        )
+
+
+async def astream(chunks):
+    """
+    Async iterator over a chunk generator, for ASGI responses
+    Each chunk is produced in Django's sync thread, so the database cursor
+    stays on one connection while the event loop is free between chunks.
+    """
+    chunks = iter(chunks)
+    try:
+        while True:
+            chunk = await sync_to_async(next)(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
@@ -0,0 +1,407 @@
+"""
+Count history queries
+Parses the start/end/bucket/limit parameters of the count history endpoints
+and aggregates counts into time buckets inside the database. Also builds the
+fixed-length per-room sparklines of the rooms summary endpoint.
+
+Ranges with a start are also read from the columnar archive (archive.py)
+and merged with the rows still online.
+"""
+import heapq
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import archive
+
+BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+BUCKET_PATTERN = re.compile(r'^(\d+)([smhd])$')
+
+
+class HistoryParamError(ValueError):
+    """Raised for invalid count history query parameters"""
+
+
+class EpochBucket(models.Func):
+    """
+    Floor a datetime column to the start of an N-second bucket, as epoch seconds
+    Buckets are aligned to the Unix epoch, matching retention.bucket_start_for()
+    """
+    output_field = models.BigIntegerField()
+
+    def __init__(self, expression, seconds, **extra):
+        self.seconds = int(seconds)
+        super().__init__(expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # %%%%s survives both Func templating and the backend's %s -> ? rewrite
+        template = f"(CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / {self.seconds} * {self.seconds})"
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        template = f"(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / {self.seconds}) * {self.seconds})::bigint"
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        template = f"(FLOOR(UNIX_TIMESTAMP(%(expressions)s) / {self.seconds}) * {self.seconds})"
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+
+@dataclass
+class HistoryQuery:
+    """Validated count history parameters"""
+    limit: int
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    bucket_seconds: Optional[int] = None
+
+    @property
+    def is_bucketed(self) -> bool:
+        return self.bucket_seconds is not None
+
+
+@dataclass
+class SparklineWindow:
+    """A bucket-aligned window of `points` buckets ending with the current one"""
+    start: datetime
+    end: datetime
+    bucket_seconds: int
+    points: int
+
+
+def parse_bucket(value: str) -> int:
+    """Parse a bucket width such as '30s', '5m', '1h' or '1d' into seconds"""
+    match = BUCKET_PATTERN.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise HistoryParamError(f'Invalid bucket "{value}", expected e.g. 30s, 5m, 1h or 1d')
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def parse_timestamp(value: str, name: str) -> datetime:
+    """Parse an ISO 8601 datetime or date query parameter (naive values are UTC)"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is not None:
+            parsed = datetime(date.year, date.month, date.day)
+    if parsed is None:
+        raise HistoryParamError(f'Invalid {name} "{value}", expected an ISO 8601 date or datetime')
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def parse_history_params(params) -> HistoryQuery:
+    """
+    Validate count history query parameters
+
+    Args:
+        params: request.query_params
+
+    Returns:
+        HistoryQuery
+
+    Raises:
+        HistoryParamError: If any parameter is malformed
+    """
+    max_points = settings.COUNT_HISTORY_MAX_POINTS
+
+    try:
+        limit = int(params.get('limit', 100))
+    except (TypeError, ValueError):
+        raise HistoryParamError('limit must be an integer')
+    if limit < 1:
+        raise HistoryParamError('limit must be positive')
+
+    query = HistoryQuery(limit=min(limit, max_points))
+    if params.get('start'):
+        query.start = parse_timestamp(params['start'], 'start')
+    if params.get('end'):
+        query.end = parse_timestamp(params['end'], 'end')
+    if query.start and query.end and query.start >= query.end:
+        raise HistoryParamError('start must be before end')
+
+    if params.get('bucket'):
+        query.bucket_seconds = parse_bucket(params['bucket'])
+        query.end = query.end or timezone.now()
+        query.start = query.start or query.end - timedelta(hours=settings.COUNT_HISTORY_DEFAULT_HOURS)
+
+        # Widen the bucket rather than return more than max_points points
+        span = (query.end - query.start).total_seconds()
+        min_bucket = -(-int(span) // max_points)
+        query.bucket_seconds = max(query.bucket_seconds, min_bucket)
+
+    return query
+
+
+def filter_range(queryset, query: HistoryQuery):
+    """Restrict a CameraCount queryset to the requested time range"""
+    if query.start:
+        queryset = queryset.filter(timestamp__gte=query.start)
+    if query.end:
+        queryset = queryset.filter(timestamp__lt=query.end)
+    return queryset
+
+
+def bucketed_queryset(queryset, query: HistoryQuery):
+    """Values queryset aggregating CameraCount rows into the query's time buckets"""
+    return (
+        filter_range(queryset, query)
+        .annotate(bucket=EpochBucket('timestamp', query.bucket_seconds))
+        .values('bucket')
+        .annotate(
+            avg_count=Avg('people_count'),
+            max_count=Max('people_count'),
+            samples=Count('id'),
+            total_frames=Sum('frames_processed'),
+            avg_inference_ms=Avg('inference_time_ms'),
+        )
+        .order_by('bucket')[:settings.COUNT_HISTORY_MAX_POINTS]
+    )
+
+
+def bucket_point(row) -> dict:
+    """Response shape of one bucketed_queryset() row"""
+    return {
+        'timestamp': datetime.fromtimestamp(row['bucket'], tz=dt_timezone.utc),
+        'people_count': round(row['avg_count'], 2),
+        'people_count_max': row['max_count'],
+        'samples': row['samples'],
+        'frames_processed': row['total_frames'],
+        'inference_time_ms': round(row['avg_inference_ms'], 2),
+    }
+
+
+def bucketed_counts(queryset, query: HistoryQuery):
+    """
+    Aggregate a CameraCount queryset into time buckets in a single query
+
+    Args:
+        queryset: CameraCount queryset already filtered to one room or camera
+        query: Bucketed HistoryQuery
+
+    Returns:
+        list: One dict per non-empty bucket, oldest first
+    """
+    return [bucket_point(row) for row in bucketed_queryset(queryset, query)]
+
+
+def combine_buckets(a, b):
+    """Combine two aggregates of the same bucket"""
+    samples = a['samples'] + b['samples']
+    return {
+        'timestamp': a['timestamp'],
+        'people_count': round((a['people_count'] * a['samples'] + b['people_count'] * b['samples']) / samples, 2),
+        'people_count_max': max(a['people_count_max'], b['people_count_max']),
+        'samples': samples,
+        'frames_processed': a['frames_processed'] + b['frames_processed'],
+        'inference_time_ms': round(
+            (a['inference_time_ms'] * a['samples'] + b['inference_time_ms'] * b['samples']) / samples, 2
+        ),
+    }
+
+
+def merge_buckets(archived, online):
+    """Merge two bucket lists by timestamp, combining buckets present in both"""
+    merged = {point['timestamp']: point for point in archived}
+    for point in online:
+        other = merged.get(point['timestamp'])
+        merged[point['timestamp']] = combine_buckets(other, point) if other else point
+    return [merged[key] for key in sorted(merged)]
+
+
+def merge_rows(online, archived, limit: int):
+    """Merge online rows and archived row dicts, newest first"""
+    rows = heapq.merge(
+        online, archived, reverse=True,
+        key=lambda row: row['timestamp'] if isinstance(row, dict) else row.timestamp,
+    )
+    return list(islice(rows, limit))
+
+
+def archive_owner(query: HistoryQuery, owner):
+    """
+    Whether the archive can hold rows of the requested range
+
+    Retention archives every row before deleting it, but late rows can land
+    behind rows that are already archived, so there is no single point before
+    which everything is archived. The archive and the database are both read
+    across the whole range and merged.
+    """
+    return owner is not None and query.start is not None and archive.archive_enabled()
+
+
+def read_archive(query: HistoryQuery, owner):
+    """Archived columns of the requested range"""
+    return archive.read_range(owner[0], owner[1], query.start, query.end or timezone.now())
+
+
+def still_online(queryset, query: HistoryQuery, archived):
+    """
+    Ids of archived rows that are still online
+    Only left behind when a retention transaction rolls back after its chunk
+    was archived; the next run deletes them. Bounded by the id range of the
+    archived rows so the common case reads next to nothing.
+    """
+    ids = archived['id'][archived['id'] > 0]
+    if not len(ids):
+        return queryset.none().values_list('id', flat=True)
+    return (
+        filter_range(queryset, query)
+        .filter(id__gte=int(ids.min()), id__lte=int(ids.max()))
+        .order_by()
+        .values_list('id', flat=True)
+    )
+
+
+def history_payload(query: HistoryQuery, points):
+    """Response body of a bucketed history request"""
+    return {
+        'start': query.start,
+        'end': query.end,
+        'bucket_seconds': query.bucket_seconds,
+        'points': points[:settings.COUNT_HISTORY_MAX_POINTS],
+    }
+
+
+def count_history(queryset, query: HistoryQuery, owner=None):
+    """
+    Resolve a count history request
+
+    Args:
+        queryset: CameraCount queryset filtered to one room or camera
+        query: Validated HistoryQuery
+        owner: ('room' | 'camera', id) whose archive may hold old rows
+
+    Returns:
+        list or dict: Raw rows (newest first) or the bucketed response payload
+    """
+    archived = None
+    if archive_owner(query, owner):
+        archived = read_archive(query, owner)
+        archived = archive.without_ids(archived, still_online(queryset, query, archived))
+
+    if query.is_bucketed:
+        points = bucketed_counts(queryset, query)
+        if archived is not None:
+            points = merge_buckets(archive.to_buckets(archived, query.bucket_seconds), points)
+        return history_payload(query, points)
+
+    rows = list(filter_range(queryset, query)[:query.limit])
+    if archived is not None:
+        rows = merge_rows(rows, archive.to_rows(archived, newest_first=True, limit=query.limit), query.limit)
+    return rows
+
+
+async def acount_history(queryset, query: HistoryQuery, owner=None):
+    """
+    count_history() on the async ORM, for the ASGI endpoints
+    Archive files are read in a worker thread so the event loop never blocks on disk.
+    """
+    archived = None
+    if archive_owner(query, owner):
+        archived = await sync_to_async(read_archive, thread_sensitive=False)(query, owner)
+        stale = [count_id async for count_id in still_online(queryset, query, archived)]
+        archived = archive.without_ids(archived, stale)
+
+    if query.is_bucketed:
+        points = [bucket_point(row) async for row in bucketed_queryset(queryset, query)]
+        if archived is not None:
+            points = merge_buckets(archive.to_buckets(archived, query.bucket_seconds), points)
+        return history_payload(query, points)
+
+    rows = [row async for row in filter_range(queryset, query)[:query.limit]]
+    if archived is not None:
+        rows = merge_rows(rows, archive.to_rows(archived, newest_first=True, limit=query.limit), query.limit)
+    return rows
+
+
+def serialize_history(rows, serializer_class, serializer_kwargs=None):
+    """
+    Serialize the raw rows of count_history()
+    Online rows go through the serializer; archived rows, interleaved with
+    them by timestamp, are already plain dicts and are only trimmed to ?fields=.
+    """
+    serializer_kwargs = serializer_kwargs or {}
+    fields = serializer_kwargs.get('fields')
+    online = iter(serializer_class(
+        [row for row in rows if not isinstance(row, dict)], many=True, **serializer_kwargs
+    ).data)
+    return [
+        next(online) if not isinstance(row, dict)
+        else {key: value for key, value in row.items() if not fields or key in fields}
+        for row in rows
+    ]
+
+
+def parse_sparkline_params(params, now: Optional[datetime] = None) -> SparklineWindow:
+    """
+    Validate the window/points parameters of the rooms summary
+
+    Args:
+        params: request.query_params (window like '1h', points like 60)
+        now: Reference time, defaults to timezone.now()
+
+    Returns:
+        SparklineWindow
+
+    Raises:
+        HistoryParamError: If any parameter is malformed
+    """
+    window_seconds = parse_bucket(params.get('window') or settings.ROOM_SUMMARY_WINDOW)
+    try:
+        points = int(params.get('points', settings.ROOM_SUMMARY_POINTS))
+    except (TypeError, ValueError):
+        raise HistoryParamError('points must be an integer')
+    if points < 1:
+        raise HistoryParamError('points must be positive')
+    points = min(points, settings.COUNT_HISTORY_MAX_POINTS)
+
+    bucket_seconds = max(1, -(-window_seconds // points))
+    now = now or timezone.now()
+    end = int(now.timestamp()) // bucket_seconds * bucket_seconds + bucket_seconds
+    start = end - points * bucket_seconds
+    return SparklineWindow(
+        start=datetime.fromtimestamp(start, tz=dt_timezone.utc),
+        end=datetime.fromtimestamp(end, tz=dt_timezone.utc),
+        bucket_seconds=bucket_seconds,
+        points=points,
+    )
+
+
+def room_sparklines(queryset, window: SparklineWindow) -> Dict[int, List[Optional[float]]]:
+    """
+    Average count per bucket for every room, in a single grouped query
+
+    Args:
+        queryset: CameraCount queryset (e.g. restricted to some rooms)
+        window: SparklineWindow
+
+    Returns:
+        dict: room id -> list of window.points averages, None for empty buckets
+    """
+    rows = (
+        queryset
+        .filter(room__isnull=False, timestamp__gte=window.start, timestamp__lt=window.end)
+        .annotate(bucket=EpochBucket('timestamp', window.bucket_seconds))
+        .values('room_id', 'bucket')
+        .annotate(avg_count=Avg('people_count'))
+        .order_by()
+    )
+    start = int(window.start.timestamp())
+    lines = {}
+    for row in rows:
+        line = lines.setdefault(row['room_id'], [None] * window.points)
+        index = (row['bucket'] - start) // window.bucket_seconds
+        if 0 <= index < window.points:
+            line[index] = round(row['avg_count'], 2)
+    return lines
@@ -0,0 +1,199 @@
+"""
+Bulk count ingestion for edge counters
+POST /api/v1/camera-counts/bulk/ takes thousands of pre-aggregated counts per
+request. Records are validated with plain Python (no serializer per record),
+inserted with bulk_create and folded into Room/Camera.latest_count and
+RoomDailyStats once per owner, not once per row.
+
+Every record carries an ingest key: the client's own "key", or one derived
+from its camera/room and bucket_start. Keys are unique, so a retried request
+only inserts the records that did not make it the first time.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.versioning import bump_version
+from .export import batches
+from .history import parse_timestamp
+from .live import publish_count
+from .models import COUNT_DATA_VERSIONS, Camera, CameraCount, Room, RoomDailyStats
+
+KEY_MAX_LENGTH = CameraCount._meta.get_field('ingest_key').max_length
+# Buckets further in the future than this are rejected (edge clock drift)
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class IngestError(ValueError):
+    """Raised when a bulk payload is malformed; .errors maps record index to messages"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+@dataclass
+class IngestResult:
+    received: int
+    created: int
+
+    @property
+    def duplicates(self) -> int:
+        return self.received - self.created
+
+
+def derived_key(camera_id, room_id, timestamp) -> str:
+    """Natural ingest key of a record without one: its owner and bucket"""
+    natural = f'{camera_id or ""}:{room_id or ""}:{timestamp.isoformat()}'
+    return 'auto:' + hashlib.blake2b(natural.encode(), digest_size=16).hexdigest()
+
+
+def _count(record, name, errors, default=None):
+    value = record.get(name, default)
+    # bool is an int subclass; reject it explicitly
+    if type(value) is not int or value < 0:
+        errors.append(f'{name} must be a non-negative integer')
+        return None
+    return value
+
+
+def _bucket_start(record, errors):
+    value = record.get('bucket_start')
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        if isinstance(value, str):
+            return parse_timestamp(value, 'bucket_start')
+    except (ValueError, OverflowError, OSError):
+        pass
+    errors.append('bucket_start must be an ISO 8601 datetime or a Unix timestamp')
+    return None
+
+
+def _owner(record, name, errors):
+    value = record.get(name)
+    if value is None:
+        return None
+    if type(value) is not int or value < 1:
+        errors.append(f'{name} must be an id')
+        return None
+    return value
+
+
+def parse_records(payload) -> List[CameraCount]:
+    """
+    Validate a bulk payload into unsaved CameraCounts
+
+    Args:
+        payload: A list of records, or {"records": [...]}
+
+    Returns:
+        List of CameraCount instances, each with its ingest_key set
+
+    Raises:
+        IngestError: If the payload or any record is invalid (nothing is saved)
+    """
+    records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not records:
+        raise IngestError('Expected a non-empty list of records (or {"records": [...]})')
+    if len(records) > settings.COUNT_INGEST_MAX_RECORDS:
+        raise IngestError(f'At most {settings.COUNT_INGEST_MAX_RECORDS} records per request')
+
+    latest_allowed = timezone.now() + MAX_CLOCK_SKEW
+    counts, errors = [], {}
+    for index, record in enumerate(records):
+        problems = []
+        if not isinstance(record, dict):
+            errors[index] = ['record must be an object']
+            continue
+        camera_id = _owner(record, 'camera', problems)
+        room_id = _owner(record, 'room', problems)
+        if not camera_id and not room_id and not problems:
+            problems.append('camera or room is required')
+        timestamp = _bucket_start(record, problems)
+        if timestamp and timestamp > latest_allowed:
+            problems.append('bucket_start is in the future')
+        people_count = _count(record, 'people_count', problems)
+        frames_processed = _count(record, 'frames_processed', problems, default=0)
+        inference_time_ms = record.get('inference_time_ms', 0)
+        if isinstance(inference_time_ms, bool) or not isinstance(inference_time_ms, (int, float)) \
+                or not 0 <= inference_time_ms < float('inf'):
+            problems.append('inference_time_ms must be a non-negative number')
+        key = record.get('key')
+        if key is not None and (not isinstance(key, str) or not 0 < len(key) <= KEY_MAX_LENGTH):
+            problems.append(f'key must be a string of 1 to {KEY_MAX_LENGTH} characters')
+        if problems:
+            errors[index] = problems
+            continue
+        counts.append(CameraCount(
+            camera_id=camera_id,
+            room_id=room_id,
+            timestamp=timestamp,
+            people_count=people_count,
+            frames_processed=frames_processed,
+            inference_time_ms=float(inference_time_ms),
+            ingest_key=key or derived_key(camera_id, room_id, timestamp),
+        ))
+
+    if not errors:
+        # One query per owner model for every id referenced by the batch
+        for model, field in ((Camera, 'camera_id'), (Room, 'room_id')):
+            ids = {getattr(count, field) for count in counts} - {None}
+            missing = ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            for index, count in enumerate(counts):
+                if getattr(count, field) in missing:
+                    errors.setdefault(index, []).append(
+                        f'{model._meta.model_name} {getattr(count, field)} does not exist'
+                    )
+    if errors:
+        raise IngestError('Invalid records', errors)
+    return counts
+
+
+def ingest_counts(counts: List[CameraCount]) -> IngestResult:
+    """
+    Insert validated counts, skipping any whose ingest key is already stored
+
+    Latest counts and daily stats are updated from the new counts only, in
+    the same transaction; live streams and data versions are notified once
+    the transaction commits.
+    """
+    batch_size = settings.COUNT_INGEST_BATCH_SIZE
+    with transaction.atomic():
+        # Lock the owners first (rooms then cameras, by id; the order the
+        # per-count save() path updates them in), so a concurrent retry of
+        # the same batch waits here and then sees these keys as existing
+        for model, field in ((Room, 'room_id'), (Camera, 'camera_id')):
+            ids = sorted({getattr(count, field) for count in counts} - {None})
+            list(model.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk'))
+
+        seen = set()
+        for keys in batches([count.ingest_key for count in counts], batch_size):
+            seen.update(CameraCount.objects.filter(ingest_key__in=keys).values_list('ingest_key', flat=True))
+        new = []
+        for count in counts:
+            if count.ingest_key not in seen:
+                seen.add(count.ingest_key)
+                new.append(count)
+        if not new:
+            return IngestResult(received=len(counts), created=0)
+
+        CameraCount.objects.bulk_create(new, batch_size=batch_size)
+
+        newest = {}
+        for count in new:
+            owner = (count.room_id, count.camera_id)
+            if owner not in newest or count.timestamp >= newest[owner].timestamp:
+                newest[owner] = count
+        # Only counts that became their owner's latest count are published
+        published = [(count, count.update_latest()) for count in newest.values()]
+        RoomDailyStats.record_many(new)
+
+        transaction.on_commit(lambda: [publish_count(count, owners) for count, owners in published])
+        transaction.on_commit(lambda: bump_version(*COUNT_DATA_VERSIONS))
+    return IngestResult(received=len(counts), created=len(new))
@@ -0,0 +1,360 @@
+"""
+Live count streaming
+An in-process pub/sub broker that count writers publish to, and the
+Server-Sent Events formatting used by the live endpoints. Every open stream
+is fed from memory, so dashboards add no database load per event.
+
+Subscriptions can be consumed from a thread (event_stream, WSGI) or from an
+event loop (aevent_stream, ASGI); publishers may run in any thread.
+
+Counts saved in this process are published directly. Counts written by other
+processes (run_camera_workers, other web workers) reach the broker through
+LatestCountPoller, which watches Room/Camera.latest_count_at while any stream
+is open.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connection
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A bounded event queue for one open stream
+    If the consumer falls behind, the oldest queued events are dropped
+    """
+    def __init__(self, broker: 'CountBroker', channels: Optional[Iterable[str]], prefix: Optional[str]):
+        self.broker = broker
+        self.channels = set(channels or ())
+        self.prefix = prefix
+        self.queue = queue.Queue(maxsize=settings.LIVE_STREAM_QUEUE_SIZE)
+        # Set by the first aget(): the loop and event that wake an async consumer
+        self._loop = None
+        self._ready = None
+
+    def matches(self, channel: str) -> bool:
+        return channel in self.channels or bool(self.prefix and channel.startswith(self.prefix))
+
+    def put(self, event: dict):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                break
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass  # loop already closed, the consumer is gone
+
+    def get(self, timeout: float) -> Optional[dict]:
+        """Next event, or None after timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout: float) -> Optional[dict]:
+        """Next event, or None after timeout seconds, without blocking the event loop"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        deadline = self._loop.time() + timeout
+        while True:
+            # Clear before checking the queue so a concurrent put() always wakes us
+            self._ready.clear()
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class CountBroker:
+    """
+    In-process publish/subscribe for count events
+    Channels are 'room:<id>' and 'camera:<id>'. Recent events are kept in a
+    ring buffer so reconnecting clients can resume from Last-Event-ID.
+    """
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=history)
+        self._latest = {}
+        self._sequence = 0
+
+    def publish(self, channels: Iterable[str], payload: dict) -> dict:
+        with self._lock:
+            self._sequence += 1
+            event = {'id': self._sequence, 'channels': tuple(channels), 'data': payload}
+            self._recent.append(event)
+            for channel in event['channels']:
+                self._latest[channel] = event
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if any(subscription.matches(channel) for channel in event['channels']):
+                subscription.put(event)
+        return event
+
+    def subscribe(self, channels: Optional[Iterable[str]] = None, prefix: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Open a subscription to explicit channels and/or every channel with a prefix
+        Events newer than last_event_id still in the ring buffer are queued first
+        """
+        subscription = Subscription(self, channels, prefix)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event['id'] > last_event_id and any(map(subscription.matches, event['channels'])):
+                        subscription.put(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def latest(self, prefix: str):
+        """Last event of every channel with the given prefix, oldest first"""
+        with self._lock:
+            events = {event['id']: event for channel, event in self._latest.items() if channel.startswith(prefix)}
+        return [events[key] for key in sorted(events)]
+
+    def last(self, channel: str) -> Optional[dict]:
+        """Last event published to a channel"""
+        with self._lock:
+            return self._latest.get(channel)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = CountBroker()
+
+
+class LatestCountPoller:
+    """
+    Publishes counts written by other processes into this process's broker
+    A daemon thread started by the first live stream: every LIVE_POLL_SECONDS
+    it reads the latest count of every room and camera (one query per model)
+    and publishes those that changed since the previous pass and that the
+    broker has not already seen. Rows are compared one by one rather than
+    against a single high-water mark, so a count that commits late with an
+    older timestamp than another owner's, or a bulk backfill, is not missed.
+    It exits when no stream is left open.
+    """
+    def __init__(self, broker: CountBroker):
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._thread = None
+        # kind -> {pk: (latest_count, latest_count_at)} of the previous pass
+        self._seen = {}
+
+    def ensure_started(self):
+        if settings.LIVE_POLL_SECONDS <= 0:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-count-poller', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        # Rows recorded by an earlier thread may have changed while no stream
+        # was open; the first pass records a fresh baseline right away, next
+        # to the snapshot the starting stream just sent
+        self._seen = {}
+        try:
+            while True:
+                try:
+                    self.poll()
+                except DatabaseError as e:
+                    logger.warning(f"Live count poll failed: {str(e)}")
+                time.sleep(settings.LIVE_POLL_SECONDS)
+                if not self.broker.subscriber_count:
+                    break
+        finally:
+            connection.close()
+
+    def poll(self) -> int:
+        """One pass; returns the number of events published"""
+        published = 0
+        for kind in ('room', 'camera'):
+            model = apps.get_model('camera', kind)
+            rows = model.objects.exclude(latest_count_at=None).values_list('pk', 'latest_count', 'latest_count_at')
+            # First pass only records the rows; streams send their own snapshot
+            first = kind not in self._seen
+            seen = self._seen.setdefault(kind, {})
+            for pk, people, at in rows:
+                if seen.get(pk) == (people, at):
+                    continue
+                seen[pk] = (people, at)
+                if first:
+                    continue
+                channel = f'{kind}:{pk}'
+                last = self.broker.last(channel)
+                if last is not None and last['data'].get('timestamp') and last['data']['timestamp'] >= at:
+                    continue  # published in this process when it was saved
+                self.broker.publish([channel], {kind: pk, 'people_count': people, 'timestamp': at})
+                published += 1
+        return published
+
+
+poller = LatestCountPoller(broker)
+
+
+def count_channels(count, owners=('room', 'camera')):
+    channels = []
+    if count.room_id and 'room' in owners:
+        channels.append(f'room:{count.room_id}')
+    if count.camera_id and 'camera' in owners:
+        channels.append(f'camera:{count.camera_id}')
+    return channels
+
+
+def publish_count(count, owners=('room', 'camera')):
+    """
+    Publish a saved CameraCount to the channels of its owners
+    owners: the kinds whose latest count it became (see CameraCount.update_latest)
+    """
+    channels = count_channels(count, owners)
+    if not channels:
+        return None
+    return broker.publish(channels, {
+        'room': count.room_id,
+        'camera': count.camera_id,
+        'people_count': count.people_count,
+        'frames_processed': count.frames_processed,
+        'inference_time_ms': count.inference_time_ms,
+        'timestamp': count.timestamp,
+    })
+
+
+def snapshot_events(owner, kind: str):
+    """Initial event for a live stream, from a room's or camera's stored latest count"""
+    if owner.latest_count_at is None:
+        return []
+    return [{
+        'id': None,
+        'data': {
+            kind: owner.id,
+            'people_count': owner.latest_count,
+            'timestamp': owner.latest_count_at,
+        },
+    }]
+
+
+def parse_last_event_id(value) -> Optional[int]:
+    """Last-Event-ID header (or ?last_event_id=) value, None if absent or malformed"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def sse_response(stream) -> StreamingHttpResponse:
+    """Wrap an event stream (sync or async iterator) in an uncached, unbuffered response"""
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def live_response(request, channels=None, prefix=None, initial=()) -> StreamingHttpResponse:
+    """
+    Server-Sent Events response for a Django request; async under ASGI
+    Django 4.2 buffers a sync iterator whole under ASGI (and an async one
+    under WSGI), so the stream has to match the server.
+    """
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    stream = aevent_stream if isinstance(request, ASGIRequest) else event_stream
+    return sse_response(stream(channels, prefix=prefix, last_event_id=last_event_id, initial=initial))
+
+
+def format_event(event: dict) -> str:
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    if event.get('id') is None:
+        return f"event: count\ndata: {data}\n\n"
+    return f"id: {event['id']}\nevent: count\ndata: {data}\n\n"
+
+
+def event_stream(channels: Optional[Iterable[str]] = None, prefix: Optional[str] = None,
+                 last_event_id: Optional[int] = None, initial: Iterable[dict] = ()):
+    """
+    Yield an SSE stream of count events
+    Subscribes on first iteration (so an abandoned response never leaks a
+    subscription), sends a keepalive comment when idle and ends after
+    LIVE_STREAM_MAX_SECONDS; EventSource then reconnects on its own and
+    resumes from Last-Event-ID.
+    """
+    subscription = broker.subscribe(channels, prefix=prefix, last_event_id=last_event_id)
+    poller.ensure_started()
+    keepalive = settings.LIVE_STREAM_KEEPALIVE_SECONDS
+    deadline = time.monotonic() + settings.LIVE_STREAM_MAX_SECONDS
+    try:
+        yield f'retry: {settings.LIVE_STREAM_RETRY_MS}\n\n'
+        if last_event_id is None:
+            for event in initial:
+                yield format_event(event)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = subscription.get(timeout=min(keepalive, remaining))
+            yield ': keepalive\n\n' if event is None else format_event(event)
+    finally:
+        subscription.close()
+
+
+async def aevent_stream(channels: Optional[Iterable[str]] = None, prefix: Optional[str] = None,
+                        last_event_id: Optional[int] = None, initial: Iterable[dict] = ()):
+    """
+    Async counterpart of event_stream() for ASGI
+    An idle stream costs one pending coroutine instead of a worker thread.
+    """
+    subscription = broker.subscribe(channels, prefix=prefix, last_event_id=last_event_id)
+    poller.ensure_started()
+    keepalive = settings.LIVE_STREAM_KEEPALIVE_SECONDS
+    deadline = time.monotonic() + settings.LIVE_STREAM_MAX_SECONDS
+    try:
+        yield f'retry: {settings.LIVE_STREAM_RETRY_MS}\n\n'
+        if last_event_id is None:
+            for event in initial:
+                yield format_event(event)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = await subscription.aget(timeout=min(keepalive, remaining))
+            yield ': keepalive\n\n' if event is None else format_event(event)
+    finally:
+        subscription.close()
@@ -0,0 +1,40 @@
+"""
+Django management command to backfill the denormalised latest counts
+Usage: python manage.py backfill_latest_counts
+
+Recomputes Room/Camera.latest_count and latest_count_at from CameraCount.
+Run once after upgrading, or whenever counts were written outside
+CameraCount.save() (raw SQL, imports). Rooms and cameras without any count
+are left untouched, so an existing last_updated is never cleared.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from camera.models import Camera, CameraCount, Room
+
+
+class Command(BaseCommand):
+    help = 'Backfill latest_count and latest_count_at on rooms and cameras from their counts'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rooms = self._backfill(Room, 'room', extra={'last_updated': 'timestamp'})
+            cameras = self._backfill(Camera, 'camera')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Backfilled latest counts for {rooms} rooms and {cameras} cameras')
+        )
+
+    def _backfill(self, model, owner_field, extra=None):
+        """Update every row of model that has counts with one UPDATE ... SET col = (subquery)"""
+        counts = CameraCount.objects.filter(**{owner_field: OuterRef('pk')})
+        latest = counts.order_by('-timestamp')
+        values = {
+            'latest_count': Coalesce(Subquery(latest.values('people_count')[:1]), 0),
+            'latest_count_at': Subquery(latest.values('timestamp')[:1]),
+        }
+        for field, source in (extra or {}).items():
+            values[field] = Subquery(latest.values(source)[:1])
+        return model.objects.filter(Exists(counts)).update(**values)
@@ -0,0 +1,96 @@
+"""
+Django management command to downsample and delete old camera counts
+Usage: python manage.py prune_counts [--older-than-days 30] [--bucket-seconds 3600]
+
+Meant to be scheduled (e.g. nightly from cron). It can be interrupted and
+re-run at any time; each chunk is committed on its own.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.models import CameraCount
+from camera.retention import retention_cutoff, run_retention
+
+
+class Command(BaseCommand):
+    help = 'Downsample camera counts older than the retention window into rollups and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.COUNT_RETENTION_DAYS,
+            help='Retention window in days (default: COUNT_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--bucket-seconds',
+            type=int,
+            default=settings.COUNT_ROLLUP_BUCKET_SECONDS,
+            help='Rollup bucket width in seconds (default: COUNT_ROLLUP_BUCKET_SECONDS)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.COUNT_RETENTION_CHUNK_SIZE,
+            help='Rows downsampled and deleted per transaction',
+        )
+        parser.add_argument(
+            '--max-chunks',
+            type=int,
+            default=None,
+            help='Stop after this many chunks (resume later by running again)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between chunks',
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Do not write raw rows to COUNT_ARCHIVE_DIR before deleting them',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows are out of the retention window',
+        )
+
+    def handle(self, *args, **options):
+        if options['bucket_seconds'] <= 0 or options['chunk_size'] <= 0:
+            raise CommandError('--bucket-seconds and --chunk-size must be positive')
+
+        cutoff = retention_cutoff(options['older_than_days'])
+
+        if options['dry_run']:
+            pending = CameraCount.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f'{pending} counts older than {cutoff} would be downsampled')
+            return
+
+        self.stdout.write(f'Downsampling counts older than {cutoff}...')
+
+        def report(result):
+            if result.chunks % 10 == 0:
+                self.stdout.write(
+                    f'  {result.rows} rows in {result.chunks} chunks '
+                    f'({result.rows_per_second:.0f} rows/s)'
+                )
+
+        result = run_retention(
+            older_than_days=options['older_than_days'],
+            bucket_seconds=options['bucket_seconds'],
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+            pause=options['pause'],
+            archive=False if options['no_archive'] else None,
+            progress=report,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nDownsampled {result.rows} counts in {result.chunks} chunks '
+                f'({result.rollups_created} rollups created, {result.rollups_updated} updated) '
+                f'in {result.elapsed:.2f}s - {result.rows_per_second:.0f} rows/s'
+            )
+        )
@@ -0,0 +1,53 @@
+"""
+Django management command that runs every camera processor
+Usage: python manage.py run_camera_workers [--interval 5] [--once]
+
+Run exactly one of these next to the web servers (systemd, supervisord or a
+container of its own). It picks up which cameras and rooms to process from
+the database (see camera/workers.py), so the web tier only records intent and
+inference never competes with request handling.
+"""
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.workers import CameraWorkerSupervisor
+
+
+class Command(BaseCommand):
+    help = 'Run the camera processors wanted in the database, reconciling periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.CAMERA_WORKER_POLL_SECONDS,
+            help='Seconds between reconcile passes (default: CAMERA_WORKER_POLL_SECONDS)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single reconcile pass and exit (processors are stopped again)',
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] <= 0:
+            raise CommandError('--interval must be positive')
+
+        supervisor = CameraWorkerSupervisor()
+
+        if options['once']:
+            result = supervisor.reconcile()
+            supervisor.shutdown()
+            self.stdout.write(
+                f'Started {len(result.started)}, stopped {len(result.stopped)}, failed {len(result.failed)}'
+            )
+            return
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: supervisor.stop())
+
+        self.stdout.write(f'Running camera workers (every {options["interval"]}s, Ctrl+C to stop)...')
+        supervisor.run(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Camera workers stopped'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CameraCountRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('bucket_seconds', models.IntegerField(help_text='Bucket width in seconds')),
+                ('samples', models.IntegerField(default=0, help_text='Number of raw counts folded into this bucket')),
+                ('people_count_sum', models.BigIntegerField(default=0)),
+                ('people_count_max', models.IntegerField(default=0)),
+                ('frames_processed', models.BigIntegerField(default=0)),
+                ('inference_time_ms_sum', models.FloatField(default=0.0)),
+                ('camera', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='camera.camera')),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='camera.room')),
+            ],
+            options={
+                'verbose_name_plural': 'Camera Count Rollups',
+                'ordering': ['-bucket_start'],
+                'indexes': [models.Index(fields=['camera', '-bucket_start'], name='camera_came_camera__87b43a_idx'), models.Index(fields=['room', '-bucket_start'], name='camera_came_room_id_113602_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0002_cameracountrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='latest_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='camera',
+            name='latest_count_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='latest_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='latest_count_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
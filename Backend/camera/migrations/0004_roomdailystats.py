@@ -0,0 +1,36 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0003_camera_latest_count_camera_latest_count_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('samples', models.IntegerField(default=0)),
+                ('count_sum', models.BigIntegerField(default=0)),
+                ('peak_count', models.IntegerField(default=0)),
+                ('peak_at', models.DateTimeField(blank=True, null=True)),
+                ('ewma_count', models.FloatField(default=0.0, help_text='Exponentially weighted moving average of the count')),
+                ('person_minutes', models.FloatField(default=0.0, help_text='Integral of people count over time')),
+                ('occupied_minutes', models.FloatField(default=0.0, help_text='Minutes with at least one person present')),
+                ('last_count', models.IntegerField(default=0)),
+                ('last_count_at', models.DateTimeField(blank=True, null=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='camera.room')),
+            ],
+            options={
+                'verbose_name_plural': 'Room Daily Stats',
+                'ordering': ['-date'],
+                'unique_together': {('room', 'date')},
+            },
+        ),
+    ]
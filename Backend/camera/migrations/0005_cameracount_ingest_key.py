@@ -0,0 +1,24 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0004_roomdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameracount',
+            name='ingest_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='cameracount',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
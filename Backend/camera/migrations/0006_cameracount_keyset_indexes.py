@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0005_cameracount_ingest_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cameracount',
+            name='camera_came_camera__20b758_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cameracount',
+            name='camera_came_room_id_724ec9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cameracount',
+            index=models.Index(fields=['-timestamp', '-id'], name='camera_came_timesta_1d692f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cameracount',
+            index=models.Index(fields=['camera', '-timestamp', '-id'], name='camera_came_camera__7285c1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cameracount',
+            index=models.Index(fields=['room', '-timestamp', '-id'], name='camera_came_room_id_ae8b4a_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+def copy_requested_status(apps, schema_editor):
+    """Until now status held the request: anything but 'inactive' was wanted"""
+    for name in ('Camera', 'Room'):
+        apps.get_model('camera', name).objects.exclude(status='inactive').update(processing_requested=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0006_cameracount_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='processing_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='processing_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(copy_requested_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.8 on 2026-10-19 00:17
+
+from django.db import migrations, models
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """Fold rollups stored twice for one owner and bucket into the first one"""
+    CameraCountRollup = apps.get_model('camera', 'CameraCountRollup')
+    kept = {}
+    for rollup in CameraCountRollup.objects.order_by('id').iterator():
+        key = (rollup.camera_id, rollup.room_id, rollup.bucket_start, rollup.bucket_seconds)
+        first = kept.setdefault(key, rollup)
+        if first is rollup:
+            continue
+        first.samples += rollup.samples
+        first.people_count_sum += rollup.people_count_sum
+        first.people_count_max = max(first.people_count_max, rollup.people_count_max)
+        first.frames_processed += rollup.frames_processed
+        first.inference_time_ms_sum += rollup.inference_time_ms_sum
+        first.save()
+        rollup.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0007_processing_requested'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cameracountrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('camera__isnull', False), ('room__isnull', False)), fields=('camera', 'room', 'bucket_start', 'bucket_seconds'), name='unique_rollup_camera_room_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='cameracountrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', True)), fields=('camera', 'bucket_start', 'bucket_seconds'), name='unique_rollup_camera_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='cameracountrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('camera__isnull', True)), fields=('room', 'bucket_start', 'bucket_seconds'), name='unique_rollup_room_bucket'),
+        ),
+    ]
@@ -1,9 +1,16 @@
 """
 Camera app models
 """
-from django.db import models
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 
+from core.versioning import bump_version
+from .live import publish_count
+
 
 class Room(models.Model):
     """
@@ -19,12 +26,18 @@ class Room(models.Model):
     camera_ip = models.CharField(max_length=255, help_text="Camera IP address or URL")
     is_active = models.BooleanField(default=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='inactive')
+    # Set by start/stop; status is what run_camera_workers reports back
+    processing_requested = models.BooleanField(default=False)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_updated = models.DateTimeField(null=True, blank=True, help_text="Last time counts were updated")
     
+    # Denormalised from the newest CameraCount (kept current by CameraCount.save)
+    latest_count = models.IntegerField(default=0)
+    latest_count_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -37,13 +50,19 @@ class Room(models.Model):
     
     def get_latest_count(self):
         """Get the most recent people count for this room"""
-        latest = self.counts.first()
-        return latest.people_count if latest else 0
+        return self.latest_count
     
     def get_latest_count_timestamp(self):
         """Get the timestamp of the most recent count"""
-        latest = self.counts.first()
-        return latest.timestamp if latest else None
+        return self.latest_count_at
+    
+    def get_rtsp_url(self):
+        """
+        RTSP URL of the room's camera (camera_ip may already be a full URL)
+        """
+        if '://' in self.camera_ip:
+            return self.camera_ip
+        return f"rtsp://{self.camera_ip}:554/"
 
 
 class Camera(models.Model):
@@ -66,6 +85,8 @@ class Camera(models.Model):
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='inactive')
     is_active = models.BooleanField(default=True)
+    # Set by start/stop; status is what run_camera_workers reports back
+    processing_requested = models.BooleanField(default=False)
     
     # Configuration
     resolution_width = models.IntegerField(default=1920)
@@ -78,6 +99,10 @@ class Camera(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     last_connection = models.DateTimeField(null=True, blank=True)
     
+    # Denormalised from the newest CameraCount (kept current by CameraCount.save)
+    latest_count = models.IntegerField(default=0)
+    latest_count_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Cameras'
@@ -94,6 +119,10 @@ class Camera(models.Model):
         return f"rtsp://{self.ip_address}:{self.port}{self.rtsp_path}"
 
 
+# Resources whose data changes with every new count (see core/versioning.py)
+COUNT_DATA_VERSIONS = ('counts', 'rooms', 'cameras')
+
+
 class CameraCount(models.Model):
     """
     Stores people count data from camera
@@ -108,17 +137,213 @@ class CameraCount(models.Model):
     frames_processed = models.IntegerField(default=0)
     inference_time_ms = models.FloatField(default=0.0, help_text="Average inference time in milliseconds")
     
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Defaults to the time of the write; bulk ingestion sets the bucket start
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Client supplied (or derived) key that makes bulk ingestion idempotent
+    ingest_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = 'Camera Counts'
+        # Match the (timestamp, id) order of KeysetPagination
         indexes = [
-            models.Index(fields=['camera', '-timestamp']),
-            models.Index(fields=['room', '-timestamp']),
+            models.Index(fields=['-timestamp', '-id']),
+            models.Index(fields=['camera', '-timestamp', '-id']),
+            models.Index(fields=['room', '-timestamp', '-id']),
         ]
     
     def __str__(self):
         if self.room:
             return f"{self.room.name} - {self.people_count} people at {self.timestamp}"
         return f"{self.camera.name} - {self.people_count} people at {self.timestamp}"
+    
+    def save(self, *args, **kwargs):
+        """Save the count and update the latest count and daily stats of its owners in the same transaction"""
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                owners = self.update_latest()
+                if self.room_id:
+                    RoomDailyStats.record(self)
+                # Live streams and ETags only ever see committed counts
+                transaction.on_commit(lambda: publish_count(self, owners))
+                transaction.on_commit(lambda: bump_version(*COUNT_DATA_VERSIONS))
+    
+    def update_latest(self):
+        """
+        Push this count into Room/Camera.latest_count
+        Single conditional UPDATE per owner, so an older count written late
+        never overwrites a newer one. Returns the owners ('room', 'camera')
+        whose latest count it became.
+        """
+        newer_or_unset = Q(latest_count_at__isnull=True) | Q(latest_count_at__lte=self.timestamp)
+        owners = []
+        if self.room_id and Room.objects.filter(newer_or_unset, pk=self.room_id).update(
+            latest_count=self.people_count,
+            latest_count_at=self.timestamp,
+            last_updated=self.timestamp,
+        ):
+            owners.append('room')
+        if self.camera_id and Camera.objects.filter(newer_or_unset, pk=self.camera_id).update(
+            latest_count=self.people_count,
+            latest_count_at=self.timestamp,
+        ):
+            owners.append('camera')
+        return owners
+
+
+class CameraCountRollup(models.Model):
+    """
+    Downsampled people count data
+    Each entry aggregates every raw CameraCount of a camera or room that fell
+    into one bucket, so the raw rows can be deleted once they age out
+    """
+    camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name='rollups', null=True, blank=True)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='rollups', null=True, blank=True)
+    bucket_start = models.DateTimeField()
+    bucket_seconds = models.IntegerField(help_text="Bucket width in seconds")
+    
+    # Aggregates (sums are kept so buckets can be merged chunk by chunk)
+    samples = models.IntegerField(default=0, help_text="Number of raw counts folded into this bucket")
+    people_count_sum = models.BigIntegerField(default=0)
+    people_count_max = models.IntegerField(default=0)
+    frames_processed = models.BigIntegerField(default=0)
+    inference_time_ms_sum = models.FloatField(default=0.0)
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        verbose_name_plural = 'Camera Count Rollups'
+        indexes = [
+            models.Index(fields=['camera', '-bucket_start']),
+            models.Index(fields=['room', '-bucket_start']),
+        ]
+        # One bucket per owner, so concurrent retention runs cannot both
+        # create it (NULL owners never compare equal, hence one per shape)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['camera', 'room', 'bucket_start', 'bucket_seconds'],
+                condition=Q(camera__isnull=False, room__isnull=False),
+                name='unique_rollup_camera_room_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['camera', 'bucket_start', 'bucket_seconds'],
+                condition=Q(room__isnull=True),
+                name='unique_rollup_camera_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['room', 'bucket_start', 'bucket_seconds'],
+                condition=Q(camera__isnull=True),
+                name='unique_rollup_room_bucket',
+            ),
+        ]
+    
+    def __str__(self):
+        owner = self.room.name if self.room else self.camera.name
+        return f"{owner} - avg {self.people_count_avg:.1f} people from {self.bucket_start}"
+    
+    @property
+    def people_count_avg(self):
+        """Average people count over the bucket"""
+        return self.people_count_sum / self.samples if self.samples else 0.0
+    
+    @property
+    def inference_time_ms_avg(self):
+        """Average inference time over the bucket"""
+        return self.inference_time_ms_sum / self.samples if self.samples else 0.0
+
+
+class RoomDailyStats(models.Model):
+    """
+    Running occupancy statistics for one room on one day
+    Updated incrementally on every count write, so reports never rescan
+    CameraCount however much history there is
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    
+    samples = models.IntegerField(default=0)
+    count_sum = models.BigIntegerField(default=0)
+    peak_count = models.IntegerField(default=0)
+    peak_at = models.DateTimeField(null=True, blank=True)
+    ewma_count = models.FloatField(default=0.0, help_text="Exponentially weighted moving average of the count")
+    
+    # Time-weighted sums: each count is held until the next one (gaps are capped)
+    person_minutes = models.FloatField(default=0.0, help_text="Integral of people count over time")
+    occupied_minutes = models.FloatField(default=0.0, help_text="Minutes with at least one person present")
+    
+    last_count = models.IntegerField(default=0)
+    last_count_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Room Daily Stats'
+        unique_together = ['room', 'date']
+    
+    def __str__(self):
+        return f"{self.room.name} - {self.date} (peak {self.peak_count})"
+    
+    @property
+    def mean_count(self):
+        """Plain mean of the day's counts"""
+        return self.count_sum / self.samples if self.samples else 0.0
+    
+    @classmethod
+    def locked(cls, room_id, date):
+        """The stats row of a room and day, created if needed and locked for update"""
+        cls.objects.get_or_create(room_id=room_id, date=date)
+        return cls.objects.select_for_update().get(room_id=room_id, date=date)
+    
+    @classmethod
+    def record(cls, count):
+        """
+        Fold one CameraCount into its room's stats row for the day
+        Must run inside the transaction that wrote the count
+        """
+        stats = cls.locked(count.room_id, timezone.localdate(count.timestamp))
+        stats.apply(count)
+        stats.save()
+        return stats
+    
+    @classmethod
+    def record_many(cls, counts):
+        """
+        Fold many CameraCounts in with one locked read and one write per room and day
+        Must run inside the transaction that wrote the counts
+        """
+        groups = defaultdict(list)
+        for count in counts:
+            if count.room_id:
+                groups[(count.room_id, timezone.localdate(count.timestamp))].append(count)
+        # Sorted so concurrent writers always lock rows in the same order
+        for (room_id, date), group in sorted(groups.items()):
+            stats = cls.locked(room_id, date)
+            for count in sorted(group, key=lambda count: count.timestamp):
+                stats.apply(count)
+            stats.save()
+    
+    def apply(self, count):
+        """Fold one CameraCount into this row (in memory; the caller saves)"""
+        people = count.people_count
+        self.samples += 1
+        self.count_sum += people
+        if self.peak_at is None or people > self.peak_count:
+            self.peak_count = people
+            self.peak_at = count.timestamp
+
+        # EWMA and time-weighted sums only advance with in-order counts
+        in_order = self.last_count_at is None or count.timestamp >= self.last_count_at
+        if self.last_count_at is None:
+            self.ewma_count = float(people)
+        elif in_order:
+            alpha = settings.ROOM_STATS_EWMA_ALPHA
+            self.ewma_count = alpha * people + (1 - alpha) * self.ewma_count
+            held = (count.timestamp - self.last_count_at).total_seconds()
+            held = min(held, settings.ROOM_STATS_MAX_GAP_SECONDS) / 60
+            self.person_minutes += self.last_count * held
+            if self.last_count > 0:
+                self.occupied_minutes += held
+
+        if in_order:
+            self.last_count = people
+            self.last_count_at = count.timestamp
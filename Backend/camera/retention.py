@@ -0,0 +1,206 @@
+"""
+Count retention and downsampling
+Raw CameraCount rows older than the retention window are folded into
+CameraCountRollup buckets and then deleted in small, id-ordered chunks.
+
+Each chunk is merged and deleted inside its own transaction, so the job can be
+interrupted at any point and simply re-run: the rows still in the table are
+exactly the rows that have not been downsampled yet.
+
+When COUNT_ARCHIVE_DIR is set, the raw rows of each chunk are also written to
+the columnar archive (see archive.py) before they are deleted.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.versioning import bump_version
+from .archive import archive_count_rows, archive_enabled
+from .models import CameraCount, CameraCountRollup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionResult:
+    """Summary of a retention run"""
+    rows: int = 0
+    chunks: int = 0
+    rollups_created: int = 0
+    rollups_updated: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def bucket_start_for(timestamp: datetime, bucket_seconds: int) -> datetime:
+    """Floor a timestamp to the start of its bucket (buckets are aligned to the epoch)"""
+    epoch = int(timestamp.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % bucket_seconds, tz=dt_timezone.utc)
+
+
+def retention_cutoff(older_than_days: Optional[int] = None) -> datetime:
+    """Timestamp before which raw counts are considered out of the retention window"""
+    if older_than_days is None:
+        older_than_days = settings.COUNT_RETENTION_DAYS
+    return timezone.now() - timedelta(days=older_than_days)
+
+
+def downsample_chunk(cutoff: datetime, bucket_seconds: int, chunk_size: int, after_id: int = 0,
+                     archive: bool = False):
+    """
+    Downsample and delete one chunk of raw counts older than cutoff
+
+    Args:
+        cutoff: Only rows with a timestamp before this are processed
+        bucket_seconds: Width of the rollup buckets
+        chunk_size: Maximum number of raw rows handled in this transaction
+        after_id: Keyset position; only rows with a greater id are considered
+        archive: Write the raw rows to the columnar archive before deleting them
+
+    Returns:
+        tuple: (rows processed, last id processed, rollups created, rollups updated)
+    """
+    with transaction.atomic():
+        rows = list(
+            CameraCount.objects
+            .filter(timestamp__lt=cutoff, id__gt=after_id)
+            .order_by('id')
+            .values_list(
+                'id', 'camera_id', 'room_id', 'people_count',
+                'frames_processed', 'inference_time_ms', 'timestamp'
+            )[:chunk_size]
+        )
+        if not rows:
+            return 0, after_id, 0, 0
+
+        # Aggregate the chunk in memory, keyed by (camera, room, bucket)
+        buckets = {}
+        for _, camera_id, room_id, people_count, frames, inference_ms, timestamp in rows:
+            key = (camera_id, room_id, bucket_start_for(timestamp, bucket_seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = CameraCountRollup(
+                    camera_id=camera_id,
+                    room_id=room_id,
+                    bucket_start=key[2],
+                    bucket_seconds=bucket_seconds,
+                )
+            bucket.samples += 1
+            bucket.people_count_sum += people_count
+            bucket.people_count_max = max(bucket.people_count_max, people_count)
+            bucket.frames_processed += frames
+            bucket.inference_time_ms_sum += inference_ms
+
+        # Merge into rollups left behind by earlier chunks or runs
+        existing = (
+            CameraCountRollup.objects
+            .select_for_update()
+            .filter(
+                bucket_seconds=bucket_seconds,
+                bucket_start__in={key[2] for key in buckets},
+            )
+        )
+        to_update = []
+        for rollup in existing:
+            bucket = buckets.pop((rollup.camera_id, rollup.room_id, rollup.bucket_start), None)
+            if bucket is None:
+                continue
+            rollup.samples += bucket.samples
+            rollup.people_count_sum += bucket.people_count_sum
+            rollup.people_count_max = max(rollup.people_count_max, bucket.people_count_max)
+            rollup.frames_processed += bucket.frames_processed
+            rollup.inference_time_ms_sum += bucket.inference_time_ms_sum
+            to_update.append(rollup)
+
+        if to_update:
+            CameraCountRollup.objects.bulk_update(to_update, [
+                'samples', 'people_count_sum', 'people_count_max',
+                'frames_processed', 'inference_time_ms_sum',
+            ])
+        # A concurrent run that created one of these buckets first makes this
+        # fail on the unique constraint; the chunk rolls back and is redone later
+        CameraCountRollup.objects.bulk_create(buckets.values())
+
+        # Archive writes are idempotent, so a rollback after this point only
+        # means the same rows are archived again on the next run
+        if archive:
+            archive_count_rows(rows)
+
+        ids = [row[0] for row in rows]
+        CameraCount.objects.filter(id__in=ids).delete()
+
+    return len(rows), ids[-1], len(buckets), len(to_update)
+
+
+def run_retention(
+    older_than_days: Optional[int] = None,
+    bucket_seconds: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+    pause: float = 0.0,
+    archive: Optional[bool] = None,
+    progress: Optional[Callable[[RetentionResult], None]] = None,
+) -> RetentionResult:
+    """
+    Downsample and delete every raw count older than the retention window
+
+    Safe to schedule (cron, Celery beat) and safe to interrupt: each chunk
+    commits on its own and a new run picks up from the oldest remaining row.
+
+    Args:
+        older_than_days: Retention window, defaults to COUNT_RETENTION_DAYS
+        bucket_seconds: Rollup bucket width, defaults to COUNT_ROLLUP_BUCKET_SECONDS
+        chunk_size: Rows per transaction, defaults to COUNT_RETENTION_CHUNK_SIZE
+        max_chunks: Stop after this many chunks (None for no limit)
+        pause: Seconds to sleep between chunks to leave room for other writers
+        archive: Archive raw rows before deleting them, defaults to archive_enabled()
+        progress: Optional callback invoked with the running result after each chunk
+
+    Returns:
+        RetentionResult: Totals for the run
+    """
+    bucket_seconds = bucket_seconds or settings.COUNT_ROLLUP_BUCKET_SECONDS
+    chunk_size = chunk_size or settings.COUNT_RETENTION_CHUNK_SIZE
+    cutoff = retention_cutoff(older_than_days)
+    if archive is None:
+        archive = archive_enabled()
+
+    result = RetentionResult()
+    started = time.monotonic()
+    last_id = 0
+
+    while max_chunks is None or result.chunks < max_chunks:
+        processed, last_id, created, updated = downsample_chunk(
+            cutoff, bucket_seconds, chunk_size, after_id=last_id, archive=archive
+        )
+        if not processed:
+            break
+
+        result.rows += processed
+        result.chunks += 1
+        result.rollups_created += created
+        result.rollups_updated += updated
+        result.elapsed = time.monotonic() - started
+        if progress:
+            progress(result)
+        if pause:
+            time.sleep(pause)
+
+    result.elapsed = time.monotonic() - started
+    if result.rows:
+        # History reads now come from rollups/archive instead of raw rows
+        bump_version('counts')
+    logger.info(
+        f"Count retention: {result.rows} rows older than {cutoff} downsampled in "
+        f"{result.chunks} chunks ({result.rows_per_second:.0f} rows/s)"
+    )
+    return result
@@ -2,31 +2,34 @@
 Camera app serializers
 """
 from rest_framework import serializers
-from .models import Camera, CameraCount, Room
+from core.mixins import DynamicFieldsMixin
+from .models import Camera, CameraCount, Room, RoomDailyStats
 
 
-class CameraSerializer(serializers.ModelSerializer):
+class CameraSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Main serializer for Camera model
     """
     rtsp_url = serializers.SerializerMethodField()
+    latest_count_timestamp = serializers.DateTimeField(source='latest_count_at', read_only=True)
     
     class Meta:
         model = Camera
         fields = [
             'id', 'name', 'ip_address', 'port', 'username', 'password',
-            'rtsp_path', 'status', 'is_active', 'resolution_width',
+            'rtsp_path', 'status', 'processing_requested', 'is_active', 'resolution_width',
             'resolution_height', 'fps', 'location', 'created_at',
-            'updated_at', 'last_connection', 'rtsp_url'
+            'updated_at', 'last_connection', 'rtsp_url',
+            'latest_count', 'latest_count_timestamp'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'last_connection']
+        read_only_fields = ['created_at', 'updated_at', 'last_connection', 'latest_count', 'processing_requested']
     
     def get_rtsp_url(self, obj):
         """Get the RTSP URL from the camera"""
         return obj.get_rtsp_url()
 
 
-class CameraCountSerializer(serializers.ModelSerializer):
+class CameraCountSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for camera counts (basic)
     """
@@ -41,28 +44,32 @@ class CameraCountSerializer(serializers.ModelSerializer):
             'timestamp'
         ]
         read_only_fields = ['timestamp']
+        expandable_fields = {
+            'camera': 'camera.serializers.CameraSerializer',
+            'room': 'camera.serializers.RoomSerializer',
+        }
 
 
-class CameraCountDetailSerializer(serializers.ModelSerializer):
+class CameraCountDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Detailed serializer for camera counts with nested objects
+    Detailed serializer for camera counts
+    Flat by default (ids and names); ?expand=camera,room nests the related
+    objects, which the views load with select_related
     """
-    camera = CameraSerializer(read_only=True)
-    room = serializers.SerializerMethodField()
+    camera_name = serializers.CharField(source='camera.name', read_only=True)
+    room_name = serializers.CharField(source='room.name', read_only=True)
     
     class Meta:
         model = CameraCount
         fields = [
-            'id', 'camera', 'room', 'people_count',
+            'id', 'camera', 'camera_name', 'room', 'room_name', 'people_count',
             'frames_processed', 'inference_time_ms', 'timestamp'
         ]
         read_only_fields = ['timestamp']
-    
-    def get_room(self, obj):
-        """Get room serialized data"""
-        if obj.room:
-            return RoomSerializer(obj.room).data
-        return None
+        expandable_fields = {
+            'camera': 'camera.serializers.CameraSerializer',
+            'room': 'camera.serializers.RoomSerializer',
+        }
 
 
 class CameraConnectSerializer(serializers.Serializer):
@@ -76,7 +83,7 @@ class CameraConnectSerializer(serializers.Serializer):
     rtsp_path = serializers.CharField(required=False, allow_blank=True)
 
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Main serializer for Room model
     """
@@ -86,22 +93,24 @@ class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = [
-            'id', 'name', 'camera_ip', 'is_active', 'status',
+            'id', 'name', 'camera_ip', 'is_active', 'status', 'processing_requested',
             'created_at', 'updated_at', 'last_updated',
             'latest_count', 'latest_count_timestamp'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'processing_requested']
     
     def get_latest_count(self, obj):
-        """Get the latest people count for the room"""
-        return obj.get_latest_count()
+        """Get the latest people count (queryset annotation, else the stored column)"""
+        count = getattr(obj, 'current_count', None)
+        return count if count is not None else obj.get_latest_count()
     
     def get_latest_count_timestamp(self, obj):
-        """Get the timestamp of the latest count"""
-        return obj.get_latest_count_timestamp()
+        """Get the timestamp of the latest count (queryset annotation, else the stored column)"""
+        timestamp = getattr(obj, 'current_count_at', None)
+        return timestamp if timestamp is not None else obj.get_latest_count_timestamp()
 
 
-class RoomCountSerializer(serializers.ModelSerializer):
+class RoomCountSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for room counts (recent counts for a room)
     """
@@ -109,3 +118,19 @@ class RoomCountSerializer(serializers.ModelSerializer):
         model = CameraCount
         fields = ['id', 'people_count', 'frames_processed', 'inference_time_ms', 'timestamp']
         read_only_fields = ['timestamp']
+
+
+class RoomDailyStatsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for a room's running daily occupancy stats
+    """
+    mean_count = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = RoomDailyStats
+        fields = [
+            'date', 'samples', 'mean_count', 'ewma_count', 'peak_count',
+            'peak_at', 'person_minutes', 'occupied_minutes',
+            'last_count', 'last_count_at'
+        ]
+        read_only_fields = fields
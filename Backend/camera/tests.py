@@ -0,0 +1,886 @@
+"""
+Camera tests
+"""
+import csv
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import archive
+from .live import LatestCountPoller, broker
+from .models import Camera, CameraCount, CameraCountRollup, Room, RoomDailyStats
+from .retention import run_retention
+from .workers import CameraWorkerSupervisor
+from .yolo_service import get_active_processors
+
+
+class CountRetentionTests(TestCase):
+    """Test downsampling and archiving of old counts"""
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(COUNT_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Nyanza Classroom', camera_ip='192.168.1.50')
+        old = timezone.now() - timedelta(days=40)
+        self.old = old = old.replace(minute=0, second=0, microsecond=0)
+
+        # Two hours of minute counts outside the retention window, one recent count
+        for minute in range(120):
+            count = CameraCount.objects.create(room=self.room, people_count=minute % 10)
+            CameraCount.objects.filter(pk=count.pk).update(timestamp=old + timedelta(minutes=minute))
+        CameraCount.objects.create(room=self.room, people_count=7)
+
+    def test_old_counts_are_downsampled_and_deleted(self):
+        """Test old rows fold into hourly rollups and only recent rows remain"""
+        result = run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+
+        self.assertEqual(result.rows, 120)
+        self.assertEqual(CameraCount.objects.count(), 1)
+        rollups = CameraCountRollup.objects.filter(room=self.room).order_by('bucket_start')
+        self.assertEqual([r.samples for r in rollups], [60, 60])
+        self.assertEqual(rollups[0].people_count_max, 9)
+        self.assertAlmostEqual(rollups[0].people_count_avg, 4.5)
+
+    def test_interrupted_run_resumes(self):
+        """Test a run stopped part way merges cleanly with the next run"""
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25, max_chunks=1)
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+
+        rollups = CameraCountRollup.objects.filter(room=self.room)
+        self.assertEqual(sum(r.samples for r in rollups), 120)
+        self.assertEqual(rollups.count(), 2)
+
+    def test_duplicate_bucket_is_rejected(self):
+        """Test a second rollup of the same owner and bucket fails instead of double counting"""
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+        rollup = CameraCountRollup.objects.filter(room=self.room).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CameraCountRollup.objects.create(
+                room=self.room, bucket_start=rollup.bucket_start, bucket_seconds=3600, samples=1
+            )
+        # Another bucket width or owner is a different bucket
+        CameraCountRollup.objects.create(room=self.room, bucket_start=rollup.bucket_start, bucket_seconds=60)
+        camera = Camera.objects.create(name='Nyanza Cam', ip_address='192.168.1.50')
+        CameraCountRollup.objects.create(
+            camera=camera, room=self.room, bucket_start=rollup.bucket_start, bucket_seconds=3600
+        )
+
+    def test_archive_range_read(self):
+        """Test deleted rows are archived and read back by binary search"""
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25, max_chunks=1)
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+
+        columns = archive.read_range(
+            'room', self.room.id, self.old + timedelta(minutes=30), self.old + timedelta(minutes=90)
+        )
+        self.assertEqual(len(columns['timestamp']), 60)
+        self.assertEqual(int(columns['timestamp'][0]), int((self.old + timedelta(minutes=30)).timestamp()))
+        self.assertEqual(int(columns['people_count'][0]), 0)
+
+    def test_concurrent_appends_keep_every_row(self):
+        """Test appends to the same month from several writers never drop rows"""
+        base = int(self.old.timestamp())
+
+        def writer(offset):
+            for index in range(20):
+                timestamp = base + (index * 4 + offset) * 60
+                archive.append_rows('room', self.room.id, {
+                    name: np.array([value], dtype=dtype) for (name, dtype), value in zip(
+                        archive.COLUMNS, (timestamp, offset, 0, 0.0, offset * 100 + index + 1)
+                    )
+                })
+
+        threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        columns = archive.read_range('room', self.room.id, self.old, self.old + timedelta(hours=2))
+        self.assertEqual(len(columns['timestamp']), 80)
+
+    def test_rows_in_the_same_second_are_all_archived(self):
+        """Test two counts of one room within one second both survive, even when archived twice"""
+        second = self.old - timedelta(days=1)
+        for people_count in (3, 5):
+            count = CameraCount.objects.create(room=self.room, people_count=people_count)
+            CameraCount.objects.filter(pk=count.pk).update(timestamp=second)
+        rows = CameraCount.objects.filter(timestamp=second).values_list(
+            'id', 'camera_id', 'room_id', 'people_count', 'frames_processed', 'inference_time_ms', 'timestamp'
+        )
+        # An interrupted run archives the same rows again
+        archive.archive_count_rows(rows)
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+
+        columns = archive.read_range('room', self.room.id, second, second + timedelta(seconds=1))
+        self.assertEqual(sorted(columns['people_count'].tolist()), [3, 5])
+        self.assertEqual(len(set(columns['id'].tolist())), 2)
+
+    def test_legacy_archive_files_are_read(self):
+        """Test month files written before the id column still read and merge"""
+        timestamp = int(self.old.timestamp())
+        path = archive.month_path('room', self.room.id, archive.month_key(timestamp))
+        path.parent.mkdir(parents=True)
+        with open(path, 'wb') as f:
+            f.write(archive.HEADER.pack(archive.LEGACY_MAGIC, 1))
+            for (name, dtype), value in zip(archive.LEGACY_COLUMNS, (timestamp, 4, 0, 0.0)):
+                f.write(np.array([value], dtype=dtype).tobytes())
+
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+        columns = archive.read_range('room', self.room.id, self.old, self.old + timedelta(seconds=1))
+        self.assertEqual(sorted(columns['people_count'].tolist()), [0, 4])
+
+    def test_history_merges_late_rows_with_archive(self):
+        """Test rows that land behind the archived range are served alongside it"""
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+        late = CameraCount.objects.create(room=self.room, people_count=9)
+        CameraCount.objects.filter(pk=late.pk).update(timestamp=self.old + timedelta(minutes=30, seconds=30))
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.old.isoformat(), 'end': (self.old + timedelta(minutes=32)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 33)
+        self.assertEqual(response.data[1]['id'], late.id)
+        self.assertEqual(response.data[1]['people_count'], 9)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.old.isoformat(), 'bucket': '1h'},
+        )
+        self.assertEqual([p['samples'] for p in response.data['points']], [61, 60, 1])
+
+    def test_history_skips_archived_rows_still_online(self):
+        """Test a chunk archived by a rolled back run is not served twice"""
+        rows = CameraCount.objects.filter(timestamp__lt=self.old + timedelta(hours=1)).values_list(
+            'id', 'camera_id', 'room_id', 'people_count', 'frames_processed', 'inference_time_ms', 'timestamp'
+        )
+        archive.archive_count_rows(rows)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.old.isoformat(), 'bucket': '1h'},
+        )
+        self.assertEqual([p['samples'] for p in response.data['points']], [60, 60, 1])
+
+    def test_history_endpoint_reads_archive(self):
+        """Test the counts endpoint serves archived ranges transparently"""
+        run_retention(older_than_days=30, bucket_seconds=3600, chunk_size=25)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.old.isoformat(), 'bucket': '1h'},
+        )
+        self.assertEqual(response.status_code, 200)
+        points = response.data['points']
+        self.assertEqual([p['samples'] for p in points], [60, 60, 1])
+        self.assertEqual(points[0]['people_count'], 4.5)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.old.isoformat(), 'limit': 5},
+        )
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['people_count'], 7)
+        # Archived rows keep the id they had online
+        self.assertEqual(response.data[1]['people_count'], 9)
+        self.assertFalse(CameraCount.objects.filter(pk=response.data[1]['id']).exists())
+
+
+class LatestCountTests(TestCase):
+    """Test the denormalised latest count on rooms and cameras"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.camera = Camera.objects.create(name='Lab Camera', ip_address='192.168.1.60')
+        self.room = Room.objects.create(name='Gasabo Classroom', camera_ip='192.168.1.60')
+
+    def test_count_write_updates_room_and_camera(self):
+        """Test writing a count updates both owners"""
+        count = CameraCount.objects.create(room=self.room, camera=self.camera, people_count=12)
+        self.room.refresh_from_db()
+        self.camera.refresh_from_db()
+
+        self.assertEqual(self.room.latest_count, 12)
+        self.assertEqual(self.room.latest_count_at, count.timestamp)
+        self.assertEqual(self.camera.latest_count, 12)
+
+        response = self.client.get(f'/api/v1/rooms/{self.room.id}/')
+        self.assertEqual(response.data['latest_count'], 12)
+
+    def test_older_count_does_not_overwrite_newer(self):
+        """Test a late-arriving older count leaves the latest count alone"""
+        CameraCount.objects.create(room=self.room, people_count=5)
+        late = CameraCount(room=self.room, people_count=99)
+        late.timestamp = timezone.now() - timedelta(hours=1)
+        late.update_latest()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.latest_count, 5)
+
+    def test_backfill_command(self):
+        """Test the backfill recomputes latest counts from history"""
+        CameraCount.objects.create(room=self.room, people_count=3)
+        Room.objects.update(latest_count=0, latest_count_at=None)
+
+        call_command('backfill_latest_counts', stdout=StringIO())
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.latest_count, 3)
+        self.assertIsNotNone(self.room.latest_count_at)
+
+    def test_backfill_leaves_rooms_without_counts_alone(self):
+        """Test the backfill keeps last_updated of rooms that have no counts"""
+        last_updated = timezone.now() - timedelta(days=1)
+        empty = Room.objects.create(name='Empty Classroom', camera_ip='10.0.0.9', last_updated=last_updated)
+
+        call_command('backfill_latest_counts', stdout=StringIO())
+        empty.refresh_from_db()
+        self.assertEqual(empty.last_updated, last_updated)
+
+
+class CountHistoryTests(TestCase):
+    """Test range and bucketed count history queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Kirehe Classroom', camera_ip='192.168.1.70')
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        for minute in range(120):
+            count = CameraCount.objects.create(room=self.room, people_count=minute // 60 * 10)
+            CameraCount.objects.filter(pk=count.pk).update(timestamp=self.start + timedelta(minutes=minute))
+
+    def test_bucketed_counts(self):
+        """Test counts aggregate into hourly buckets"""
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': self.start.isoformat(), 'bucket': '1h'},
+        )
+        self.assertEqual(response.status_code, 200)
+        points = response.data['points']
+        self.assertEqual([p['people_count'] for p in points], [0, 10])
+        self.assertEqual([p['samples'] for p in points], [60, 60])
+        self.assertEqual(points[0]['timestamp'], self.start)
+
+    def test_range_and_limit(self):
+        """Test start/end restrict raw rows and limit is capped"""
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/',
+            {'start': (self.start + timedelta(minutes=60)).isoformat(), 'limit': 100000},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 60)
+
+    def test_invalid_params(self):
+        """Test malformed parameters are rejected"""
+        for params in ({'limit': 'abc'}, {'bucket': '5x'}, {'start': 'yesterday'}):
+            response = self.client.get(f'/api/v1/rooms/{self.room.id}/counts/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class RoomDailyStatsTests(TestCase):
+    """Test running per-room stats maintained on ingest"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Gicumbi Classroom', camera_ip='192.168.1.80')
+        self.start = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+
+    def record(self, minute, people):
+        count = CameraCount(room=self.room, people_count=people)
+        count.timestamp = self.start + timedelta(minutes=minute)
+        RoomDailyStats.record(count)
+
+    def test_stats_accumulate(self):
+        """Test peak, time-weighted sums and EWMA update per count"""
+        for minute, people in enumerate([0, 10, 20, 10, 0]):
+            self.record(minute, people)
+
+        stats = RoomDailyStats.objects.get(room=self.room, date=timezone.localdate(self.start))
+        self.assertEqual(stats.samples, 5)
+        self.assertEqual(stats.peak_count, 20)
+        self.assertEqual(stats.peak_at, self.start + timedelta(minutes=2))
+        self.assertAlmostEqual(stats.person_minutes, 40.0)
+        self.assertAlmostEqual(stats.occupied_minutes, 3.0)
+        self.assertAlmostEqual(stats.mean_count, 8.0)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/stats/', {'date': self.start.date().isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['peak_count'], 20)
+
+    def test_count_write_updates_stats(self):
+        """Test saving a count creates today's stats row"""
+        CameraCount.objects.create(room=self.room, people_count=4)
+        response = self.client.get(f'/api/v1/rooms/{self.room.id}/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['samples'], 1)
+        self.assertEqual(response.data['ewma_count'], 4.0)
+
+
+class RoomListQueryTests(TestCase):
+    """Test the room list runs a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_rooms(self, count):
+        for i in range(Room.objects.count(), count):
+            room = Room.objects.create(name=f'Room {i}', camera_ip=f'10.0.0.{i}')
+            CameraCount.objects.create(room=room, people_count=i)
+
+    def test_list_query_count_is_constant(self):
+        """Test 3 rooms and 50 rooms cost the same number of queries"""
+        for rooms in (3, 50):
+            self.create_rooms(rooms)
+            # One COUNT(*) for pagination and one annotated SELECT
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/v1/rooms/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), rooms)
+
+    def test_annotation_is_served(self):
+        """Test the annotated latest count reaches the response"""
+        room = Room.objects.create(name='Nyanza Classroom', camera_ip='10.0.0.1')
+        CameraCount.objects.create(room=room, people_count=11)
+        Room.objects.update(latest_count=0, latest_count_at=None)
+        response = self.client.get(f'/api/v1/rooms/{room.id}/')
+        self.assertEqual(response.data['latest_count'], 11)
+
+
+class SparseFieldsetTests(TestCase):
+    """Test ?fields= and ?expand= on count endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.camera = Camera.objects.create(name='Lab Camera', ip_address='192.168.1.60')
+        self.room = Room.objects.create(name='Lab 1', camera_ip='192.168.1.60')
+        for people in range(20):
+            CameraCount.objects.create(camera=self.camera, room=self.room, people_count=people)
+
+    def test_camera_counts_are_flat_by_default(self):
+        """Test count detail rows carry ids and names, not nested objects"""
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/cameras/{self.camera.id}/counts/')
+        self.assertEqual(response.data[0]['camera'], self.camera.id)
+        self.assertEqual(response.data[0]['room_name'], 'Lab 1')
+
+    def test_expand_and_fields(self):
+        """Test expanded relations load in one query and fields trims the output"""
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f'/api/v1/cameras/{self.camera.id}/counts/',
+                {'expand': 'camera,room', 'fields': 'id,people_count,room'},
+            )
+        row = response.data[0]
+        self.assertEqual(set(row), {'id', 'people_count', 'room'})
+        self.assertEqual(row['room']['name'], 'Lab 1')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of camera counts"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Lab 2', camera_ip='192.168.1.90')
+        for people in range(25):
+            CameraCount.objects.create(room=self.room, people_count=people)
+        # Force timestamp ties so the id tie-breaker matters
+        now = timezone.now()
+        CameraCount.objects.filter(people_count__lt=10).update(timestamp=now - timedelta(minutes=1))
+        CameraCount.objects.filter(people_count__gte=10).update(timestamp=now)
+
+    def walk(self, url, params):
+        seen, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            pages += 1
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                return seen, pages, response
+            response = self.client.get(response.data['next'])
+
+    def test_walk_all_pages(self):
+        """Test following next visits every row once, newest first"""
+        seen, pages, last = self.walk('/api/v1/camera-counts/', {'page_size': 10})
+        expected = list(CameraCount.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+        previous = self.client.get(last.data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], expected[10:20])
+
+    def test_room_counts_pages_and_total(self):
+        """Test the per-room counts action paginates with an optional total"""
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/counts/', {'page_size': 10, 'include_total': 'true'}
+        )
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_is_approximate'])
+        seen, _, _ = self.walk(f'/api/v1/rooms/{self.room.id}/counts/', {'page_size': 10})
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_deep_page_costs_one_query(self):
+        """Test a page reached by cursor runs a single seek query"""
+        first = self.client.get('/api/v1/camera-counts/', {'page_size': 5})
+        with self.assertNumQueries(1):
+            self.client.get(first.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a garbled cursor is a 404"""
+        response = self.client.get('/api/v1/camera-counts/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_ordering_is_rejected(self):
+        """Test ?ordering= is a 400 instead of being silently ignored"""
+        response = self.client.get('/api/v1/camera-counts/', {'ordering': 'people_count'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+
+    def test_pages_use_the_keyset_index(self):
+        """Test pages are read in (timestamp, id) order from an index, with no sort"""
+        for queryset in (CameraCount.objects.all(), CameraCount.objects.filter(room=self.room)):
+            plan = queryset.order_by('-timestamp', '-id')[:5].explain()
+            self.assertIn('INDEX', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(LIVE_POLL_SECONDS=0)
+class LiveStreamTests(TestCase):
+    """Test Server-Sent Events count streams"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Lab 3', camera_ip='192.168.1.95')
+        self.other = Room.objects.create(name='Lab 4', camera_ip='192.168.1.96')
+
+    def open_stream(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry:'))
+        self.addCleanup(response.close)
+        return stream
+
+    def write_count(self, room, people):
+        with self.captureOnCommitCallbacks(execute=True):
+            CameraCount.objects.create(room=room, people_count=people)
+
+    def test_room_stream_receives_committed_counts(self):
+        """Test a room stream gets its own counts only"""
+        stream = self.open_stream(f'/api/v1/rooms/{self.room.id}/live/')
+        self.write_count(self.other, 3)
+        self.write_count(self.room, 9)
+
+        event = next(stream).decode()
+        self.assertIn('event: count', event)
+        self.assertIn('"people_count": 9', event)
+
+    def test_all_rooms_stream(self):
+        """Test the multiplexed stream carries every room"""
+        # Snapshot events left in the shared broker by earlier tests come first
+        snapshot = len(broker.latest('room:'))
+        stream = self.open_stream('/api/v1/rooms/live/')
+        for _ in range(snapshot):
+            next(stream)
+        self.write_count(self.room, 1)
+        self.write_count(self.other, 2)
+
+        events = [next(stream).decode() for _ in range(2)]
+        self.assertIn(f'"room": {self.room.id}', events[0])
+        self.assertIn(f'"room": {self.other.id}', events[1])
+
+    def test_resume_from_last_event_id(self):
+        """Test reconnecting clients replay missed events from the ring buffer"""
+        self.write_count(self.room, 5)
+        last = broker.publish([f'room:{self.room.id}'], {'people_count': 6})
+        self.write_count(self.room, 7)
+
+        response = self.client.get(
+            f'/api/v1/rooms/{self.room.id}/live/',
+            HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=str(last['id']),
+        )
+        stream = iter(response.streaming_content)
+        next(stream)
+        self.assertIn('"people_count": 7', next(stream).decode())
+        response.close()
+
+    def test_poller_publishes_counts_from_other_processes(self):
+        """Test latest counts written elsewhere reach the broker once"""
+        poller = LatestCountPoller(broker)
+        poller.poll()
+        stream = self.open_stream(f'/api/v1/rooms/{self.room.id}/live/')
+        # As run_camera_workers would: the row changes, nothing is published here
+        Room.objects.filter(pk=self.room.pk).update(latest_count=12, latest_count_at=timezone.now())
+        self.assertEqual(poller.poll(), 1)
+        self.assertIn('"people_count": 12', next(stream).decode())
+        self.assertEqual(poller.poll(), 0)
+
+        # Counts saved in this process were already published
+        self.write_count(self.room, 13)
+        next(stream)
+        self.assertEqual(poller.poll(), 0)
+
+    def test_poller_publishes_late_commits(self):
+        """Test a count committed after a newer one of another room is still published"""
+        # Ahead of anything earlier tests left in the shared broker for these ids
+        now = timezone.now() + timedelta(hours=1)
+        poller = LatestCountPoller(broker)
+        poller.poll()
+        stream = self.open_stream(f'/api/v1/rooms/{self.other.id}/live/')
+        Room.objects.filter(pk=self.room.pk).update(latest_count=4, latest_count_at=now)
+        self.assertEqual(poller.poll(), 1)
+        # Written a moment earlier by another worker, committed only now
+        Room.objects.filter(pk=self.other.pk).update(latest_count=6, latest_count_at=now - timedelta(seconds=5))
+        self.assertEqual(poller.poll(), 1)
+        self.assertIn('"people_count": 6', next(stream).decode())
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETags and 304 responses driven by data versions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Lab 5', camera_ip='192.168.1.97')
+
+    def test_not_modified_without_queries(self):
+        """Test a matching If-None-Match is answered before any query"""
+        response = self.client.get('/api/v1/rooms/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/v1/rooms/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_new_count_changes_etag(self):
+        """Test a committed count invalidates room and count ETags"""
+        urls = ['/api/v1/rooms/', f'/api/v1/rooms/{self.room.id}/counts/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            CameraCount.objects.create(room=self.room, people_count=4)
+
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_varies_with_query(self):
+        """Test each representation gets its own ETag"""
+        full = self.client.get('/api/v1/rooms/')
+        sparse = self.client.get('/api/v1/rooms/', {'fields': 'id'})
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+
+
+class RoomSummaryTests(TestCase):
+    """Test the rooms summary endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.rooms = [
+            Room.objects.create(name=f'Hall {i}', camera_ip=f'10.1.0.{i}') for i in range(3)
+        ]
+
+    def test_sparklines(self):
+        """Test every room gets a fixed-length sparkline in two queries"""
+        now = timezone.now()
+        count = CameraCount.objects.create(room=self.rooms[0], people_count=12)
+        CameraCount.objects.filter(pk=count.pk).update(timestamp=now - timedelta(minutes=25))
+        CameraCount.objects.create(room=self.rooms[1], people_count=4)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/rooms/summary/', {'window': '1h', 'points': 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['bucket_seconds'], 600)
+        rooms = {room['id']: room for room in response.data['rooms']}
+        self.assertEqual(len(rooms), 3)
+        self.assertTrue(all(len(room['sparkline']) == 6 for room in rooms.values()))
+        self.assertEqual(rooms[self.rooms[1].id]['sparkline'][-1], 4)
+        self.assertIn(12, rooms[self.rooms[0].id]['sparkline'][-4:-1])
+        self.assertEqual(rooms[self.rooms[2].id]['sparkline'], [None] * 6)
+        self.assertEqual(rooms[self.rooms[1].id]['latest_count'], 4)
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/rooms/summary/', {'window': '1h', 'points': 6})
+
+    def test_invalid_window(self):
+        """Test malformed parameters are rejected"""
+        response = self.client.get('/api/v1/rooms/summary/', {'window': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(LIVE_POLL_SECONDS=0)
+class AsyncEndpointTests(TestCase):
+    """Test the async (ASGI) count and live endpoints"""
+
+    def setUp(self):
+        self.client = AsyncClient()
+        self.room = Room.objects.create(name='Lab 6', camera_ip='192.168.1.98')
+        self.camera = Camera.objects.create(name='Lab 6 Cam', ip_address='192.168.1.98')
+        for people in (3, 5):
+            CameraCount.objects.create(room=self.room, camera=self.camera, people_count=people)
+
+    async def test_counts_match_sync_endpoint(self):
+        """Test async history returns the same body as the DRF endpoint"""
+        response = await self.client.get(f'/api/v1/async/rooms/{self.room.id}/counts/', {'fields': 'id,people_count'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['people_count'] for row in response.json()], [5, 3])
+        self.assertEqual(set(response.json()[0]), {'id', 'people_count'})
+
+        response = await self.client.get(f'/api/v1/async/cameras/{self.camera.id}/counts/', {'bucket': '1h'})
+        self.assertEqual(sum(point['samples'] for point in response.json()['points']), 2)
+
+    async def test_latest_count(self):
+        """Test the async latest count and its 404s"""
+        response = await self.client.get(f'/api/v1/async/cameras/{self.camera.id}/latest-count/')
+        self.assertEqual(response.json()['people_count'], 5)
+        response = await self.client.get('/api/v1/async/cameras/999/latest-count/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_live_stream(self):
+        """Test the async stream starts with the snapshot and receives published counts"""
+        response = await self.client.get(f'/api/v1/async/rooms/{self.room.id}/live/')
+        stream = response.streaming_content.__aiter__()
+        self.assertTrue((await stream.__anext__()).startswith(b'retry:'))
+        self.assertIn(b'"people_count": 5', await stream.__anext__())
+
+        broker.publish([f'room:{self.room.id}'], {'room': self.room.id, 'people_count': 8})
+        self.assertIn(b'"people_count": 8', await stream.__anext__())
+        await stream.aclose()
+
+    async def test_drf_live_stream_is_async_under_asgi(self):
+        """Test the DRF live endpoint streams events as they come instead of buffering"""
+        response = await self.client.get(f'/api/v1/rooms/{self.room.id}/live/', headers={'Accept': 'text/event-stream'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+        stream = response.streaming_content.__aiter__()
+        self.assertTrue((await stream.__anext__()).startswith(b'retry:'))
+        self.assertIn(b'"people_count": 5', await stream.__anext__())
+
+        broker.publish([f'room:{self.room.id}'], {'room': self.room.id, 'people_count': 9})
+        self.assertIn(b'"people_count": 9', await stream.__anext__())
+        await stream.aclose()
+
+    async def test_conditional_get(self):
+        """Test async endpoints send the ETag of their DRF action and answer 304 from it"""
+        url = f'/api/v1/async/cameras/{self.camera.id}/latest-count/'
+        response = await self.client.get(url)
+        self.assertIn('ETag', response)
+        response = await self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_authentication(self):
+        """Test async endpoints reject a bad API key like the DRF endpoints"""
+        response = await self.client.get(
+            f'/api/v1/async/rooms/{self.room.id}/counts/', headers={'Authorization': 'ApiKey not-a-key'}
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class CountExportTests(TestCase):
+    """Test the streaming count export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Lab 7', camera_ip='192.168.1.99')
+        self.other = Room.objects.create(name='Lab 8', camera_ip='192.168.1.100')
+        for people in range(5):
+            CameraCount.objects.create(room=self.room, people_count=people)
+        CameraCount.objects.create(room=self.other, people_count=50)
+
+    def export(self, **params):
+        response = self.client.get('/api/v1/camera-counts/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(COUNT_EXPORT_CHUNK_SIZE=2)
+    def test_csv(self):
+        """Test CSV export across several chunks, filtered by room"""
+        rows = list(csv.DictReader(StringIO(self.export(format='csv', room=self.room.id))))
+        self.assertEqual([int(row['people_count']) for row in rows], [0, 1, 2, 3, 4])
+        self.assertEqual(rows[0]['room_id'], str(self.room.id))
+
+    def test_ndjson(self):
+        """Test NDJSON export, one object per line"""
+        lines = self.export(format='ndjson').splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[-1])['people_count'], 50)
+
+    def test_range(self):
+        """Test start/end filtering and validation"""
+        CameraCount.objects.filter(people_count=0).update(timestamp=timezone.now() - timedelta(days=3))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.export(format='ndjson', start=since).splitlines()), 5)
+        response = self.client.get('/api/v1/camera-counts/export/', {'format': 'csv', 'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(COUNT_EXPORT_CHUNK_SIZE=2)
+    async def test_asgi(self):
+        """Test the export is streamed asynchronously under ASGI"""
+        response = await AsyncClient().get('/api/v1/camera-counts/export/', {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks).decode().count('\n'), 6)
+
+
+class BulkIngestTests(TestCase):
+    """Test bulk, idempotent count ingestion"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Lab 9', camera_ip='192.168.1.101')
+        self.camera = Camera.objects.create(name='Edge 9', ip_address='192.168.1.101')
+        start = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        self.records = [
+            {
+                'camera': self.camera.id,
+                'room': self.room.id,
+                'bucket_start': (start + timedelta(minutes=minute)).isoformat(),
+                'people_count': minute,
+                'frames_processed': 60,
+                'inference_time_ms': 40.0,
+            }
+            for minute in range(30)
+        ]
+
+    def post(self, payload):
+        return self.client.post('/api/v1/camera-counts/bulk/', payload, format='json')
+
+    def test_ingest(self):
+        """Test a batch is stored and folded into latest counts and daily stats"""
+        response = self.post({'records': self.records})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'received': 30, 'created': 30, 'duplicates': 0})
+        self.assertEqual(CameraCount.objects.filter(room=self.room).count(), 30)
+
+        self.room.refresh_from_db()
+        self.camera.refresh_from_db()
+        self.assertEqual(self.room.latest_count, 29)
+        self.assertEqual(self.camera.latest_count, 29)
+        stats = RoomDailyStats.objects.filter(room=self.room)
+        self.assertEqual(sum(day.samples for day in stats), 30)
+        self.assertEqual(stats.order_by('date').last().last_count, 29)
+
+    def test_retry_is_idempotent(self):
+        """Test a retried (partly overlapping) request only stores new records"""
+        self.post(self.records[:20])
+        response = self.post(self.records)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'received': 30, 'created': 10, 'duplicates': 20})
+        response = self.post(self.records)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['duplicates'], 30)
+        self.assertEqual(CameraCount.objects.filter(room=self.room).count(), 30)
+
+    def test_late_batch_publishes_only_updated_owners(self):
+        """Test a batch older than an owner's latest count is not published to its channel"""
+        self.post(self.records[20:])
+        other = Camera.objects.create(name='Edge 10', ip_address='192.168.1.102')
+        late = [dict(record, camera=other.id) for record in self.records[:10]]
+        subscription = broker.subscribe([f'room:{self.room.id}', f'camera:{other.id}'])
+        self.addCleanup(subscription.close)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post(late).status_code, 201)
+
+        event = subscription.get(timeout=0)
+        self.assertEqual(event['channels'], (f'camera:{other.id}',))
+        self.assertEqual(event['data']['people_count'], 9)
+        self.assertIsNone(subscription.get(timeout=0))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.latest_count, 29)
+
+    def test_client_keys(self):
+        """Test client supplied keys, including duplicates within one request"""
+        records = [dict(self.records[0], key='edge-9:1'), dict(self.records[1], key='edge-9:1')]
+        self.assertEqual(self.post(records).data['created'], 1)
+        self.assertTrue(CameraCount.objects.filter(ingest_key='edge-9:1').exists())
+
+    def test_validation(self):
+        """Test an invalid record rejects the whole batch with per-record errors"""
+        records = [
+            self.records[0],
+            {'room': self.room.id, 'bucket_start': 'soon', 'people_count': -1},
+            {'bucket_start': 1700000000, 'people_count': 3},
+            {'room': 999999, 'bucket_start': 1700000000, 'people_count': 3},
+        ]
+        response = self.post(records)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['records']), {'1', '2'})
+        self.assertEqual(len(response.data['records']['1']), 2)
+        self.assertEqual(CameraCount.objects.count(), 0)
+
+        response = self.post(records[:1] + records[3:])
+        self.assertEqual(response.data['records'], {'1': ['room 999999 does not exist']})
+        self.assertEqual(self.post({'records': []}).status_code, 400)
+        with override_settings(COUNT_INGEST_MAX_RECORDS=10):
+            self.assertEqual(self.post(self.records).status_code, 400)
+
+
+class CameraWorkerTests(TestCase):
+    """Test that the web tier records intent and run_camera_workers acts on it"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.camera = Camera.objects.create(name='Lab 10 Cam', ip_address='192.168.1.102')
+        self.supervisor = CameraWorkerSupervisor()
+        self.addCleanup(self.supervisor.shutdown)
+
+    def test_start_and_stop(self):
+        """Test start/stop only record the request; the supervisor runs the processors and reports status"""
+        response = self.client.post(f'/api/v1/cameras/{self.camera.id}/start/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(get_active_processors(), {})
+        self.camera.refresh_from_db()
+        self.assertEqual((self.camera.processing_requested, self.camera.status), (True, 'inactive'))
+        response = self.client.post(f'/api/v1/cameras/{self.camera.id}/start/')
+        self.assertEqual(response.data['error'], 'Processing already requested')
+
+        self.assertEqual(self.supervisor.reconcile().started, [f'camera:{self.camera.id}'])
+        self.assertIn(('camera', self.camera.id), get_active_processors())
+        self.assertEqual(self.supervisor.reconcile().started, [])
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.status, 'active')
+
+        self.assertEqual(self.client.post(f'/api/v1/cameras/{self.camera.id}/stop/').status_code, 202)
+        self.assertEqual(self.client.post(f'/api/v1/cameras/{self.camera.id}/stop/').status_code, 400)
+        self.assertEqual(self.supervisor.reconcile().stopped, [f'camera:{self.camera.id}'])
+        self.assertEqual(get_active_processors(), {})
+        self.camera.refresh_from_db()
+        self.assertEqual((self.camera.processing_requested, self.camera.status), (False, 'inactive'))
+
+    def test_new_room_is_requested(self):
+        """Test creating a room requests processing without starting it in the web tier"""
+        response = self.client.post('/api/v1/rooms/', {'name': 'Lab 10', 'camera_ip': '192.168.1.102'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        room = Room.objects.get(name='Lab 10')
+        self.assertTrue(room.processing_requested)
+        self.assertEqual(room.status, 'inactive')
+        self.assertEqual(get_active_processors(), {})
+
+        self.supervisor.reconcile()
+        self.assertIn(('room', room.id), get_active_processors())
+        self.assertEqual(self.client.post(f'/api/v1/rooms/{room.id}/stop/').status_code, 202)
+        self.supervisor.reconcile()
+        self.assertEqual(get_active_processors(), {})
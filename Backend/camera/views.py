@@ -4,23 +4,43 @@ Camera app views and viewsets
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+import hashlib
 import logging
 
-from .models import Camera, CameraCount, Room
+from core.mixins import SparseFieldsetsMixin
+from core.pagination import KeysetPagination
+from core.renderers import CSVRenderer, EventStreamRenderer, NDJSONRenderer
+from core.versioning import ConditionalGetMixin, DataVersion
+from .models import Camera, CameraCount, Room, RoomDailyStats
 from .serializers import (
     CameraSerializer, CameraCountSerializer,
     CameraCountDetailSerializer, CameraConnectSerializer,
-    RoomSerializer, RoomCountSerializer
+    RoomSerializer, RoomCountSerializer, RoomDailyStatsSerializer
+)
+from .export import astream, csv_stream, export_rows, ndjson_stream
+from .ingest import IngestError, ingest_counts, parse_records
+from .live import broker, live_response, snapshot_events
+from .history import (
+    HistoryParamError, count_history, filter_range, parse_history_params,
+    parse_sparkline_params, parse_timestamp, room_sparklines, serialize_history
 )
-from .yolo_service import start_camera_processing, stop_camera_processing
 
 logger = logging.getLogger(__name__)
 
 
-class CameraViewSet(viewsets.ModelViewSet):
+class CameraViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ModelViewSet):
     """
     Camera ViewSet
     GET /api/v1/cameras/ - List all cameras
@@ -29,9 +49,15 @@ class CameraViewSet(viewsets.ModelViewSet):
     PATCH /api/v1/cameras/{id}/ - Update camera
     DELETE /api/v1/cameras/{id}/ - Delete camera
     
-    POST /api/v1/cameras/{id}/start/ - Start processing
-    POST /api/v1/cameras/{id}/stop/ - Stop processing
+    Every GET accepts ?fields=a,b to return only those fields and
+    ?expand=camera,room to nest related objects on count endpoints.
+    GETs (other than live) carry an ETag and Last-Modified and answer
+    If-None-Match / If-Modified-Since with 304 Not Modified.
+    
+    POST /api/v1/cameras/{id}/start/ - Request processing (run by run_camera_workers)
+    POST /api/v1/cameras/{id}/stop/ - Request that processing stops
     GET /api/v1/cameras/{id}/latest-count/ - Get latest count
+    GET /api/v1/cameras/{id}/live/ - Stream new counts (Server-Sent Events)
     """
     queryset = Camera.objects.all()
     serializer_class = CameraSerializer
@@ -40,10 +66,14 @@ class CameraViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'ip_address', 'location']
     ordering_fields = ['created_at', 'name', 'status']
     ordering = ['-created_at']
+    data_versions = {'*': ('cameras',), 'latest_count': ('counts',), 'counts': ('counts',), 'live': ()}
     
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
-        """Start processing for this camera"""
+        """
+        Request processing for this camera
+        Recorded in the database; run_camera_workers starts the processor
+        """
         camera = self.get_object()
         
         if not camera.is_active:
@@ -51,43 +81,31 @@ class CameraViewSet(viewsets.ModelViewSet):
                 {'error': 'Camera is not active'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        try:
-            success = start_camera_processing(camera)
-            if success:
-                return Response({'status': 'Processing started'})
-            else:
-                return Response(
-                    {'error': 'Processing already running'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        except Exception as e:
-            logger.error(f"Error starting camera processing: {str(e)}")
+        if camera.processing_requested:
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Processing already requested'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        _request_processing(camera, True)
+        return Response({'status': 'Processing requested'}, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['post'])
     def stop(self, request, pk=None):
-        """Stop processing for this camera"""
+        """
+        Request that processing for this camera stops
+        Recorded in the database; run_camera_workers stops the processor
+        """
         camera = self.get_object()
         
-        try:
-            success = stop_camera_processing(camera)
-            if success:
-                return Response({'status': 'Processing stopped'})
-            else:
-                return Response(
-                    {'error': 'No processing running'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        except Exception as e:
-            logger.error(f"Error stopping camera processing: {str(e)}")
+        if not camera.processing_requested:
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'No processing requested'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        _request_processing(camera, False)
+        return Response({'status': 'Processing stop requested'}, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def latest_count(self, request, pk=None):
@@ -95,9 +113,9 @@ class CameraViewSet(viewsets.ModelViewSet):
         camera = self.get_object()
         
         try:
-            latest = camera.counts.first()
+            latest = camera.counts.select_related('camera', 'room').first()
             if latest:
-                serializer = CameraCountSerializer(latest)
+                serializer = CameraCountSerializer(latest, **self.get_sparse_fieldsets())
                 return Response(serializer.data)
             else:
                 return Response(
@@ -113,35 +131,120 @@ class CameraViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def counts(self, request, pk=None):
-        """Get count history for this camera"""
+        """
+        Get count history for this camera
+        GET /api/v1/cameras/{id}/counts/?limit=100
+        GET /api/v1/cameras/{id}/counts/?start=2026-01-01&end=2026-01-08&bucket=1h
+        GET /api/v1/cameras/{id}/counts/?page_size=100 (then follow `next`)
+        """
         camera = self.get_object()
-        limit = request.query_params.get('limit', 100)
         
         try:
-            counts = camera.counts.all()[:int(limit)]
-            serializer = CameraCountDetailSerializer(counts, many=True)
-            return Response(serializer.data)
+            return _count_history_response(
+                request, camera.counts.select_related('camera', 'room'), CameraCountDetailSerializer,
+                owner=('camera', camera.id), serializer_kwargs=self.get_sparse_fieldsets()
+            )
         except Exception as e:
             logger.error(f"Error fetching camera counts: {str(e)}")
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=True, methods=['get'], renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
+    def live(self, request, pk=None):
+        """
+        Stream new counts for this camera as Server-Sent Events
+        GET /api/v1/cameras/{id}/live/
+        """
+        camera = self.get_object()
+        return live_response(request._request, channels=[f'camera:{camera.id}'], initial=snapshot_events(camera, 'camera'))
 
 
-class CameraCountViewSet(viewsets.ReadOnlyModelViewSet):
+class CameraCountViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     CameraCount ViewSet (Read-only)
-    GET /api/v1/camera-counts/ - List all counts
-    GET /api/v1/camera-counts/?camera_id={id} - Filter by camera
+    GET /api/v1/camera-counts/ - List all counts, newest first
+    GET /api/v1/camera-counts/?camera={id} - Filter by camera
+    GET /api/v1/camera-counts/?cursor={next} - Next page (keyset, see KeysetPagination)
     GET /api/v1/camera-counts/{id}/ - Retrieve specific count
+    GET /api/v1/camera-counts/export/?format=csv|ndjson&start=&end=&room= - Stream every matching count
+    POST /api/v1/camera-counts/bulk/ - Ingest a batch of counts from an edge counter
     """
-    queryset = CameraCount.objects.select_related('camera')
+    queryset = CameraCount.objects.select_related('camera', 'room')
     serializer_class = CameraCountSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['camera']
-    ordering_fields = ['timestamp', 'people_count']
-    ordering = ['-timestamp']
+    pagination_class = KeysetPagination
+    # Keyset pages are always (timestamp, id) ordered, so no OrderingFilter
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['camera', 'room']
+    data_versions = {'*': ('counts',)}
+    
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Export counts as CSV (default) or newline-delimited JSON, oldest first
+        GET /api/v1/camera-counts/export/?format=ndjson&start=2026-01-01&end=2026-04-01&room=3
+        
+        Streamed in constant memory (see camera/export.py), so any range can
+        be exported in one request, under WSGI or ASGI. Archived counts are
+        not included.
+        """
+        counts = self.filter_queryset(CameraCount.objects.all())
+        try:
+            for name, lookup in (('start', 'timestamp__gte'), ('end', 'timestamp__lt')):
+                if request.query_params.get(name):
+                    counts = counts.filter(**{lookup: parse_timestamp(request.query_params[name], name)})
+        except HistoryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        renderer = request.accepted_renderer
+        stream = ndjson_stream if renderer.format == 'ndjson' else csv_stream
+        chunks = stream(export_rows(counts))
+        if isinstance(request._request, ASGIRequest):
+            chunks = astream(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = f'attachment; filename="camera-counts.{renderer.format}"'
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Ingest pre-aggregated counts, idempotently (see camera/ingest.py)
+        POST /api/v1/camera-counts/bulk/
+        
+        Request body:
+        {
+            "records": [
+                {"camera": 1, "room": 3, "bucket_start": "2026-03-02T09:00:00Z",
+                 "people_count": 12, "frames_processed": 60, "inference_time_ms": 41.5,
+                 "key": "edge-7:1709370000"}
+            ]
+        }
+        
+        Response (201, or 200 if every record was already stored):
+        {"received": 1, "created": 1, "duplicates": 0}
+        """
+        try:
+            result = ingest_counts(parse_records(request.data))
+        except IngestError as e:
+            body = {'error': str(e)}
+            if e.errors:
+                body['records'] = {str(index): problems for index, problems in e.errors.items()}
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # Only a concurrent request storing the same keys gets here; nothing was saved
+            return Response(
+                {'error': 'Conflicting concurrent ingest, retry the request'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        logger.info(f"Ingested {result.created} of {result.received} counts ({result.duplicates} duplicates)")
+        return Response(
+            {'received': result.received, 'created': result.created, 'duplicates': result.duplicates},
+            status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK
+        )
 
 
 class CameraConnectAPIView(APIView):
@@ -165,12 +268,14 @@ class CameraConnectAPIView(APIView):
     {
         "status": "connected",
         "camera_id": 1,
-        "message": "Camera connected and processing started"
+        "message": "Camera connected and processing requested"
     }
+    
+    Processing itself is started by run_camera_workers.
     """
     
     def post(self, request):
-        """Connect to camera and start processing"""
+        """Connect to camera and request processing"""
         serializer = CameraConnectSerializer(data=request.data)
         
         if not serializer.is_valid():
@@ -207,24 +312,17 @@ class CameraConnectAPIView(APIView):
                 action_text = "Created" if created else "Found existing"
                 logger.info(f"{action_text} camera: {camera.name}")
             
-            # Start processing
-            if start_camera_processing(camera):
-                camera.status = 'active'
-                camera.last_connection = timezone.now()
-                camera.save(update_fields=['status', 'last_connection'])
-                
-                return Response({
-                    'status': 'connected',
-                    'camera_id': camera.id,
-                    'camera_name': camera.name,
-                    'ip_address': camera.ip_address,
-                    'message': 'Camera connected and processing started'
-                }, status=status.HTTP_200_OK)
-            else:
-                return Response(
-                    {'error': 'Failed to start camera processing'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+            # Request processing (picked up by run_camera_workers)
+            if not camera.processing_requested:
+                _request_processing(camera, True)
+            
+            return Response({
+                'status': 'connected',
+                'camera_id': camera.id,
+                'camera_name': camera.name,
+                'ip_address': camera.ip_address,
+                'message': 'Camera connected and processing requested'
+            }, status=status.HTTP_200_OK)
         
         except Camera.DoesNotExist:
             logger.error(f"Camera not found: {camera_id}")
@@ -241,16 +339,24 @@ class CameraConnectAPIView(APIView):
             )
 
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ModelViewSet):
     """
     Room ViewSet for room-based camera management
     GET /api/rooms/ - List all rooms
-    POST /api/rooms/ - Create new room and start camera worker
+    POST /api/rooms/ - Create new room and request its camera worker
     GET /api/rooms/{id}/ - Get room details
     PATCH /api/rooms/{id}/ - Update room
     DELETE /api/rooms/{id}/ - Delete room
     GET /api/rooms/{id}/counts/ - Get time-series counts for room
-    POST /api/rooms/{id}/stop/ - Stop camera worker for room
+    GET /api/rooms/{id}/stats/ - Get running daily occupancy stats for room
+    GET /api/rooms/summary/ - Every room with its latest count and a sparkline
+    GET /api/rooms/{id}/live/ - Stream new counts for room (Server-Sent Events)
+    GET /api/rooms/live/ - Stream new counts for every room on one connection
+    POST /api/rooms/{id}/start/ - Request camera worker for room (run by run_camera_workers)
+    POST /api/rooms/{id}/stop/ - Request that the camera worker for room stops
+    
+    GETs (other than live) answer If-None-Match with 304 Not Modified until
+    the room or one of its counts changes
     """
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
@@ -259,34 +365,66 @@ class RoomViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'camera_ip']
     ordering_fields = ['created_at', 'name', 'status']
     ordering = ['-created_at']
+    data_versions = {
+        '*': ('rooms',),
+        'counts': ('counts',),
+        'stats': ('counts',),
+        'live': (),
+        'live_all': (),
+    }
+    
+    def get_queryset(self):
+        """
+        Annotate list/detail rooms with their latest count
+        Correlated subqueries on the (room, -timestamp) index keep the list at
+        a constant number of queries whatever the page size
+        """
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            latest = CameraCount.objects.filter(room=OuterRef('pk')).order_by('-timestamp')
+            queryset = queryset.annotate(
+                current_count=Subquery(latest.values('people_count')[:1]),
+                current_count_at=Subquery(latest.values('timestamp')[:1]),
+            )
+        return queryset
+    
+    def get_data_version(self, request):
+        """The summary's sparkline window also slides at every bucket boundary"""
+        version = super().get_data_version(request)
+        if self.action != 'summary' or version is None:
+            return version
+        try:
+            window = parse_sparkline_params(request.query_params)
+        except HistoryParamError:
+            return None
+        bucket = window.end - timedelta(seconds=window.bucket_seconds)
+        return DataVersion.combine([
+            version, DataVersion(token=f'{int(bucket.timestamp()):x}', last_modified=bucket.timestamp())
+        ])
     
     def perform_create(self, serializer):
-        """Create room and automatically start camera processing"""
+        """Create room and request camera processing for it (run_camera_workers starts it)"""
         room = serializer.save()
         logger.info(f"Room created: {room.name}")
         
-        # Start camera processing for this room
-        try:
-            _start_room_camera_processing(room)
-            logger.info(f"Camera processing started for room: {room.name}")
-        except Exception as e:
-            logger.error(f"Failed to start camera processing for room {room.name}: {str(e)}")
-            room.status = 'offline'
-            room.save(update_fields=['status'])
+        if room.is_active:
+            _request_processing(room, True)
     
     @action(detail=True, methods=['get'])
     def counts(self, request, pk=None):
         """
         Get time-series counts for a room
         GET /api/rooms/{id}/counts/?limit=100
+        GET /api/rooms/{id}/counts/?start=2026-01-01&end=2026-01-08&bucket=1h
+        GET /api/rooms/{id}/counts/?page_size=100 (then follow `next`)
         """
         room = self.get_object()
-        limit = request.query_params.get('limit', 100)
         
         try:
-            counts = room.counts.all()[:int(limit)]
-            serializer = RoomCountSerializer(counts, many=True)
-            return Response(serializer.data)
+            return _count_history_response(
+                request, room.counts.all(), RoomCountSerializer,
+                owner=('room', room.id), serializer_kwargs=self.get_sparse_fieldsets()
+            )
         except Exception as e:
             logger.error(f"Error fetching room counts: {str(e)}")
             return Response(
@@ -294,70 +432,177 @@ class RoomViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Get running occupancy stats for a room, maintained on every count write
+        GET /api/rooms/{id}/stats/?date=2026-01-15 - One day (default today)
+        GET /api/rooms/{id}/stats/?days=7 - The last N days, newest first
+        """
+        room = self.get_object()
+        days = request.query_params.get('days')
+        
+        if days is not None:
+            try:
+                days = min(max(int(days), 1), 366)
+            except ValueError:
+                return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            since = timezone.localdate() - timedelta(days=days - 1)
+            stats = room.daily_stats.filter(date__gte=since)
+            serializer = RoomDailyStatsSerializer(stats, many=True, **self.get_sparse_fieldsets())
+            return Response(serializer.data)
+        
+        date = request.query_params.get('date')
+        date = parse_date(date) if date else timezone.localdate()
+        if date is None:
+            return Response({'error': 'date must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            stats = room.daily_stats.get(date=date)
+        except RoomDailyStats.DoesNotExist:
+            return Response(
+                {'message': f'No counts recorded on {date}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = RoomDailyStatsSerializer(stats, **self.get_sparse_fieldsets())
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Every room with status, latest count and a fixed-length sparkline, for dashboards
+        GET /api/rooms/summary/?window=1h&points=60
+        
+        Accepts the list filters (?status=, ?is_active=, ?search=, ?ordering=)
+        and ?fields=. Sparkline points are the average count of each bucket,
+        oldest first, null where no count was recorded. Two queries whatever
+        the number of rooms, cached for ROOM_SUMMARY_CACHE_SECONDS.
+        """
+        try:
+            window = parse_sparkline_params(request.query_params)
+        except HistoryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        key = None
+        if self.data_version is not None:
+            params = sorted(request.query_params.lists())
+            variant = f'{params}|{window.end.timestamp()}|{self.data_version.token}'
+            key = 'room-summary:' + hashlib.blake2b(variant.encode(), digest_size=16).hexdigest()
+            payload = cache.get(key)
+            if payload is not None:
+                return Response(payload)
+        
+        rooms = list(self.filter_queryset(self.get_queryset()))
+        lines = room_sparklines(CameraCount.objects.filter(room__in=[room.id for room in rooms]), window)
+        serializer = self.get_serializer(rooms, many=True)
+        payload = {
+            'start': window.start,
+            'end': window.end,
+            'bucket_seconds': window.bucket_seconds,
+            'points': window.points,
+            'rooms': [
+                {**room, 'sparkline': lines.get(instance.id, [None] * window.points)}
+                for instance, room in zip(rooms, serializer.data)
+            ],
+        }
+        if key:
+            cache.set(key, payload, timeout=settings.ROOM_SUMMARY_CACHE_SECONDS)
+        return Response(payload)
+    
+    @action(detail=True, methods=['get'], renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
+    def live(self, request, pk=None):
+        """
+        Stream new counts for a room as Server-Sent Events
+        GET /api/rooms/{id}/live/
+        """
+        room = self.get_object()
+        return live_response(request._request, channels=[f'room:{room.id}'], initial=snapshot_events(room, 'room'))
+    
+    @action(detail=False, methods=['get'], url_path='live', url_name='live-all',
+            renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
+    def live_all(self, request):
+        """
+        Stream new counts for every room on one connection (Server-Sent Events)
+        GET /api/rooms/live/
+        Served entirely from the in-process broker, without touching the database
+        """
+        return live_response(request._request, prefix='room:', initial=broker.latest('room:'))
+    
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """
+        Request camera processing for a room
+        POST /api/rooms/{id}/start/
+        """
+        room = self.get_object()
+        
+        if not room.is_active:
+            return Response(
+                {'error': 'Room is not active'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if room.processing_requested:
+            return Response(
+                {'error': 'Processing already requested'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        _request_processing(room, True)
+        return Response({'status': 'Camera processing requested'}, status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['post'])
     def stop(self, request, pk=None):
         """
-        Stop camera processing for a room
+        Request that camera processing for a room stops
         POST /api/rooms/{id}/stop/
         """
         room = self.get_object()
         
-        try:
-            success = _stop_room_camera_processing(room)
-            if success:
-                room.status = 'inactive'
-                room.save(update_fields=['status'])
-                return Response({'status': 'Camera processing stopped'})
-            else:
-                return Response(
-                    {'error': 'No processing running'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        except Exception as e:
-            logger.error(f"Error stopping camera processing for room {room.name}: {str(e)}")
+        if not room.processing_requested:
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'No processing requested'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        _request_processing(room, False)
+        return Response({'status': 'Camera processing stop requested'}, status=status.HTTP_202_ACCEPTED)
 
 
-def _start_room_camera_processing(room):
+def _count_history_response(request, counts, serializer_class, owner=None, serializer_kwargs=None):
     """
-    Start YOLOv8 worker for a room
-    This creates a background thread or Celery task to process the room's camera
+    Shared implementation of the room and camera counts actions
+    Without parameters returns the latest `limit` rows. `start`/`end` restrict
+    the range and `bucket` aggregates it in the database, widening the bucket
+    if needed so no more than COUNT_HISTORY_MAX_POINTS points are returned.
+    Parts of the range older than the online data are read from the archive.
+    Passing `cursor` or `page_size` switches raw rows to keyset pages of the
+    online data instead.
     """
-    from .yolo_service import start_room_processing
-    
+    serializer_kwargs = serializer_kwargs or {}
     try:
-        success = start_room_processing(room)
-        if success:
-            room.status = 'active'
-            room.save(update_fields=['status'])
-            return True
-        else:
-            room.status = 'offline'
-            room.save(update_fields=['status'])
-            return False
-    except Exception as e:
-        logger.error(f"Error starting room camera processing: {str(e)}")
-        room.status = 'offline'
-        room.save(update_fields=['status'])
-        raise
+        query = parse_history_params(request.query_params)
+    except HistoryParamError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    params = request.query_params
+    if not query.is_bucketed and ('cursor' in params or 'page_size' in params):
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(filter_range(counts, query), request)
+        serializer = serializer_class(page, many=True, **serializer_kwargs)
+        return paginator.get_paginated_response(serializer.data)
+    
+    history = count_history(counts, query, owner=owner)
+    if query.is_bucketed:
+        return Response(history)
+    return Response(serialize_history(history, serializer_class, serializer_kwargs))
 
 
-def _stop_room_camera_processing(room):
+def _request_processing(owner, requested):
     """
-    Stop YOLOv8 worker for a room
+    Record whether a camera or room should be processed
+    The web tier never runs processors; run_camera_workers picks this up
+    (see camera/workers.py) and reports back through status
     """
-    from .yolo_service import stop_room_processing
-    
-    try:
-        success = stop_room_processing(room)
-        if success:
-            room.status = 'inactive'
-            room.save(update_fields=['status'])
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"Error stopping room camera processing: {str(e)}")
-        raise
+    owner.processing_requested = requested
+    owner.save(update_fields=['processing_requested', 'updated_at'])
+    logger.info(f"Processing {'requested' if requested else 'stop requested'} for {owner}")
@@ -0,0 +1,119 @@
+"""
+Camera worker supervisor
+Run by `manage.py run_camera_workers`, the one process that owns every
+CameraProcessor. The web tier only records intent in the database:
+
+  processing wanted    is_active=True and processing_requested=True
+  processing stopped   processing_requested=False (or is_active=False, or deleted)
+
+Each pass compares that with the processors running here, starts and stops
+the difference and reports back through status, which only this process
+writes: 'active' once started, 'offline' if starting failed (retried on the
+next pass), 'inactive' once stopped.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import List
+
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from core.versioning import bump_version
+from .models import Camera, Room
+from .yolo_service import (
+    get_active_processors, start_camera_processing, start_room_processing,
+    stop_camera_processing, stop_room_processing,
+)
+
+logger = logging.getLogger(__name__)
+
+# kind, model, start(instance), stop(id)
+TARGETS = (
+    ('camera', Camera, start_camera_processing, stop_camera_processing),
+    ('room', Room, start_room_processing, stop_room_processing),
+)
+
+
+def wanted(model):
+    """Cameras or rooms that should be processed"""
+    return model.objects.filter(is_active=True, processing_requested=True)
+
+
+@dataclass
+class ReconcileResult:
+    started: List[str] = field(default_factory=list)
+    stopped: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    # False when the only news is a retry that failed again
+    changed: bool = False
+
+
+class CameraWorkerSupervisor:
+    """Keeps this process's camera processors in line with the database"""
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+
+    def reconcile(self) -> ReconcileResult:
+        """One pass: stop unwanted processors, start missing ones"""
+        result = ReconcileResult()
+        running = get_active_processors()
+        for kind, model, start, stop in TARGETS:
+            targets = {obj.id: obj for obj in wanted(model)}
+            for _, pk in [key for key in running if key[0] == kind and key[1] not in targets]:
+                stop(pk)
+                model.objects.filter(pk=pk).update(status='inactive')
+                result.stopped.append(f'{kind}:{pk}')
+                result.changed = True
+            for pk, obj in targets.items():
+                if (kind, pk) in running:
+                    continue
+                if start(obj):
+                    result.started.append(f'{kind}:{pk}')
+                    result.changed = True
+                    updates = {'status': 'active'}
+                    if kind == 'camera':
+                        updates['last_connection'] = timezone.now()
+                else:
+                    result.failed.append(f'{kind}:{pk}')
+                    result.changed |= obj.status != 'offline'
+                    updates = {'status': 'offline'}
+                # update(), not save(): leave the intent to the API
+                model.objects.filter(pk=pk).update(**updates)
+        if result.changed:
+            bump_version('rooms', 'cameras')
+            logger.info(
+                f"Camera workers: started {result.started or '-'}, stopped {result.stopped or '-'}, "
+                f"failed {result.failed or '-'}"
+            )
+        return result
+
+    def run(self, interval: float):
+        """Reconcile every interval seconds until stop() is called"""
+        logger.info(f"Camera workers running (reconciling every {interval}s)")
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    self.reconcile()
+                except DatabaseError as e:
+                    logger.error(f"Camera workers: reconcile failed: {str(e)}")
+                self.stop_event.wait(interval)
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def shutdown(self):
+        """Stop every processor; the recorded intent is left for the next start"""
+        models = {kind: (model, stop) for kind, model, _, stop in TARGETS}
+        for kind, pk in get_active_processors():
+            model, stop = models[kind]
+            stop(pk)
+            try:
+                model.objects.filter(pk=pk).update(status='inactive')
+            except DatabaseError as e:
+                logger.error(f"Camera workers: could not record {kind}:{pk} as stopped: {str(e)}")
+        logger.info("Camera workers stopped")
@@ -1,16 +1,20 @@
 """
 YOLO Camera Processing Service
 Handles camera connection, frame processing, and person counting
+
+Processors run only in the `manage.py run_camera_workers` process (see
+camera/workers.py); the web tier records which cameras and rooms should be
+processed in the database and never starts them itself.
 """
 import logging
 import threading
-from typing import Optional, Dict, Callable
+from typing import Optional, Dict, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-# Global dictionary to track active camera processors
-_active_processors: Dict[int, 'CameraProcessor'] = {}
+# Active processors of this process, keyed by ('camera' | 'room', id)
+_active_processors: Dict[Tuple[str, int], 'CameraProcessor'] = {}
 
 
 class CameraProcessor:
@@ -49,33 +53,51 @@ class CameraProcessor:
         # For now, it's a placeholder
 
 
-def start_camera_processing(camera_id: int, camera_name: str, rtsp_url: str) -> bool:
-    """
-    Start processing for a specific camera
-    
-    Args:
-        camera_id: Database ID of the camera
-        camera_name: Name of the camera
-        rtsp_url: RTSP URL for the camera
-    
-    Returns:
-        bool: True if processing started successfully
-    """
+def _start(key, name: str, rtsp_url: str) -> bool:
     try:
-        if camera_id in _active_processors:
-            logger.warning(f"Camera {camera_id} is already being processed")
+        if key in _active_processors:
+            logger.warning(f"{key[0].capitalize()} {key[1]} is already being processed")
             return False
         
-        processor = CameraProcessor(camera_id, camera_name, rtsp_url)
-        _active_processors[camera_id] = processor
+        processor = CameraProcessor(key[1], name, rtsp_url)
+        _active_processors[key] = processor
         processor.start()
         return True
     
     except Exception as e:
-        logger.error(f"Error starting camera processing for {camera_name}: {str(e)}")
+        _active_processors.pop(key, None)
+        logger.error(f"Error starting camera processing for {name}: {str(e)}")
+        return False
+
+
+def _stop(key) -> bool:
+    try:
+        processor = _active_processors.pop(key, None)
+        if processor is None:
+            logger.warning(f"{key[0].capitalize()} {key[1]} is not being processed")
+            return False
+        
+        processor.stop()
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error stopping camera processing for {key[0]} {key[1]}: {str(e)}")
         return False
 
 
+def start_camera_processing(camera) -> bool:
+    """
+    Start processing for a specific camera
+    
+    Args:
+        camera: Camera instance
+    
+    Returns:
+        bool: True if processing started successfully
+    """
+    return _start(('camera', camera.id), camera.name, camera.get_rtsp_url())
+
+
 def stop_camera_processing(camera_id: int) -> bool:
     """
     Stop processing for a specific camera
@@ -86,26 +108,45 @@ def stop_camera_processing(camera_id: int) -> bool:
     Returns:
         bool: True if processing stopped successfully
     """
-    try:
-        if camera_id not in _active_processors:
-            logger.warning(f"Camera {camera_id} is not being processed")
-            return False
-        
-        processor = _active_processors[camera_id]
-        processor.stop()
-        del _active_processors[camera_id]
-        return True
+    return _stop(('camera', camera_id))
+
+
+def start_room_processing(room) -> bool:
+    """
+    Start processing for a room's camera
     
-    except Exception as e:
-        logger.error(f"Error stopping camera processing for camera {camera_id}: {str(e)}")
-        return False
+    Args:
+        room: Room instance
+    
+    Returns:
+        bool: True if processing started successfully
+    """
+    return _start(('room', room.id), room.name, room.get_rtsp_url())
+
+
+def stop_room_processing(room_id: int) -> bool:
+    """
+    Stop processing for a room's camera
+    
+    Args:
+        room_id: Database ID of the room
+    
+    Returns:
+        bool: True if processing stopped successfully
+    """
+    return _stop(('room', room_id))
 
 
-def get_active_processors() -> Dict[int, CameraProcessor]:
-    """Get all active camera processors"""
+def get_active_processors() -> Dict[Tuple[str, int], CameraProcessor]:
+    """Get all active processors, keyed by ('camera' | 'room', id)"""
     return _active_processors.copy()
 
 
 def is_camera_processing(camera_id: int) -> bool:
     """Check if a camera is currently processing"""
-    return camera_id in _active_processors
+    return ('camera', camera_id) in _active_processors
+
+
+def is_room_processing(room_id: int) -> bool:
+    """Check if a room's camera is currently processing"""
+    return ('room', room_id) in _active_processors
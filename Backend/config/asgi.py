@@ -0,0 +1,26 @@
+"""
+ASGI config for Nava Table API Backend project.
+
+Serves the whole API; the async endpoints under /api/v1/async/ (see
+camera/async_views.py) then hold a coroutine instead of a worker thread
+while they wait, so one process can keep thousands of live streams open.
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --workers 4
+
+The DRF endpoints work here too; Django runs them in a thread pool. Their
+live streams (/api/v1/rooms/{id}/live/ and friends) switch to the async
+stream under ASGI, since Django 4.2 would otherwise buffer a sync stream
+whole before sending it (see camera/live.py live_response). The async views
+run the same authentication, throttles and ETags as the DRF actions.
+benchmarks/bench_asgi_connections.py compares live stream capacity with
+gunicorn sync workers.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
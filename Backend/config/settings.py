@@ -3,6 +3,7 @@ Django settings for Nava Table API Backend.
 """
 
 import os
+import sys
 from pathlib import Path
 import environ
 
@@ -13,6 +14,9 @@ environ.Env.read_env()
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# python manage.py test
+TESTING = sys.argv[1:2] == ['test']
+
 # Security
 SECRET_KEY = env('SECRET_KEY', default='dev-secret-key-change-in-production')
 DEBUG = env.bool('DEBUG', default=True)
@@ -69,13 +73,73 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-# Using SQLite for migrations only - No external database required
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database
+# SQLite by default (no external database required); set DB_ENGINE and the
+# DB_* variables from .env.example to use PostgreSQL
+DB_ENGINE = env('DB_ENGINE', default='django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': env('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+            'OPTIONS': {
+                # Seconds sqlite3 waits on a locked database (see also SQLITE_BUSY_TIMEOUT_MS)
+                'timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000) / 1000,
+            },
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': env('DB_NAME', default='nava'),
+            'USER': env('DB_USER', default=''),
+            'PASSWORD': env('DB_PASSWORD', default=''),
+            'HOST': env('DB_HOST', default='localhost'),
+            'PORT': env('DB_PORT', default='5432'),
+            # Persistent connections, verified before reuse
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+            'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+            'OPTIONS': {
+                'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+            },
+        }
+    }
+    if env.bool('DB_POOL', default=False):
+        # Driver-side pool (Django 5.1+ with psycopg 3 only, see core/db.py);
+        # replaces persistent connections
+        from core.db import pool_options
+        DATABASES['default']['OPTIONS']['pool'] = pool_options(
+            env.int('DB_POOL_MIN_SIZE', default=2), env.int('DB_POOL_MAX_SIZE', default=10)
+        )
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+    if env.bool('DB_PGBOUNCER', default=False):
+        # PgBouncer in transaction mode cannot hold server-side cursors
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# SQLite concurrency mode: WAL journal, synchronous=NORMAL, mmap and a busy
+# timeout, applied to every new connection (see core/db.py)
+SQLITE_CONCURRENCY_MODE = env.bool('SQLITE_CONCURRENCY_MODE', default=True)
+SQLITE_MMAP_SIZE = env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024)
+SQLITE_BUSY_TIMEOUT_MS = env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000)
+
+# Cache
+# Holds the data versions behind ETags (core/versioning.py) and pre-rendered
+# responses. Camera workers bump versions from another process, so production
+# must set CACHE_URL to a cache shared by every process (rediscache://...);
+# the in-memory default is for development only, where a worker's bumps are
+# not seen by the web process. Tests get a private in-memory cache so that no
+# state leaks between runs.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
 }
+if TESTING:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Lifetime of pre-rendered timetable responses (core/response_cache.py); entries
+# of an outdated data version are never served, this only bounds their storage
+RESPONSE_CACHE_SECONDS = env.int('RESPONSE_CACHE_SECONDS', default=24 * 3600)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -87,7 +151,9 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
-TIME_ZONE = 'UTC'
+# Timetable clock times ("9:00-10:00") are campus local time and are compared
+# with the current time in this zone, so it must be the campus time zone
+TIME_ZONE = env('TIME_ZONE', default='UTC')
 USE_I18N = True
 USE_TZ = True
 
@@ -106,6 +172,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'authentication.authentication.APIKeyAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -119,7 +186,33 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'EXCEPTION_HANDLER': 'core.exception_handler.custom_exception_handler',
+    # Token buckets per API key, and per IP without one (see authentication/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'authentication.throttling.APIKeyRateThrottle',
+        'authentication.throttling.EndpointRateThrottle',
+        'authentication.throttling.AnonymousRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'api_key': env('THROTTLE_API_KEY_RATE', default='1200/min'),
+        'endpoint': env('THROTTLE_ENDPOINT_RATE', default='300/min'),
+        'anon': env('THROTTLE_ANON_RATE', default='600/min'),
+    },
 }
+if TESTING:
+    # The whole suite runs from one IP; throttling tests set their own rates
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['anon'] = None
+
+# Resolution of APIKey.last_used: written at most once per interval per key
+API_KEY_LAST_USED_SECONDS = env.int('API_KEY_LAST_USED_SECONDS', default=60)
+
+# Throttle state: 'shm' (shared memory, per host) or 'cache' (THROTTLE_CACHE_ALIAS)
+THROTTLE_STORE = env('THROTTLE_STORE', default='shm')
+THROTTLE_SHM_PATH = env(
+    'THROTTLE_SHM_PATH',
+    default='/dev/shm/nava-throttle' if os.path.isdir('/dev/shm') else str(BASE_DIR / '.cache' / 'throttle'),
+)
+THROTTLE_SHM_SLOTS = env.int('THROTTLE_SHM_SLOTS', default=65536)
+THROTTLE_CACHE_ALIAS = env('THROTTLE_CACHE_ALIAS', default='default')
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=['http://localhost:3000', 'http://127.0.0.1:3000'])
@@ -163,6 +256,46 @@ LOGGING = {
 CAMERA_PROCESSING_INTERVAL = env.int('CAMERA_PROCESSING_INTERVAL', default=60)
 YOLO_MODEL = env('YOLO_MODEL', default='yolov8n.pt')
 CAMERA_TIMEOUT = env.int('CAMERA_TIMEOUT', default=30)
+# Seconds between run_camera_workers passes over the wanted cameras/rooms
+CAMERA_WORKER_POLL_SECONDS = env.float('CAMERA_WORKER_POLL_SECONDS', default=5.0)
+
+# Count retention (see camera/retention.py and `manage.py prune_counts`)
+COUNT_RETENTION_DAYS = env.int('COUNT_RETENTION_DAYS', default=30)
+COUNT_ROLLUP_BUCKET_SECONDS = env.int('COUNT_ROLLUP_BUCKET_SECONDS', default=3600)
+COUNT_RETENTION_CHUNK_SIZE = env.int('COUNT_RETENTION_CHUNK_SIZE', default=1000)
+# Raw counts are archived here before retention deletes them (empty to disable)
+COUNT_ARCHIVE_DIR = env('COUNT_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
+# Per-room daily stats maintained on ingest
+ROOM_STATS_EWMA_ALPHA = env.float('ROOM_STATS_EWMA_ALPHA', default=0.1)
+# Longest gap a count is assumed to hold for in time-weighted sums
+ROOM_STATS_MAX_GAP_SECONDS = env.int('ROOM_STATS_MAX_GAP_SECONDS', default=2 * CAMERA_PROCESSING_INTERVAL)
+
+# Live count streams (Server-Sent Events)
+LIVE_STREAM_KEEPALIVE_SECONDS = env.int('LIVE_STREAM_KEEPALIVE_SECONDS', default=15)
+LIVE_STREAM_MAX_SECONDS = env.int('LIVE_STREAM_MAX_SECONDS', default=600)
+LIVE_STREAM_RETRY_MS = env.int('LIVE_STREAM_RETRY_MS', default=3000)
+LIVE_STREAM_QUEUE_SIZE = env.int('LIVE_STREAM_QUEUE_SIZE', default=100)
+# How often open streams pick up counts written by other processes (0 disables)
+LIVE_POLL_SECONDS = env.float('LIVE_POLL_SECONDS', default=1.0)
+
+# Count history endpoints (hard cap on rows/points per response)
+COUNT_HISTORY_MAX_POINTS = env.int('COUNT_HISTORY_MAX_POINTS', default=1000)
+COUNT_HISTORY_DEFAULT_HOURS = env.int('COUNT_HISTORY_DEFAULT_HOURS', default=24)
+# Rows fetched (and written) per batch by the streaming count export
+COUNT_EXPORT_CHUNK_SIZE = env.int('COUNT_EXPORT_CHUNK_SIZE', default=2000)
+# Bulk ingestion (POST /api/v1/camera-counts/bulk/): records per request and per INSERT
+COUNT_INGEST_MAX_RECORDS = env.int('COUNT_INGEST_MAX_RECORDS', default=10000)
+COUNT_INGEST_BATCH_SIZE = env.int('COUNT_INGEST_BATCH_SIZE', default=500)
+
+# Rooms summary (dashboard): default sparkline window/length and cache lifetime
+ROOM_SUMMARY_WINDOW = env('ROOM_SUMMARY_WINDOW', default='1h')
+ROOM_SUMMARY_POINTS = env.int('ROOM_SUMMARY_POINTS', default=60)
+ROOM_SUMMARY_CACHE_SECONDS = env.int('ROOM_SUMMARY_CACHE_SECONDS', default=5)
+
+# Free classrooms: a scheduled room counts as empty when its camera reported
+# zero people within this many seconds
+CLASSROOM_EMPTY_MAX_AGE_SECONDS = env.int('CLASSROOM_EMPTY_MAX_AGE_SECONDS', default=300)
 
 # Celery Configuration (optional)
 CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://localhost:6379/0')
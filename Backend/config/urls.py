@@ -12,11 +12,12 @@ from rest_framework.response import Response
 # Import viewsets
 from timetable.views import (
     CohortViewSet, SectionViewSet, InstructorViewSet,
-    CourseViewSet, TimetableEntryViewSet
+    CourseViewSet, TimetableEntryViewSet, ClassroomViewSet
 )
 from camera.views import (
     CameraViewSet, CameraCountViewSet, CameraConnectAPIView, RoomViewSet
 )
+from camera import async_views
 
 # Initialize router
 router = DefaultRouter()
@@ -25,6 +26,7 @@ router.register(r'sections', SectionViewSet, basename='section')
 router.register(r'instructors', InstructorViewSet, basename='instructor')
 router.register(r'courses', CourseViewSet, basename='course')
 router.register(r'timetable', TimetableEntryViewSet, basename='timetable')
+router.register(r'classrooms', ClassroomViewSet, basename='classroom')
 router.register(r'cameras', CameraViewSet, basename='camera')
 router.register(r'camera-counts', CameraCountViewSet, basename='camera-count')
 router.register(r'rooms', RoomViewSet, basename='room')
@@ -43,25 +45,47 @@ def api_root(request):
                 'by_section': 'GET /api/v1/timetable/by-section/?term=Term_1_AY_2025/2026_Timetable&section=BAPM_2023_Section_A',
                 'student_timetable': 'GET /api/v1/timetable/student/?term=Term_1_AY_2025/2026_Timetable&section=BAPM_2023_Section_A',
                 'instructor_timetable': 'GET /api/v1/timetable/instructor/?instructor_name=Dieudonne, U.',
+                'instructor_search': 'GET /api/v1/timetable/instructors/search/?q=dieudone',
+                'entries': 'GET /api/v1/timetable/entries/?day=Monday&start=14:00&end=15:00 (or &at=14:30)',
+                'conflicts': 'GET /api/v1/timetable/conflicts/?kind=instructor|classroom',
                 'cohorts': 'GET /api/v1/cohorts/',
                 'sections': 'GET /api/v1/sections/?cohort_id=',
                 'instructors': 'GET /api/v1/instructors/',
                 'courses': 'GET /api/v1/courses/',
+                'classrooms': 'GET /api/v1/classrooms/',
+                'free_classrooms': 'GET /api/v1/classrooms/free/?day=Monday&start=14:00&end=15:00',
             },
             'camera': {
                 'connect': 'POST /api/v1/camera/connect/',
                 'list': 'GET /api/v1/cameras/',
                 'detail': 'GET /api/v1/cameras/{id}/',
                 'latest_count': 'GET /api/v1/cameras/{id}/latest-count/',
-                'count_history': 'GET /api/v1/cameras/{id}/counts/',
+                'count_history': 'GET /api/v1/cameras/{id}/counts/?start=&end=&bucket=5m',
+                'live': 'GET /api/v1/cameras/{id}/live/ (text/event-stream)',
+                'export': 'GET /api/v1/camera-counts/export/?format=csv|ndjson&start=&end=&room=',
+                'bulk': 'POST /api/v1/camera-counts/bulk/ (idempotent batch ingest for edge counters)',
             },
             'rooms': {
                 'list': 'GET /api/v1/rooms/',
                 'create': 'POST /api/v1/rooms/',
                 'detail': 'GET /api/v1/rooms/{id}/',
-                'counts': 'GET /api/v1/rooms/{id}/counts/',
+                'counts': 'GET /api/v1/rooms/{id}/counts/?start=&end=&bucket=5m',
+                'stats': 'GET /api/v1/rooms/{id}/stats/?date=YYYY-MM-DD',
+                'summary': 'GET /api/v1/rooms/summary/?window=1h&points=60',
+                'live': 'GET /api/v1/rooms/{id}/live/ (text/event-stream)',
+                'live_all': 'GET /api/v1/rooms/live/ (text/event-stream)',
+                'start': 'POST /api/v1/rooms/{id}/start/',
                 'stop': 'POST /api/v1/rooms/{id}/stop/',
-            }
+            },
+            'async': {
+                'note': 'Async versions of the count and live endpoints, for ASGI servers (config/asgi.py)',
+                'room_counts': 'GET /api/v1/async/rooms/{id}/counts/',
+                'room_live': 'GET /api/v1/async/rooms/{id}/live/',
+                'rooms_live': 'GET /api/v1/async/rooms/live/',
+                'camera_counts': 'GET /api/v1/async/cameras/{id}/counts/',
+                'camera_latest_count': 'GET /api/v1/async/cameras/{id}/latest-count/',
+                'camera_live': 'GET /api/v1/async/cameras/{id}/live/',
+            },
         },
         'admin': '/admin/',
         'docs': '/README.md'
@@ -77,6 +101,15 @@ urlpatterns = [
     path('api/v1/', include(router.urls)),
     path('api/v1/camera/connect/', CameraConnectAPIView.as_view(), name='camera-connect'),
     
+    # Async count and live endpoints (served best under ASGI, see config/asgi.py)
+    path('api/v1/async/rooms/live/', async_views.rooms_live, name='async-rooms-live'),
+    path('api/v1/async/rooms/<int:pk>/counts/', async_views.room_counts, name='async-room-counts'),
+    path('api/v1/async/rooms/<int:pk>/live/', async_views.room_live, name='async-room-live'),
+    path('api/v1/async/cameras/<int:pk>/counts/', async_views.camera_counts, name='async-camera-counts'),
+    path('api/v1/async/cameras/<int:pk>/latest-count/', async_views.camera_latest_count,
+         name='async-camera-latest-count'),
+    path('api/v1/async/cameras/<int:pk>/live/', async_views.camera_live, name='async-camera-live'),
+    
     # Authentication (optional, for future use)
     # path('api/v1/auth/', include('rest_framework.urls')),
 ]
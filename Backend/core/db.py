@@ -0,0 +1,36 @@
+"""
+Database connection setup
+"""
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def pool_options(min_size: int, max_size: int) -> dict:
+    """
+    OPTIONS['pool'] for the PostgreSQL backend (DB_POOL)
+    Only Django 5.1+ with psycopg 3 knows this option; older versions would
+    pass it to the driver and fail on every connection.
+    """
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured(
+            f'DB_POOL needs Django 5.1+ with psycopg 3 (running Django {django.get_version()}); '
+            f'use DB_CONN_MAX_AGE or DB_PGBOUNCER instead'
+        )
+    return {'min_size': min_size, 'max_size': max_size}
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Put every new SQLite connection into concurrency mode
+    WAL lets readers proceed while a writer commits, synchronous=NORMAL is
+    safe under WAL and avoids an fsync per transaction, mmap serves reads from
+    the page cache and busy_timeout makes writers wait instead of failing.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_CONCURRENCY_MODE:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}')
+        cursor.execute(f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}')
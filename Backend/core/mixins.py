@@ -0,0 +1,62 @@
+"""
+Sparse fieldsets for API responses
+GET ...?fields=id,name returns only the listed fields and
+GET ...?expand=camera,room nests the listed relations instead of their ids.
+"""
+from django.utils.module_loading import import_string
+
+
+def parse_field_list(value):
+    """Split a comma separated query parameter into a list of names"""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer mixin accepting `fields` and `expand` keyword arguments
+
+    Relations that can be expanded are declared on Meta as a mapping of field
+    name to serializer import path, e.g.
+        expandable_fields = {'camera': 'camera.serializers.CameraSerializer'}
+    The viewset is responsible for select_related()/prefetch_related() so that
+    expanded relations cost no extra queries.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            if name in expandable:
+                self.fields[name] = import_string(expandable[name])(read_only=True)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetsMixin:
+    """
+    ViewSet mixin passing ?fields= and ?expand= to its serializers
+    Actions that build serializers themselves should pass
+    **self.get_sparse_fieldsets() along.
+    """
+
+    def get_sparse_fieldsets(self):
+        """Serializer kwargs for the current request (empty for writes)"""
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return {}
+        return {
+            'fields': parse_field_list(request.query_params.get('fields')),
+            'expand': parse_field_list(request.query_params.get('expand')),
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_sparse_fieldsets().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,153 @@
+"""
+Keyset (cursor) pagination
+"""
+import base64
+from collections import OrderedDict
+
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over (timestamp, id), newest first
+
+    Each page seeks past the last row of the previous one through the
+    timestamp index, so page 10,000 costs the same as page 1: no OFFSET and
+    no COUNT(*). ?include_total=true adds a total that is exact up to
+    max_exact_total and approximate beyond it. The order is fixed, so
+    ?ordering= is rejected rather than silently ignored.
+    """
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 1000
+    max_exact_total = 10000
+    timestamp_field = 'timestamp'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering_query_param = api_settings.ORDERING_PARAM
+    ordering_message = 'Keyset pages are always ordered by (timestamp, id), newest first'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.ordering_query_param in request.query_params:
+            raise ValidationError({self.ordering_query_param: [self.ordering_message]})
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.total = None
+        if request.query_params.get(self.total_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.total = self.get_total(queryset)
+
+        cursor = self.decode_cursor(request)
+        ts, pk = self.timestamp_field, 'id'
+        if cursor is None:
+            self.reverse = False
+            queryset = queryset.order_by(f'-{ts}', f'-{pk}')
+        else:
+            position, last_id, self.reverse = cursor
+            if self.reverse:
+                queryset = (
+                    queryset.filter(**{f'{ts}__gte': position})
+                    .exclude(**{ts: position, f'{pk}__lte': last_id})
+                    .order_by(ts, pk)
+                )
+            else:
+                queryset = (
+                    queryset.filter(**{f'{ts}__lte': position})
+                    .exclude(**{ts: position, f'{pk}__gte': last_id})
+                    .order_by(f'-{ts}', f'-{pk}')
+                )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Moving forward there is a next page if we over-fetched, and a previous
+        # one whenever we started from a cursor (and vice versa going back)
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = cursor is not None if not self.reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_total(self, queryset):
+        """Return (total, is_approximate)"""
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            # Planner estimate for an unfiltered table, no scan at all
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                return max(cursor.fetchone()[0], 0), True
+        total = queryset.order_by()[:self.max_exact_total + 1].count()
+        return min(total, self.max_exact_total), total > self.max_exact_total
+
+    def encode_cursor(self, row, reverse):
+        position = getattr(row, self.timestamp_field).isoformat()
+        raw = f'{position}|{row.pk}|{int(reverse)}'
+        token = base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+            position, pk, reverse = raw.split('|')
+            position = parse_datetime(position)
+            if position is None:
+                raise ValueError(raw)
+            return position, int(pk), reverse == '1'
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.total is not None:
+            payload['count'], payload['count_is_approximate'] = self.total
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_approximate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,57 @@
+"""
+Custom renderers
+"""
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Accepts `Accept: text/event-stream` during content negotiation
+    Streaming views return their own StreamingHttpResponse; this renderer only
+    ever renders error payloads, as a single SSE `error` event
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f'event: error\ndata: {json.dumps(data, default=str)}\n\n'.encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Accepts `?format=csv` / `Accept: text/csv`
+    Export views stream their own rows; this renders other payloads (errors)
+    as a header line of the keys followed by one line of values
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        if not rows or not isinstance(rows[0], dict):
+            return b''
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return output.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Accepts `?format=ndjson` / `Accept: application/x-ndjson`
+    Renders a list as one JSON document per line, anything else as one line
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode(self.charset)
@@ -0,0 +1,160 @@
+"""
+Pre-rendered, pre-compressed response cache
+Views decorated with @cache_rendered(...) render each (endpoint, parameters,
+data version) once: the JSON bytes and their gzip (and brotli, when the `brotli`
+package is installed) encodings are stored in the default cache and served
+as-is on later requests, skipping the view body and the DRF renderer.
+
+Only the query parameters named in the decorator are part of the key, so
+clients cannot create entries by adding parameters the view ignores.
+Entries are keyed by the view's data version (see core/versioning.py), so a
+change to the source data makes them unreachable and they age out after
+RESPONSE_CACHE_SECONDS. Each response reports the view and renderer time it
+took (miss) or saved (hit) in a Server-Timing header.
+"""
+import gzip
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached entries changes
+CACHE_PREFIX = 'rendered:v1:'
+
+
+def compress(body: bytes) -> dict:
+    """Every encoding of a body; paid once per data version, so use the best ratio"""
+    encodings = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(body, quality=11)
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Best available content coding allowed by an Accept-Encoding header"""
+    allowed = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            allowed[name.lower()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding in available and allowed.get(encoding, allowed.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+def cache_key(view, request, version, allowed=()) -> str:
+    params = sorted(
+        (key, value) for key, values in request.query_params.lists() if key in allowed for value in values
+    )
+    variant = f'{request.path}|{params}|{request.accepted_media_type}|{version.token}'
+    digest = hashlib.blake2b(variant.encode(), digest_size=16).hexdigest()
+    return f'{CACHE_PREFIX}{view.__class__.__name__}:{view.action}:{digest}'
+
+
+def build_entry(view, request, response, view_ms: float) -> dict:
+    """Render a DRF response once and compress it"""
+    started = time.perf_counter()
+    body = request.accepted_renderer.render(
+        response.data, request.accepted_media_type,
+        {'view': view, 'request': request, 'response': response},
+    )
+    rendered = time.perf_counter()
+    encodings = compress(body)
+    content_type = request.accepted_media_type
+    if request.accepted_renderer.charset:
+        content_type = f'{content_type}; charset={request.accepted_renderer.charset}'
+    return {
+        'content_type': content_type,
+        'view_ms': view_ms,
+        'render_ms': (rendered - started) * 1000,
+        'compress_ms': (time.perf_counter() - rendered) * 1000,
+        'encodings': encodings,
+        # Custom headers the view set (e.g. X-Instructor-Name)
+        'headers': {name: value for name, value in response.items() if name.lower().startswith('x-')},
+    }
+
+
+def serve_entry(request, entry, hit: bool) -> HttpResponse:
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), entry['encodings'])
+    response = HttpResponse(entry['encodings'][encoding], content_type=entry['content_type'])
+    for name, value in entry.get('headers', {}).items():
+        response[name] = value
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if hit:
+        response['Server-Timing'] = (
+            f'cache;desc="hit", view-saved;dur={entry["view_ms"]:.2f}, '
+            f'render-saved;dur={entry["render_ms"]:.2f}'
+        )
+    else:
+        response['Server-Timing'] = (
+            f'cache;desc="miss", view;dur={entry["view_ms"]:.2f}, '
+            f'render;dur={entry["render_ms"]:.2f}, compress;dur={entry["compress_ms"]:.2f}'
+        )
+    return response
+
+
+def cache_rendered(*params):
+    """
+    Serve a view method from the pre-rendered response cache
+
+    Args:
+        params: Query parameters the method reads; all others are left out
+                of the cache key, as they cannot change the response
+
+    Only JSON 200 responses of views with a data version are cached; anything
+    else (errors, the browsable API, an unavailable cache) falls through to
+    the normal view and renderer.
+    """
+    allowed = frozenset(params)
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            version = getattr(self, 'data_version', None)
+            if version is None or request.accepted_renderer.format != 'json':
+                return method(self, request, *args, **kwargs)
+
+            key = cache_key(self, request, version, allowed)
+            try:
+                entry = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Response cache unavailable: {str(e)}")
+                return method(self, request, *args, **kwargs)
+            if entry is not None:
+                return serve_entry(request, entry, hit=True)
+
+            started = time.perf_counter()
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != 200 or not hasattr(response, 'data'):
+                return response
+            entry = build_entry(self, request, response, view_ms=(time.perf_counter() - started) * 1000)
+            try:
+                cache.set(key, entry, timeout=settings.RESPONSE_CACHE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not store rendered response: {str(e)}")
+            return serve_entry(request, entry, hit=False)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,63 @@
+"""
+Core tests
+"""
+import os
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from .db import pool_options
+
+
+class SQLiteSetupTests(SimpleTestCase):
+    """Test the PRAGMAs applied to new SQLite connections (core/db.py)"""
+
+    def connect(self):
+        """A new connection to a temporary database file, closed after the test"""
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        for suffix in ('-wal', '-shm'):
+            self.addCleanup(lambda name=path + suffix: os.path.exists(name) and os.remove(name))
+        default = connections['default']
+        wrapper = default.__class__({**default.settings_dict, 'NAME': path}, alias='sqlite-setup-test')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_CONCURRENCY_MODE=True, SQLITE_MMAP_SIZE=4 * 1024 * 1024, SQLITE_BUSY_TIMEOUT_MS=1234)
+    def test_concurrency_mode(self):
+        """Test WAL, synchronous=NORMAL, mmap and busy timeout are set on connect"""
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 4 * 1024 * 1024)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    @override_settings(SQLITE_CONCURRENCY_MODE=False)
+    def test_disabled(self):
+        """Test SQLITE_CONCURRENCY_MODE=False leaves SQLite's defaults"""
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 2)  # FULL
+
+
+class PoolOptionsTests(SimpleTestCase):
+    """Test DB_POOL is refused where Django cannot use it"""
+
+    def test_refused_before_django_5_1(self):
+        with mock.patch('core.db.django.VERSION', (4, 2, 8, 'final', 0)):
+            with self.assertRaises(ImproperlyConfigured):
+                pool_options(2, 10)
+
+    def test_options_on_django_5_1(self):
+        with mock.patch('core.db.django.VERSION', (5, 1, 0, 'final', 0)):
+            self.assertEqual(pool_options(2, 10), {'min_size': 2, 'max_size': 10})
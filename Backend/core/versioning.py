@@ -0,0 +1,167 @@
+"""
+Data versions for conditional GETs
+Each resource ('rooms', 'counts', 'timetable', ...) has a version that writers
+bump and read endpoints turn into a strong ETag and Last-Modified, so an
+unchanged resource is answered with 304 from the cache alone, before any
+database query or serializer runs.
+
+Versions live in the default cache so that every process (web workers and
+camera workers) sees the same value. A version missing from the cache is
+re-created as "changed now", which costs clients one full response at worst.
+"""
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'data-version:'
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """An opaque version token and the time the data last changed (epoch seconds)"""
+    token: str
+    last_modified: float
+
+    @classmethod
+    def combine(cls, versions: Iterable[Optional['DataVersion']]) -> Optional['DataVersion']:
+        """One version for several resources; None if any of them is unknown"""
+        versions = list(versions)
+        if not versions or None in versions:
+            return None
+        if len(versions) == 1:
+            return versions[0]
+        return cls(
+            token='.'.join(version.token for version in versions),
+            last_modified=max(version.last_modified for version in versions),
+        )
+
+
+def _new_version() -> DataVersion:
+    now = time.time_ns()
+    return DataVersion(token=f'{now:x}', last_modified=now / 1e9)
+
+
+def get_version(resource: str) -> Optional[DataVersion]:
+    """Current version of a resource, or None if the cache is unavailable"""
+    key = CACHE_PREFIX + resource
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _new_version(), timeout=None)
+            version = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Data version of {resource} unavailable: {str(e)}")
+        return None
+    return version
+
+
+def bump_version(*resources: str):
+    """Mark resources as changed; call after the write is committed"""
+    version = _new_version()
+    try:
+        cache.set_many({CACHE_PREFIX + resource: version for resource in resources}, timeout=None)
+    except Exception as e:
+        # Never fail a write over this; clients may see stale 304s until the next bump
+        logger.error(f"Could not bump data version of {', '.join(resources)}: {str(e)}")
+
+
+def bump_on_change(model, *resources: str):
+    """Bump resources after every committed save or delete of a model instance"""
+    def handler(sender, **kwargs):
+        transaction.on_commit(lambda: bump_version(*resources))
+
+    for signal in (post_save, post_delete):
+        signal.connect(handler, sender=model, weak=False, dispatch_uid=f'data-version:{model._meta.label}')
+
+
+def file_version(path) -> Optional[DataVersion]:
+    """Version of a file from its stat (mtime, size), or None if it is missing"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return DataVersion(token=f'{stat.st_mtime_ns:x}-{stat.st_size:x}', last_modified=stat.st_mtime)
+
+
+def etag_for(request, version: DataVersion) -> str:
+    """
+    Strong ETag of one representation of a versioned resource
+    The path, query string, Accept and Accept-Encoding headers are part of
+    the tag because they select which representation of the data (and which
+    content coding of it) is returned.
+    """
+    variant = '|'.join([
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        request.META.get('HTTP_ACCEPT_ENCODING', ''),
+    ])
+    digest = hashlib.blake2b(f'{version.token}|{variant}'.encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+class NotModified(APIException):
+    """Raised to short-circuit a view with its conditional (304/412) response"""
+    status_code = 304
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering If-None-Match / If-Modified-Since from data versions
+
+    Declare the resources each action depends on:
+        data_versions = {'list': ('rooms',), 'counts': ('counts',)}
+    The '*' key applies to actions not listed. Actions without resources
+    (e.g. streams) are left alone. Override get_data_version() for versions
+    that do not come from the cache, such as a file on disk.
+    """
+    data_versions = {}
+
+    def get_data_version(self, request) -> Optional[DataVersion]:
+        resources = self.data_versions.get(self.action, self.data_versions.get('*', ()))
+        return DataVersion.combine(get_version(resource) for resource in resources)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.data_version = self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        version = self.data_version = self.get_data_version(request)
+        if version is None:
+            return
+        self.etag = etag_for(request, version)
+        self.last_modified = int(version.last_modified)
+        response = get_conditional_response(
+            request._request, etag=self.etag, last_modified=self.last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', self.etag)
+            response.headers.setdefault('Last-Modified', http_date(self.last_modified))
+        return response
@@ -7,3 +7,9 @@ from django.apps import AppConfig
 class TimetableConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'timetable'
+
+    def ready(self):
+        from core.versioning import bump_on_change
+        from .models import Cohort, Section, Instructor, Course, TimetableEntry
+        for model in (Cohort, Section, Instructor, Course, TimetableEntry):
+            bump_on_change(model, 'timetable')
@@ -0,0 +1,96 @@
+"""
+Classroom availability
+For every classroom and weekday of one term of the timetable JSON, the
+sessions are merged into sorted, non-overlapping busy intervals held as two
+parallel arrays (starts, ends). Terms are kept apart: a room booked in one
+term is not busy in another. Whether a classroom is free over [start, end) is then
+two bisects: O(log n) per classroom, with no scan of the sessions.
+
+Built once per term of a timetable snapshot (see TimetableSnapshot.classroom_availability).
+"""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from .times import day_of_week, parse_interval
+
+# Classroom values that do not name a room
+NO_CLASSROOM = {'', 'n/a', 'tba', 'online'}
+
+
+@dataclass
+class BusyIntervals:
+    """Merged busy intervals of one classroom on one day, in minutes"""
+    starts: List[int] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+
+    @classmethod
+    def merge(cls, intervals: Iterable) -> 'BusyIntervals':
+        merged = cls()
+        for start, end in sorted(intervals):
+            if merged.ends and start <= merged.ends[-1]:
+                merged.ends[-1] = max(merged.ends[-1], end)
+            else:
+                merged.starts.append(start)
+                merged.ends.append(end)
+        return merged
+
+    def overlapping(self, start: int, end: int) -> range:
+        """Indexes of the intervals overlapping [start, end)"""
+        # First interval ending after start, last one starting before end
+        return range(bisect_right(self.ends, start), bisect_left(self.starts, end))
+
+
+EMPTY = BusyIntervals()
+
+
+@dataclass
+class Slot:
+    """Answer for one classroom: the gap around the query if free, the busy span if not"""
+    classroom: str
+    free: bool
+    # Free: the gap containing the query (None = start / end of day)
+    # Busy: first start and last end of the busy intervals overlapping it
+    start: Optional[int]
+    end: Optional[int]
+
+
+class ClassroomAvailability:
+    """Busy intervals per classroom and weekday of one term"""
+
+    def __init__(self, sessions: Iterable):
+        """sessions: store.Session objects of one term (day name and a "Classroom"/"Time" session dict)"""
+        intervals: Dict[str, Dict[int, list]] = {}
+        self.session_counts: Dict[str, int] = {}
+        for session in sessions:
+            classroom = (session.data.get('Classroom') or '').strip()
+            if classroom.lower() in NO_CLASSROOM:
+                continue
+            self.session_counts[classroom] = self.session_counts.get(classroom, 0) + 1
+            days = intervals.setdefault(classroom, {})
+            day = day_of_week(session.day)
+            start, end = parse_interval(session.data.get('Time', ''))
+            if day is not None and start is not None:
+                days.setdefault(day, []).append((start, end))
+        self.classrooms = sorted(intervals)
+        self.busy = {
+            classroom: {day: BusyIntervals.merge(pairs) for day, pairs in days.items()}
+            for classroom, days in intervals.items()
+        }
+
+    def slot(self, classroom: str, day: int, start: int, end: int) -> Slot:
+        busy = self.busy[classroom].get(day, EMPTY)
+        overlapping = busy.overlapping(start, end)
+        if overlapping:
+            return Slot(classroom, False, busy.starts[overlapping.start], busy.ends[overlapping.stop - 1])
+        # overlapping is empty: its start is the interval after the gap
+        after = overlapping.start
+        return Slot(
+            classroom, True,
+            busy.ends[after - 1] if after else None,
+            busy.starts[after] if after < len(busy.starts) else None,
+        )
+
+    def query(self, day: int, start: int, end: int) -> List[Slot]:
+        """Every classroom over [start, end) on day, in name order"""
+        return [self.slot(classroom, day, start, end) for classroom in self.classrooms]
@@ -0,0 +1,161 @@
+"""
+Timetable conflict detection
+Finds instructors and classrooms booked for overlapping sessions. Bookings
+are sorted once by (resource, day, start) and swept with a heap of the
+sessions still running, so the cost is O(n log n) plus the number of
+conflicts instead of comparing every pair of sessions.
+
+Joint sessions (one course taught to several sections together, in the same
+room, even when one section stays longer) are not conflicts. Instructor fields
+naming several people ("Jean De Dieu, H. / Irene, U.") book each of them.
+"""
+import heapq
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.versioning import get_version
+from .availability import NO_CLASSROOM
+from .models import TimetableEntry
+from .times import DAYS, format_clock
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'timetable-conflicts:'
+KINDS = ('instructor', 'classroom')
+NO_INSTRUCTOR = {'', 'unknown', 'tba', 'n/a'}
+INSTRUCTOR_SPLIT_RE = re.compile(r'\s*/\s*')
+
+
+@dataclass(frozen=True)
+class Booking:
+    """One timetable entry with parsed times"""
+    id: int
+    day: int
+    start: int
+    end: int
+    instructor: str
+    classroom: str
+    course: str
+    cohort: str
+    section: str
+
+    def instructors(self) -> List[str]:
+        return [name for name in INSTRUCTOR_SPLIT_RE.split(self.instructor) if name.lower() not in NO_INSTRUCTOR]
+
+    def classrooms(self) -> List[str]:
+        return [] if self.classroom.strip().lower() in NO_CLASSROOM else [self.classroom]
+
+    def as_dict(self) -> dict:
+        return {
+            'id': self.id, 'cohort': self.cohort, 'section': self.section, 'course': self.course,
+            'instructor': self.instructor, 'classroom': self.classroom,
+            'time': f'{format_clock(self.start)}-{format_clock(self.end)}',
+        }
+
+
+@dataclass
+class Conflict:
+    kind: str
+    resource: str
+    day: int
+    # Overlap of the two sessions
+    start: int
+    end: int
+    bookings: List[Booking]
+
+    def as_dict(self) -> dict:
+        return {
+            'kind': self.kind, 'resource': self.resource, 'day': DAYS[self.day],
+            'start': format_clock(self.start), 'end': format_clock(self.end),
+            'sessions': [booking.as_dict() for booking in self.bookings],
+        }
+
+
+@dataclass
+class ConflictReport:
+    sessions: int = 0
+    conflicts: List[Conflict] = field(default_factory=list)
+
+    def count(self, kind: str) -> int:
+        return sum(1 for conflict in self.conflicts if conflict.kind == kind)
+
+    def as_dict(self, kind: Optional[str] = None) -> dict:
+        return {
+            'sessions': self.sessions,
+            **{f'{name}_conflicts': self.count(name) for name in KINDS},
+            'conflicts': [conflict.as_dict() for conflict in self.conflicts if kind in (None, conflict.kind)],
+        }
+
+
+def is_joint(a: Booking, b: Booking, kind: str) -> bool:
+    """Whether two overlapping bookings are one session shared by several sections"""
+    if a.course != b.course:
+        return False
+    if kind == 'classroom':
+        return True
+    # Same instructor in two named rooms at once is a real conflict
+    return a.classroom == b.classroom or not a.classrooms() or not b.classrooms()
+
+
+def sweep(bookings: Iterable[Booking], kind: str, resources_of: Callable[[Booking], List[str]]) -> List[Conflict]:
+    """Overlapping pairs of bookings sharing a resource"""
+    events = sorted(
+        (resource, booking.day, booking.start, booking.end, booking.id, booking)
+        for booking in bookings for resource in resources_of(booking)
+    )
+    conflicts = []
+    group, running = None, []
+    for resource, day, start, end, _, booking in events:
+        if (resource, day) != group:
+            group, running = (resource, day), []
+        # Drop sessions that ended by the time this one starts
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        for other_end, _, other in running:
+            if not is_joint(other, booking, kind):
+                conflicts.append(Conflict(kind, resource, day, start, min(end, other_end), [other, booking]))
+        heapq.heappush(running, (end, booking.id, booking))
+    return conflicts
+
+
+def load_bookings(queryset=None) -> List[Booking]:
+    """Bookings of the entries with parsed times (one query)"""
+    queryset = TimetableEntry.objects.all() if queryset is None else queryset
+    rows = queryset.filter(day_of_week__isnull=False, start_minute__isnull=False).order_by().values_list(
+        'id', 'day_of_week', 'start_minute', 'end_minute', 'instructor__name', 'classroom',
+        'course__name', 'cohort__name', 'section__name',
+    )
+    return [Booking(*row) for row in rows]
+
+
+def detect(queryset=None) -> ConflictReport:
+    """Instructor and classroom conflicts of the timetable entries"""
+    bookings = load_bookings(queryset)
+    conflicts = sweep(bookings, 'instructor', Booking.instructors) + sweep(bookings, 'classroom', Booking.classrooms)
+    conflicts.sort(key=lambda conflict: (conflict.day, conflict.start, conflict.kind, conflict.resource))
+    return ConflictReport(sessions=len(bookings), conflicts=conflicts)
+
+
+def cached_report(refresh: bool = False) -> ConflictReport:
+    """detect() of the current timetable version, computed once per version"""
+    version = get_version('timetable')
+    if version is None:
+        return detect()
+    key = CACHE_PREFIX + version.token
+    try:
+        report = None if refresh else cache.get(key)
+    except Exception as e:
+        logger.warning(f"Timetable conflicts cache unavailable: {str(e)}")
+        return detect()
+    if report is None:
+        report = detect()
+        try:
+            cache.set(key, report, timeout=settings.RESPONSE_CACHE_SECONDS)
+        except Exception as e:
+            logger.warning(f"Could not cache timetable conflicts: {str(e)}")
+    return report
@@ -0,0 +1,69 @@
+"""
+Timetable entry filters
+Times are given as "14:30" (or "2:30 pm") and days as names or 0-6, and are
+matched against the indexed day_of_week / start_minute / end_minute columns.
+"""
+from django import forms
+import django_filters
+
+from .models import TimetableEntry
+from .times import day_of_week, parse_clock
+
+
+class ClockField(forms.CharField):
+    """Form field turning "14:30" into minutes since midnight"""
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value in self.empty_values:
+            return None
+        minute = parse_clock(value)
+        if minute is None:
+            raise forms.ValidationError(f'Invalid time "{value}", expected HH:MM')
+        return minute
+
+
+class DayField(forms.CharField):
+    """Form field turning "Monday", "mon" or "0" into 0-6"""
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value in self.empty_values:
+            return None
+        day = day_of_week(value)
+        if day is None:
+            raise forms.ValidationError(f'Invalid day "{value}"')
+        return day
+
+
+class ClockFilter(django_filters.Filter):
+    field_class = ClockField
+
+
+class DayFilter(django_filters.Filter):
+    field_class = DayField
+
+
+class TimetableEntryFilter(django_filters.FilterSet):
+    """
+    ?day=Monday - sessions on a day
+    ?at=14:30 - sessions running at a time (with ?day=, "what is on now")
+    ?start=14:00&end=15:00 - sessions overlapping [start, end); either bound alone
+                             gives sessions ending after start / starting before end
+    ?starts_after= ?starts_before= ?ends_after= ?ends_before= - inclusive ranges
+    """
+    day = DayFilter(field_name='day_of_week')
+    at = ClockFilter(method='filter_at')
+    start = ClockFilter(field_name='end_minute', lookup_expr='gt')
+    end = ClockFilter(field_name='start_minute', lookup_expr='lt')
+    starts_after = ClockFilter(field_name='start_minute', lookup_expr='gte')
+    starts_before = ClockFilter(field_name='start_minute', lookup_expr='lte')
+    ends_after = ClockFilter(field_name='end_minute', lookup_expr='gte')
+    ends_before = ClockFilter(field_name='end_minute', lookup_expr='lte')
+
+    class Meta:
+        model = TimetableEntry
+        fields = ['cohort', 'section', 'instructor', 'course', 'session', 'type', 'classroom', 'day_of_week']
+
+    def filter_at(self, queryset, name, value):
+        return queryset.filter(start_minute__lte=value, end_minute__gt=value)
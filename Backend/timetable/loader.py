@@ -0,0 +1,326 @@
+"""
+Bulk timetable loading
+Turns the timetable JSON into database rows with a fixed number of queries:
+existing cohorts, sections, instructors, courses and entries are read into
+dictionaries once, missing ones are created with bulk_create, and entries
+are inserted in batches, all in one transaction. Used by
+`manage.py load_timetable --bulk`.
+
+sync() (`load_timetable --sync`) makes the entries match the JSON instead:
+each section's sessions are hashed and compared with Section.synced_digest,
+and only the entries of sections whose hash changed are read and diffed, so
+a sync costs in proportion to the sections that changed.
+"""
+import hashlib
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.versioning import bump_version
+from .models import Cohort, Course, Instructor, Section, TimetableEntry
+
+
+def extract_course_code(course_name: str) -> str:
+    """Course code from the first letters of each word of its name"""
+    words = course_name.split()
+    code = ''.join([word[0].upper() for word in words if word])
+    return code[:20] if code else 'UNKNOWN'
+
+
+@dataclass(frozen=True)
+class SessionRow:
+    """One session of the JSON, flattened"""
+    cohort: str
+    section: str
+    day: str
+    time_interval: str
+    instructor: str
+    course_name: str
+    course_code: str
+    type: str
+    classroom: str
+
+
+def parse_sessions(data: dict) -> Tuple[List[SessionRow], List[str]]:
+    """
+    Flatten the timetable JSON
+
+    Returns:
+        (rows, skipped section names); section names must look like
+        "<cohort>_Section_<letter>"
+    """
+    rows, skipped = [], []
+    for term, sections in data.items():
+        for section_name, days in sections.items():
+            parts = section_name.split('_Section_')
+            if len(parts) != 2:
+                skipped.append(section_name)
+                continue
+            cohort_name, section_letter = parts
+            for day, sessions in days.items():
+                for session_data in sessions.values():
+                    course_name = session_data.get('Course', 'Unknown')
+                    rows.append(SessionRow(
+                        cohort=cohort_name,
+                        section=section_letter,
+                        day=day,
+                        time_interval=session_data.get('Time', '00:00-00:00'),
+                        instructor=session_data.get('Instructor', 'Unknown'),
+                        course_name=course_name,
+                        course_code=extract_course_code(course_name),
+                        type=session_data.get('Type', 'Lecture'),
+                        classroom=session_data.get('Classroom', 'N/A'),
+                    ))
+    return rows, skipped
+
+
+@dataclass
+class LoadResult:
+    sessions: int = 0
+    created: Dict[str, int] = field(default_factory=dict)
+    # Seconds per phase, in order
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+
+def ensure(model, keys, key_of, build, lookup, batch_size):
+    """
+    Ids of every key, creating the missing rows
+    key_of(row values) -> key, build(key) -> unsaved instance and
+    lookup(keys) -> queryset of the rows with those keys
+    Returns ({key: id}, number created)
+    """
+    keys = set(keys)
+    ids = {key_of(values): values[-1] for values in lookup(keys)}
+    missing = keys - ids.keys()
+    if missing:
+        model.objects.bulk_create([build(key) for key in missing], batch_size=batch_size, ignore_conflicts=True)
+        # ignore_conflicts leaves pks unset; read the new ids back
+        ids.update({key_of(values): values[-1] for values in lookup(missing)})
+    return ids, len(missing)
+
+
+def resolve_ids(rows: List[SessionRow], batch_size: int, created: Dict[str, int]):
+    """
+    Ids of every cohort, section, instructor and course in rows, creating
+    the missing ones; counts of created rows are stored in created
+    Returns ({cohort: id}, {(cohort id, section): id}, {instructor: id}, {course code: id})
+    """
+    cohorts, created['cohorts'] = ensure(
+        Cohort, {row.cohort for row in rows},
+        key_of=lambda values: values[0],
+        build=lambda name: Cohort(name=name),
+        lookup=lambda names: Cohort.objects.filter(name__in=names).values_list('name', 'id'),
+        batch_size=batch_size,
+    )
+    sections, created['sections'] = ensure(
+        Section, {(cohorts[row.cohort], row.section) for row in rows},
+        key_of=lambda values: (values[0], values[1]),
+        build=lambda key: Section(cohort_id=key[0], name=key[1]),
+        lookup=lambda keys: Section.objects.filter(
+            cohort_id__in={cohort for cohort, _ in keys}, name__in={name for _, name in keys}
+        ).values_list('cohort_id', 'name', 'id'),
+        batch_size=batch_size,
+    )
+    instructors, created['instructors'] = ensure(
+        Instructor, {row.instructor for row in rows},
+        key_of=lambda values: values[0],
+        build=lambda name: Instructor(name=name),
+        lookup=lambda names: Instructor.objects.filter(name__in=names).values_list('name', 'id'),
+        batch_size=batch_size,
+    )
+    # Codes are derived from names and may collide: the first name wins
+    course_names = {}
+    for row in rows:
+        course_names.setdefault(row.course_code, row.course_name)
+    courses, created['courses'] = ensure(
+        Course, course_names.keys(),
+        key_of=lambda values: values[0],
+        build=lambda code: Course(code=code, name=course_names[code]),
+        lookup=lambda codes: Course.objects.filter(code__in=codes).values_list('code', 'id'),
+        batch_size=batch_size,
+    )
+    return cohorts, sections, instructors, courses
+
+
+def bulk_load(rows: List[SessionRow], batch_size: int = 1000) -> LoadResult:
+    """
+    Insert the entries of rows that are not in the database yet
+
+    Like the row-by-row loader, existing entries (same cohort, section,
+    instructor, day and time) are left as they are and the first of
+    duplicate sessions wins. Runs in one transaction.
+    """
+    result = LoadResult(sessions=len(rows))
+
+    def phase(name, started):
+        now = time.perf_counter()
+        result.timings[name] = now - started
+        return now
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        cohorts, sections, instructors, courses = resolve_ids(rows, batch_size, result.created)
+        started = phase('lookups', started)
+
+        section_ids = set(sections.values())
+        seen = set(TimetableEntry.objects.filter(section_id__in=section_ids).values_list(
+            'cohort_id', 'section_id', 'instructor_id', 'session', 'time_interval'
+        ))
+        entries = []
+        for row in rows:
+            cohort = cohorts[row.cohort]
+            key = (cohort, sections[(cohort, row.section)], instructors[row.instructor], row.day, row.time_interval)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = TimetableEntry(
+                cohort_id=key[0], section_id=key[1], instructor_id=key[2], course_id=courses[row.course_code],
+                session=row.day, time_interval=row.time_interval, type=row.type, classroom=row.classroom,
+            )
+            # bulk_create skips save(), which fills these
+            entry.set_time_columns()
+            entries.append(entry)
+        started = phase('diff', started)
+
+        TimetableEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+        result.created['entries'] = len(entries)
+        # bulk_create sends no signals, so bump the data version by hand
+        transaction.on_commit(lambda: bump_version('timetable'))
+    phase('insert', started)
+    return result
+
+
+@dataclass
+class SyncResult:
+    sessions: int = 0
+    # Sections whose entries were diffed, of all sections in the JSON or the database
+    sections_changed: int = 0
+    sections: int = 0
+    created: Dict[str, int] = field(default_factory=dict)
+    updated: int = 0
+    deleted: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created.get('entries') or self.updated or self.deleted)
+
+
+def section_digest(rows: List[SessionRow]) -> str:
+    """Hash of the sessions of one section, independent of their order in the JSON"""
+    digest = hashlib.blake2b(digest_size=16)
+    for row in sorted(rows, key=lambda row: (row.day, row.time_interval, row.instructor)):
+        digest.update('\x1f'.join((
+            row.day, row.time_interval, row.instructor, row.course_code, row.type, row.classroom,
+        )).encode())
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+EMPTY_DIGEST = section_digest([])
+
+
+def sync(rows: List[SessionRow], batch_size: int = 1000, full: bool = False) -> SyncResult:
+    """
+    Insert, update and delete entries so that the database matches rows
+
+    Entries are keyed like the unique constraint (cohort, section,
+    instructor, day, time); course, type and classroom are updated in place,
+    so unchanged entries keep their ids. Sections whose digest matches their
+    synced_digest are skipped unless full is set (use it after editing
+    entries by other means). Runs in one transaction.
+    """
+    result = SyncResult(sessions=len(rows))
+
+    def phase(name, started):
+        now = time.perf_counter()
+        result.timings[name] = now - started
+        return now
+
+    started = time.perf_counter()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row.cohort, row.section)].append(row)
+    digests = {key: section_digest(group) for key, group in groups.items()}
+
+    with transaction.atomic():
+        stored = {
+            (cohort, name): (section_id, digest)
+            for cohort, name, section_id, digest in Section.objects.values_list(
+                'cohort__name', 'name', 'id', 'synced_digest'
+            ).order_by()
+        }
+        changed = [key for key in groups if full or stored.get(key, (None, ''))[1] != digests[key]]
+        # Sections that left the JSON: their entries go, once
+        removed = [
+            section_id for key, (section_id, digest) in stored.items()
+            if key not in groups and (full or digest != EMPTY_DIGEST)
+        ]
+        result.sections = len(stored.keys() | groups.keys())
+        result.sections_changed = len(changed) + len(removed)
+        changed_rows = [row for key in changed for row in groups[key]]
+        cohorts, sections, instructors, courses = resolve_ids(changed_rows, batch_size, result.created)
+        started = phase('lookups', started)
+
+        desired = {}
+        for row in changed_rows:
+            cohort = cohorts[row.cohort]
+            key = (cohort, sections[(cohort, row.section)], instructors[row.instructor], row.day, row.time_interval)
+            # First of duplicate sessions wins, as in the other loaders
+            desired.setdefault(key, (courses[row.course_code], row.type, row.classroom))
+
+        section_ids = {sections[(cohorts[cohort], name)] for cohort, name in changed} | set(removed)
+        inserts, updates, deletes = [], [], []
+        now = timezone.now()
+        for entry_id, *key, course_id, entry_type, classroom in TimetableEntry.objects.filter(
+            section_id__in=section_ids
+        ).values_list(
+            'id', 'cohort_id', 'section_id', 'instructor_id', 'session', 'time_interval',
+            'course_id', 'type', 'classroom',
+        ).iterator(chunk_size=batch_size):
+            values = desired.pop(tuple(key), None)
+            if values is None:
+                deletes.append(entry_id)
+            elif values != (course_id, entry_type, classroom):
+                updates.append(TimetableEntry(
+                    id=entry_id, course_id=values[0], type=values[1], classroom=values[2], updated_at=now,
+                ))
+        for key, (course_id, entry_type, classroom) in desired.items():
+            entry = TimetableEntry(
+                cohort_id=key[0], section_id=key[1], instructor_id=key[2], course_id=course_id,
+                session=key[3], time_interval=key[4], type=entry_type, classroom=classroom,
+            )
+            entry.set_time_columns()
+            inserts.append(entry)
+        started = phase('diff', started)
+
+        TimetableEntry.objects.bulk_create(inserts, batch_size=batch_size)
+        TimetableEntry.objects.bulk_update(
+            updates, ['course', 'type', 'classroom', 'updated_at'], batch_size=batch_size
+        )
+        for index in range(0, len(deletes), batch_size):
+            TimetableEntry.objects.filter(id__in=deletes[index:index + batch_size]).delete()
+        result.created['entries'], result.updated, result.deleted = len(inserts), len(updates), len(deletes)
+
+        synced = [
+            Section(id=sections[(cohorts[cohort], name)], synced_digest=digests[(cohort, name)])
+            for cohort, name in changed
+        ] + [Section(id=section_id, synced_digest=EMPTY_DIGEST) for section_id in removed]
+        Section.objects.bulk_update(synced, ['synced_digest'], batch_size=batch_size)
+        if result.changed:
+            # bulk_create and bulk_update send no signals, so bump the data version by hand
+            transaction.on_commit(lambda: bump_version('timetable'))
+    phase('apply', started)
+    return result
@@ -0,0 +1,50 @@
+"""
+Django management command that lists double-booked instructors and classrooms
+Usage: python manage.py check_timetable_conflicts [--kind instructor|classroom] [--fail]
+
+Checks the timetable entries in the database (see timetable/conflicts.py).
+load_timetable runs the same check after every load and prints a summary.
+--fail exits with an error when there are conflicts, for CI or cron jobs.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable.conflicts import KINDS, cached_report
+from timetable.times import DAYS, format_clock
+
+
+class Command(BaseCommand):
+    help = 'List instructors and classrooms booked for overlapping sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=KINDS,
+            default=None,
+            help='Only check instructors or only classrooms',
+        )
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Exit with an error if any conflict is found',
+        )
+
+    def handle(self, *args, **options):
+        report = cached_report(refresh=True)
+        conflicts = [conflict for conflict in report.conflicts if options['kind'] in (None, conflict.kind)]
+
+        for conflict in conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'[{conflict.kind}] {conflict.resource}: {DAYS[conflict.day]} '
+                f'{format_clock(conflict.start)}-{format_clock(conflict.end)}'
+            ))
+            for booking in conflict.bookings:
+                self.stdout.write(
+                    f'    {booking.cohort} {booking.section} - {booking.course} '
+                    f'({booking.instructor}, {booking.classroom}) {booking.as_dict()["time"]}'
+                )
+
+        counts = ', '.join(f'{report.count(kind)} {kind}' for kind in KINDS if options['kind'] in (None, kind))
+        summary = f'{len(conflicts)} conflicts in {report.sessions} sessions ({counts})'
+        if conflicts and options['fail']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary) if not conflicts else summary)
@@ -1,11 +1,28 @@
 """
 Django management command to load timetable data from JSON file
-Usage: python manage.py load_timetable
+Usage: python manage.py load_timetable [--bulk [--batch-size 1000]] [--clear]
+       python manage.py load_timetable --sync [--full] [--watch [--interval 2]]
+
+--bulk loads everything in one transaction with a fixed number of queries
+(see timetable/loader.py) and prints a timing summary instead of one line
+per row.
+
+--sync inserts, updates and deletes entries so that the database matches
+the JSON, touching only the sections that changed since the last sync
+(--full compares every section). --watch keeps running and syncs again
+whenever the file changes.
+
+Every mode ends with a check for double-booked instructors and classrooms
+(see timetable/conflicts.py); --skip-conflict-check turns it off.
 """
 import json
 import os
+import time
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from core.versioning import file_version
+from timetable.conflicts import KINDS, cached_report
+from timetable.loader import bulk_load, extract_course_code, parse_sessions, sync
 from timetable.models import Cohort, Section, Instructor, Course, TimetableEntry
 
 
@@ -24,8 +41,47 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing timetable data before loading',
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Load with preloaded lookups and batched inserts in one transaction',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT in --bulk and --sync mode',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Apply only the inserts, updates and deletes needed to match the JSON',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='With --sync, diff every section instead of only the changed ones',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and sync whenever the JSON file changes (implies --sync)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds between checks of the JSON file in --watch mode',
+        )
+        parser.add_argument(
+            '--skip-conflict-check',
+            action='store_true',
+            help='Do not check for double-booked instructors and classrooms after loading',
+        )
 
     def handle(self, *args, **options):
+        self.check_conflicts = not options['skip_conflict_check']
+        
         # Get JSON file path
         json_file = options.get('json_file')
         
@@ -38,6 +94,17 @@ class Command(BaseCommand):
         if not os.path.exists(json_file):
             raise CommandError(f'JSON file not found: {json_file}')
         
+        if options['sync'] or options['watch']:
+            if options['clear'] or options['bulk']:
+                raise CommandError('--sync cannot be combined with --clear or --bulk')
+            if options['batch_size'] <= 0:
+                raise CommandError('--batch-size must be positive')
+            if options['watch']:
+                self._watch(json_file, options['interval'], options['batch_size'], options['full'])
+            else:
+                self._sync(self._read_json(json_file), options['batch_size'], options['full'])
+            return
+        
         # Clear existing data if requested
         if options.get('clear'):
             self.stdout.write(self.style.WARNING('Clearing existing timetable data...'))
@@ -45,11 +112,12 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('Timetable data cleared'))
         
         # Load JSON
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception as e:
-            raise CommandError(f'Error loading JSON file: {str(e)}')
+        data = self._read_json(json_file)
+        
+        if options['bulk']:
+            self._bulk_load(data, options['batch_size'])
+            self._report_conflicts()
+            return
         
         # Parse and load data
         total_entries = 0
@@ -132,10 +200,95 @@ class Command(BaseCommand):
                 f'\nSuccessfully loaded {total_entries} timetable entries!'
             )
         )
+        self._report_conflicts()
+    
+    def _read_json(self, json_file):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            raise CommandError(f'Error loading JSON file: {str(e)}')
+    
+    def _sync(self, data, batch_size, full):
+        """Sync with timetable.loader.sync and print what changed"""
+        started = time.perf_counter()
+        rows, skipped = parse_sessions(data)
+        parse_seconds = time.perf_counter() - started
+        for section_name in skipped:
+            self.stdout.write(self.style.WARNING(f'  Skipping invalid section name: {section_name}'))
+        
+        result = sync(rows, batch_size=batch_size, full=full)
+        phases = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in result.timings.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Synced {result.sessions} sessions in {parse_seconds + result.elapsed:.2f}s: '
+                f'{result.created["entries"]} created, {result.updated} updated, {result.deleted} deleted '
+                f'({result.sections_changed} of {result.sections} sections changed)\n'
+                f'  Timings: parse {parse_seconds:.2f}s, {phases}'
+            )
+        )
+        # Nothing changed: the report of this timetable version is still valid
+        self._report_conflicts(refresh=result.changed)
+        return result
+    
+    def _watch(self, json_file, interval, batch_size, full):
+        """Sync now, then again every time the file's mtime or size changes"""
+        self.stdout.write(f'Watching {json_file} (every {interval:g}s, Ctrl+C to stop)')
+        synced = None
+        try:
+            while True:
+                version = file_version(json_file)
+                if version is not None and version != synced:
+                    try:
+                        self._sync(self._read_json(json_file), batch_size, full)
+                    except CommandError as e:
+                        # Usually a file caught mid-write: retry on the next check
+                        self.stdout.write(self.style.WARNING(str(e)))
+                    else:
+                        synced = version
+                        # Later syncs only need the sections that changed
+                        full = False
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped watching')
+    
+    def _report_conflicts(self, refresh=True):
+        """Print how many instructor and classroom conflicts the loaded timetable has"""
+        if not self.check_conflicts:
+            return
+        report = cached_report(refresh=refresh)
+        counts = ', '.join(f'{report.count(kind)} {kind}' for kind in KINDS)
+        if report.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'  Conflicts: {counts} (run check_timetable_conflicts for details)'
+            ))
+        else:
+            self.stdout.write('  Conflicts: none')
+    
+    def _bulk_load(self, data, batch_size):
+        """Load with timetable.loader.bulk_load and print a timing summary"""
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        
+        started = time.perf_counter()
+        rows, skipped = parse_sessions(data)
+        parse_seconds = time.perf_counter() - started
+        for section_name in skipped:
+            self.stdout.write(self.style.WARNING(f'  Skipping invalid section name: {section_name}'))
+        
+        result = bulk_load(rows, batch_size=batch_size)
+        created = ', '.join(f'{count} {name}' for name, count in result.created.items())
+        phases = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in result.timings.items())
+        total = parse_seconds + result.elapsed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nLoaded {result.sessions} sessions in {total:.2f}s '
+                f'({result.sessions / total if total else 0:.0f} sessions/s)\n'
+                f'  Created: {created}\n'
+                f'  Timings: parse {parse_seconds:.2f}s, {phases}'
+            )
+        )
     
     def _extract_course_code(self, course_name):
         """Extract a course code from course name"""
-        # Create a simple code from the first letters of each word
-        words = course_name.split()
-        code = ''.join([word[0].upper() for word in words if word])
-        return code[:20] if code else 'UNKNOWN'
+        return extract_course_code(course_name)
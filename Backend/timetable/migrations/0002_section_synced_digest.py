@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='synced_digest',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0002_section_synced_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timetableentry',
+            name='day_of_week',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='timetableentry',
+            name='end_minute',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='timetableentry',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['day_of_week', 'start_minute', 'end_minute'], name='timetable_day_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['classroom', 'day_of_week', 'start_minute'], name='timetable_room_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['instructor', 'day_of_week', 'start_minute'], name='timetable_instr_time_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from timetable.times import day_of_week, parse_interval
+
+BATCH_SIZE = 1000
+
+
+def fill_time_columns(apps, schema_editor):
+    """Parse session and time_interval of the existing entries"""
+    TimetableEntry = apps.get_model('timetable', 'TimetableEntry')
+    batch = []
+    for entry in TimetableEntry.objects.only('id', 'session', 'time_interval').iterator(chunk_size=BATCH_SIZE):
+        entry.day_of_week = day_of_week(entry.session)
+        entry.start_minute, entry.end_minute = parse_interval(entry.time_interval)
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            TimetableEntry.objects.bulk_update(batch, ['day_of_week', 'start_minute', 'end_minute'])
+            batch = []
+    TimetableEntry.objects.bulk_update(batch, ['day_of_week', 'start_minute', 'end_minute'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0003_entry_time_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_time_columns, migrations.RunPython.noop),
+    ]
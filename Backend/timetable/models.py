@@ -3,6 +3,8 @@ Timetable app models
 """
 from django.db import models
 
+from .times import day_of_week, parse_interval
+
 
 class Cohort(models.Model):
     """
@@ -28,6 +30,8 @@ class Section(models.Model):
     """
     name = models.CharField(max_length=100)
     cohort = models.ForeignKey(Cohort, on_delete=models.CASCADE, related_name='sections')
+    # Digest of this section's sessions at the last `load_timetable --sync`
+    synced_digest = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -101,6 +105,11 @@ class TimetableEntry(models.Model):
     type = models.CharField(max_length=50, choices=TYPE_CHOICES, default='Lecture')
     classroom = models.CharField(max_length=255, default='N/A')
     
+    # Parsed from session and time_interval on save (null if they do not parse)
+    day_of_week = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)  # 0 = Monday
+    start_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)  # since midnight
+    end_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -108,6 +117,23 @@ class TimetableEntry(models.Model):
         ordering = ['cohort', 'section', 'session']
         verbose_name_plural = 'Timetable Entries'
         unique_together = ['cohort', 'section', 'instructor', 'session', 'time_interval']
+        indexes = [
+            models.Index(fields=['day_of_week', 'start_minute', 'end_minute'], name='timetable_day_time_idx'),
+            models.Index(fields=['classroom', 'day_of_week', 'start_minute'], name='timetable_room_time_idx'),
+            models.Index(fields=['instructor', 'day_of_week', 'start_minute'], name='timetable_instr_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cohort.name} - {self.session} - {self.time_interval}"
+    
+    def set_time_columns(self):
+        """Fill day_of_week, start_minute and end_minute from session and time_interval"""
+        self.day_of_week = day_of_week(self.session)
+        self.start_minute, self.end_minute = parse_interval(self.time_interval)
+    
+    def save(self, *args, **kwargs):
+        self.set_time_columns()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'session', 'time_interval'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'day_of_week', 'start_minute', 'end_minute'}
+        super().save(*args, **kwargs)
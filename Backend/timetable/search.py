@@ -0,0 +1,160 @@
+"""
+Instructor name search
+An inverted index from normalised name tokens ("Dieudonne, U." -> dieudonne,
+u) to instructors, held in a prefix trie. A query matches an instructor when
+every query token matches one of the instructor's tokens exactly, as a
+prefix, or within a bounded edit distance; the Levenshtein rows are computed
+while walking the trie, so branches that cannot match are never visited.
+
+Built once per timetable snapshot (see TimetableSnapshot.instructor_index).
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Cost of a prefix match relative to an exact match (0) and one edit (1)
+PREFIX_COST = 0.5
+
+
+def normalise(text: str) -> List[str]:
+    """Lower-case ASCII tokens: 'Dr. Jean-Claude, S.' -> ['dr', 'jean', 'claude', 's']"""
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return TOKEN_RE.findall(ascii_text.lower())
+
+
+def default_max_distance(token: str) -> int:
+    """Edits allowed for a query token: none for short tokens, up to two for long ones"""
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 6 else 2
+
+
+@dataclass
+class Match:
+    name: str
+    score: float
+
+
+class TrieNode:
+    __slots__ = ('children', 'names', 'below')
+
+    def __init__(self):
+        self.children: Dict[str, 'TrieNode'] = {}
+        # Instructors with a token ending here / with a token passing through here
+        self.names = set()
+        self.below = set()
+
+
+class InstructorIndex:
+    """Prefix trie over instructor name tokens"""
+
+    def __init__(self, names: Iterable[str]):
+        self.root = TrieNode()
+        self.names = set()
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str):
+        self.names.add(name)
+        for token in normalise(name):
+            node = self.root
+            for char in token:
+                node = node.children.setdefault(char, TrieNode())
+                node.below.add(name)
+            node.names.add(name)
+
+    def _node(self, prefix: str) -> Optional[TrieNode]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy(self, token: str, max_distance: int) -> Dict[str, int]:
+        """Instructors with a token within max_distance edits of token"""
+        found = {}
+        columns = list(enumerate(token, start=1))
+
+        def walk(node, char, previous):
+            # One Levenshtein row per trie node; comparisons inlined (hot loop)
+            left = lowest = previous[0] + 1
+            row = [left]
+            for i, token_char in columns:
+                cost = previous[i - 1] if token_char == char else previous[i - 1] + 1
+                if previous[i] + 1 < cost:
+                    cost = previous[i] + 1
+                if left + 1 < cost:
+                    cost = left + 1
+                if cost < lowest:
+                    lowest = cost
+                row.append(cost)
+                left = cost
+            if left <= max_distance:
+                for name in node.names:
+                    found[name] = min(found.get(name, left), left)
+            if lowest <= max_distance:
+                for next_char, child in node.children.items():
+                    walk(child, next_char, row)
+
+        first = list(range(len(token) + 1))
+        for char, child in self.root.children.items():
+            walk(child, char, first)
+        return found
+
+    def _token_costs(self, token: str, max_distance: Optional[int]) -> Dict[str, float]:
+        """
+        Best cost per instructor for one query token
+        Typos are only looked for when the token matches nothing exactly or
+        as a prefix, since those matches would rank first anyway
+        """
+        node = self._node(token)
+        if node is not None:
+            costs = dict.fromkeys(node.below, PREFIX_COST)
+            costs.update(dict.fromkeys(node.names, 0.0))
+            return costs
+        distance = default_max_distance(token) if max_distance is None else max_distance
+        if not distance:
+            return {}
+        return {name: float(cost) for name, cost in self._fuzzy(token, distance).items()}
+
+    def search(self, query: str, limit: int = 10, max_distance: Optional[int] = None) -> List[Match]:
+        """
+        Instructors matching every token of query, best first
+
+        Args:
+            query: Free text, e.g. "dieudone" or "sam b"
+            limit: Maximum number of matches
+            max_distance: Edits allowed per token (default: by token length)
+
+        Returns:
+            List of Match(name, score); score 0 is an exact match
+        """
+        tokens = normalise(query)
+        if not tokens:
+            return []
+        scores = None
+        for token in tokens:
+            costs = self._token_costs(token, max_distance)
+            if scores is None:
+                scores = costs
+            else:
+                scores = {name: score + costs[name] for name, score in scores.items() if name in costs}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (item[1], item[0]))
+        return [Match(name, score) for name, score in ranked[:limit]]
+
+    def resolve(self, query: str) -> List[str]:
+        """
+        The instructor a (possibly misspelt) name refers to
+        The exact name if it exists, otherwise every best-scoring match
+        (one name unless the query is ambiguous, none if nothing matches)
+        """
+        if query in self.names:
+            return [query]
+        matches = self.search(query)
+        return [match.name for match in matches if match.score == matches[0].score] if matches else []
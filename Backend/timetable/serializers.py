@@ -2,10 +2,11 @@
 Timetable app serializers
 """
 from rest_framework import serializers
+from core.mixins import DynamicFieldsMixin
 from .models import Cohort, Section, Instructor, Course, TimetableEntry
 
 
-class CohortSerializer(serializers.ModelSerializer):
+class CohortSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Cohort model"""
     class Meta:
         model = Cohort
@@ -13,7 +14,7 @@ class CohortSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SectionSerializer(serializers.ModelSerializer):
+class SectionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Section model"""
     cohort_name = serializers.CharField(source='cohort.name', read_only=True)
     
@@ -21,9 +22,10 @@ class SectionSerializer(serializers.ModelSerializer):
         model = Section
         fields = ['id', 'name', 'cohort', 'cohort_name', 'created_at']
         read_only_fields = ['id', 'created_at']
+        expandable_fields = {'cohort': 'timetable.serializers.CohortSerializer'}
 
 
-class InstructorSerializer(serializers.ModelSerializer):
+class InstructorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Instructor model"""
     class Meta:
         model = Instructor
@@ -31,7 +33,7 @@ class InstructorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Course model"""
     class Meta:
         model = Course
@@ -39,7 +41,7 @@ class CourseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class TimetableEntrySerializer(serializers.ModelSerializer):
+class TimetableEntrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for TimetableEntry model"""
     cohort_name = serializers.CharField(source='cohort.name', read_only=True)
     section_name = serializers.CharField(source='section.name', read_only=True)
@@ -53,12 +55,19 @@ class TimetableEntrySerializer(serializers.ModelSerializer):
             'id', 'cohort', 'cohort_name', 'section', 'section_name',
             'instructor', 'instructor_name', 'course', 'course_name',
             'course_code', 'session', 'time_interval', 'type', 'classroom',
+            'day_of_week', 'start_minute', 'end_minute',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'day_of_week', 'start_minute', 'end_minute', 'created_at', 'updated_at']
+        expandable_fields = {
+            'cohort': 'timetable.serializers.CohortSerializer',
+            'section': 'timetable.serializers.SectionSerializer',
+            'instructor': 'timetable.serializers.InstructorSerializer',
+            'course': 'timetable.serializers.CourseSerializer',
+        }
 
 
-class TimetableStudentViewSerializer(serializers.ModelSerializer):
+class TimetableStudentViewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Simplified serializer for student view - returns only relevant fields
     """
@@ -74,7 +83,7 @@ class TimetableStudentViewSerializer(serializers.ModelSerializer):
         ]
 
 
-class TimetableInstructorViewSerializer(serializers.ModelSerializer):
+class TimetableInstructorViewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Simplified serializer for instructor view
     """
@@ -0,0 +1,157 @@
+"""
+In-memory timetable store
+The timetable JSON ({term: {section: {day: {session: {...}}}}}) is parsed once
+per process and kept with indexes by term, section, instructor, classroom and
+day. Every access costs one os.stat(); the file is parsed again only when its
+mtime or size changes, so the JSON endpoints are dictionary lookups.
+"""
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .availability import ClassroomAvailability
+from .search import InstructorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def timetable_json_path():
+    """Path of the timetable JSON file, or None if there is none"""
+    # Frontend/data/timetable.json first, then the Backend directory
+    for json_path in (
+        os.path.join(settings.BASE_DIR, '../Frontend/data/timetable.json'),
+        os.path.join(settings.BASE_DIR, 'timetable.json'),
+    ):
+        if os.path.exists(json_path):
+            return json_path
+    return None
+
+
+@dataclass(frozen=True)
+class Session:
+    """One session of the timetable with where it sits in the JSON"""
+    term: str
+    section: str
+    day: str
+    key: str
+    data: dict
+
+
+@dataclass
+class TimetableSnapshot:
+    """Parsed timetable plus its indexes; never mutated once built"""
+    data: dict = field(default_factory=dict)
+    # (path, mtime_ns, size) of the file this was parsed from
+    source: Optional[Tuple[str, int, int]] = None
+    sessions: List[Session] = field(default_factory=list)
+    by_section: Dict[Tuple[str, str], dict] = field(default_factory=dict)
+    by_instructor: Dict[str, List[Session]] = field(default_factory=dict)
+    by_classroom: Dict[str, List[Session]] = field(default_factory=dict)
+    by_day: Dict[str, List[Session]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, data: dict, source=None) -> 'TimetableSnapshot':
+        snapshot = cls(data=data, source=source)
+        by_instructor, by_classroom, by_day = defaultdict(list), defaultdict(list), defaultdict(list)
+        for term, sections in data.items():
+            for section, days in sections.items():
+                snapshot.by_section[(term, section)] = days
+                for day, sessions in days.items():
+                    for key, session_data in sessions.items():
+                        session = Session(term, section, day, key, session_data)
+                        snapshot.sessions.append(session)
+                        by_day[day].append(session)
+                        if session_data.get('Instructor'):
+                            by_instructor[session_data['Instructor']].append(session)
+                        if session_data.get('Classroom'):
+                            by_classroom[session_data['Classroom']].append(session)
+        snapshot.by_instructor = dict(by_instructor)
+        snapshot.by_classroom = dict(by_classroom)
+        snapshot.by_day = dict(by_day)
+        return snapshot
+
+    @cached_property
+    def instructor_index(self) -> InstructorIndex:
+        """Name search over this snapshot's instructors (built on first use)"""
+        return InstructorIndex(self.by_instructor)
+
+    @cached_property
+    def classroom_availability(self) -> Dict[str, ClassroomAvailability]:
+        """Busy intervals per classroom and day of each term (built on first use)"""
+        by_term = defaultdict(list)
+        for session in self.sessions:
+            by_term[session.term].append(session)
+        return {term: ClassroomAvailability(by_term.get(term, ())) for term in self.data}
+
+    @property
+    def latest_term(self) -> Optional[str]:
+        """The last term of the JSON (the only one, usually), or None if it is empty"""
+        return next(reversed(self.data), None)
+
+    def term(self, term: str) -> Optional[dict]:
+        return self.data.get(term)
+
+    def section(self, term: str, section: str) -> Optional[dict]:
+        return self.by_section.get((term, section))
+
+    def instructor_schedule(self, name: str) -> dict:
+        """{"<term> - <section>": {day: {session: {...}}}} of one instructor"""
+        schedule = {}
+        for session in self.by_instructor.get(name, ()):
+            days = schedule.setdefault(f'{session.term} - {session.section}', {})
+            days.setdefault(session.day, {})[session.key] = session.data
+        return schedule
+
+
+class TimetableStore:
+    """Process-wide holder of the current TimetableSnapshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = TimetableSnapshot()
+
+    def get(self) -> TimetableSnapshot:
+        """The current snapshot, reloaded first if the file changed"""
+        source = self._stat()
+        snapshot = self._snapshot
+        if source == snapshot.source:
+            return snapshot
+        with self._lock:
+            if source != self._snapshot.source:
+                self._snapshot = self._load(source)
+            return self._snapshot
+
+    def _stat(self):
+        path = timetable_json_path()
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, source) -> TimetableSnapshot:
+        if source is None:
+            logger.warning("Timetable JSON file not found")
+            return TimetableSnapshot()
+        try:
+            with open(source[0], 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            # Keep serving the last good timetable (e.g. while the file is rewritten)
+            logger.error(f"Error loading timetable JSON: {str(e)}")
+            return self._snapshot
+        snapshot = TimetableSnapshot.build(data, source)
+        logger.info(f"Loaded timetable JSON: {len(snapshot.sessions)} sessions from {source[0]}")
+        return snapshot
+
+
+store = TimetableStore()
@@ -1,9 +1,32 @@
 """
 Timetable tests
 """
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from io import StringIO
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
+from camera.models import Room
+from core.versioning import get_version
+from .conflicts import Booking, detect, sweep
+from .loader import bulk_load, parse_sessions, sync
 from .models import Cohort, Section, Instructor, Course, TimetableEntry
+from .search import InstructorIndex, normalise
+from .store import TimetableSnapshot, TimetableStore
+from .times import day_of_week, format_clock, parse_clock, parse_interval
 
 
 class TimetableAPITests(TestCase):
@@ -35,3 +58,688 @@ class TimetableAPITests(TestCase):
             f'/api/v1/timetable/student/?cohort_id={self.cohort.id}&section_id={self.section.id}'
         )
         self.assertEqual(response.status_code, 200)
+
+    def test_sparse_fieldsets(self):
+        """Test fields and expand query parameters"""
+        response = self.client.get('/api/v1/sections/', {'fields': 'id,cohort', 'expand': 'cohort'})
+        self.assertEqual(response.status_code, 200)
+        section = response.data['results'][0]
+        self.assertEqual(set(section), {'id', 'cohort'})
+        self.assertEqual(section['cohort']['name'], 'Test Cohort 2024')
+
+    def test_conditional_get(self):
+        """Test timetable endpoints answer If-None-Match with 304"""
+        for url in ('/api/v1/cohorts/', '/api/v1/timetable/'):
+            response = self.client.get(url)
+            self.assertIn('ETag', response)
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cohort.objects.create(name='Test Cohort 2025')
+        response = self.client.get('/api/v1/cohorts/', HTTP_IF_NONE_MATCH=cached['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_prerendered_response(self):
+        """Test timetable JSON is served pre-rendered and pre-compressed"""
+        plain = self.client.get('/api/v1/timetable/')
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotIn('Content-Encoding', plain)
+
+        compressed = self.client.get('/api/v1/timetable/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('cache;desc="hit"', compressed['Server-Timing'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+
+    def test_prerendered_response_ignores_unread_params(self):
+        """Test only parameters the view reads are part of the response cache key"""
+        self.client.get('/api/v1/timetable/conflicts/', {'kind': 'classroom'})
+        response = self.client.get('/api/v1/timetable/conflicts/', {'kind': 'classroom', 'junk': 'x'})
+        self.assertIn('cache;desc="hit"', response['Server-Timing'])
+
+        response = self.client.get('/api/v1/timetable/conflicts/', {'kind': 'instructor', 'junk': 'x'})
+        self.assertIn('cache;desc="miss"', response['Server-Timing'])
+
+
+class TimetableStoreTests(TestCase):
+    """Test the in-memory timetable store"""
+
+    def setUp(self):
+        self.data = {
+            'Term_1': {
+                'Section_A': {
+                    'Monday': {
+                        'Session 1': {'Course': 'Economics', 'Instructor': 'Dieudonne, U.',
+                                      'Classroom': 'Nyanza Classroom', 'Type': 'Lecture', 'Time': '9:00-10:00'},
+                    },
+                    'Tuesday': {
+                        'Session 1': {'Course': 'Statistics', 'Instructor': 'Sam, B.',
+                                      'Classroom': 'Nyanza Classroom', 'Type': 'Lecture', 'Time': '9:00-11:00'},
+                    },
+                },
+                'Section_B': {
+                    'Monday': {
+                        'Session 2': {'Course': 'Economics', 'Instructor': 'Dieudonne, U.',
+                                      'Classroom': 'Kirehe Classroom', 'Type': 'Lecture', 'Time': '11:00-12:00'},
+                    },
+                },
+            },
+        }
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.write(self.data)
+        patcher = mock.patch('timetable.store.timetable_json_path', return_value=self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = TimetableStore()
+
+    def write(self, data):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def test_indexes(self):
+        """Test the lookups built from the JSON"""
+        snapshot = self.store.get()
+        self.assertEqual(snapshot.section('Term_1', 'Section_B'), self.data['Term_1']['Section_B'])
+        self.assertIsNone(snapshot.section('Term_1', 'Section_C'))
+        self.assertEqual(len(snapshot.by_classroom['Nyanza Classroom']), 2)
+        self.assertEqual(len(snapshot.by_day['Monday']), 2)
+        self.assertEqual(snapshot.instructor_schedule('Dieudonne, U.'), {
+            'Term_1 - Section_A': {'Monday': self.data['Term_1']['Section_A']['Monday']},
+            'Term_1 - Section_B': {'Monday': self.data['Term_1']['Section_B']['Monday']},
+        })
+
+    def test_reload_on_change(self):
+        """Test the file is parsed once and again only after it changes"""
+        with mock.patch('timetable.store.json.load', wraps=json.load) as load:
+            first = self.store.get()
+            self.assertIs(self.store.get(), first)
+            self.assertEqual(load.call_count, 1)
+
+            self.data['Term_2'] = {}
+            self.write(self.data)
+            self.assertIn('Term_2', self.store.get().data)
+            self.assertEqual(load.call_count, 2)
+
+    def test_instructor_view_resolves_misspelt_names(self):
+        """Test the instructor view falls back to the closest instructor"""
+        with mock.patch('timetable.views.store', self.store):
+            response = self.client.get('/api/v1/timetable/instructor/', {'instructor_name': 'dieudone'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Instructor-Name'], 'Dieudonne, U.')
+            self.assertEqual(set(response.json()), {'Term_1 - Section_A', 'Term_1 - Section_B'})
+
+            response = self.client.get('/api/v1/timetable/instructors/search/', {'q': 'sam'})
+            self.assertEqual(response.json(), [{'name': 'Sam, B.', 'score': 0.0, 'sessions': 1}])
+            for limit in ('0', '-3', 'many'):
+                response = self.client.get('/api/v1/timetable/instructors/search/', {'q': 'sam', 'limit': limit})
+                self.assertEqual(response.status_code, 400)
+
+    def test_keeps_last_good_timetable(self):
+        """Test a broken file does not replace the loaded timetable"""
+        self.store.get()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"Term_1": ')
+        self.assertIn('Term_1', self.store.get().data)
+
+
+class InstructorSearchTests(TestCase):
+    """Test the instructor name trie"""
+
+    def setUp(self):
+        self.index = InstructorIndex([
+            'Dieudonne, U.', 'Jean Claude, S.', 'Dr. Sam, B.', 'Samuel, K.', 'Jean Paul, M.',
+        ])
+
+    def names(self, query, **kwargs):
+        return [match.name for match in self.index.search(query, **kwargs)]
+
+    def test_normalise(self):
+        self.assertEqual(normalise('Dr. Jean-Claude, S.'), ['dr', 'jean', 'claude', 's'])
+        self.assertEqual(normalise('Élodie'), ['elodie'])
+
+    def test_exact_prefix_and_fuzzy(self):
+        """Test exact matches rank before prefixes, prefixes before typos"""
+        self.assertEqual(self.names('sam'), ['Dr. Sam, B.', 'Samuel, K.'])
+        self.assertEqual(self.names('dieudone'), ['Dieudonne, U.'])
+        # A transposition is two edits: allowed for long tokens only
+        self.assertEqual(self.names('deiudonne'), ['Dieudonne, U.'])
+        self.assertEqual(self.names('deiudonne', max_distance=1), [])
+        self.assertEqual(self.names('smu'), [])
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.names('jean'), ['Jean Claude, S.', 'Jean Paul, M.'])
+        self.assertEqual(self.names('jean cla'), ['Jean Claude, S.'])
+        self.assertEqual(self.names('jean zzz'), [])
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve('Dieudonne, U.'), ['Dieudonne, U.'])
+        self.assertEqual(self.index.resolve('jean claud'), ['Jean Claude, S.'])
+        self.assertEqual(self.index.resolve('jean'), ['Jean Claude, S.', 'Jean Paul, M.'])
+        self.assertEqual(self.index.resolve('nobody'), [])
+
+
+class TimetableFileTestCase(TestCase):
+    """Writes self.data to a temporary JSON file for load_timetable"""
+
+    def setUp(self):
+        self.data = {
+            'Term_1': {
+                'BAPM_2023_Section_A': {
+                    'Monday': {
+                        'Session 1': {'Course': 'Managerial Economics', 'Instructor': 'Dieudonne, U.',
+                                      'Classroom': 'Nyanza Classroom', 'Type': 'Lecture', 'Time': '9:00-10:00'},
+                        'Session 2': {'Course': 'Statistics', 'Instructor': 'Sam, B.',
+                                      'Classroom': 'Kirehe Classroom', 'Type': 'Lab', 'Time': '10:30-12:30'},
+                    },
+                },
+                'BAPM_2023_Section_B': {
+                    'Tuesday': {
+                        'Session 1': {'Course': 'Managerial Economics', 'Instructor': 'Dieudonne, U.',
+                                      'Classroom': 'Nyanza Classroom', 'Type': 'Lecture', 'Time': '9:00-10:00'},
+                    },
+                },
+                'Invalid': {},
+            },
+        }
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.write()
+
+    def write(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+
+    def load(self, *args):
+        output = StringIO()
+        call_command('load_timetable', '--json-file', self.path, *args, stdout=output)
+        return output.getvalue()
+
+
+class LoadTimetableTests(TimetableFileTestCase):
+    """Test load_timetable --bulk"""
+
+    def test_bulk_matches_row_by_row_load(self):
+        """Test --bulk creates the same rows as the default loader"""
+        self.load()
+        expected = sorted(TimetableEntry.objects.values_list(
+            'cohort__name', 'section__name', 'instructor__name', 'course__code', 'session', 'time_interval',
+            'type', 'classroom',
+        ))
+        TimetableEntry.objects.all().delete()
+        Cohort.objects.all().delete()
+        Instructor.objects.all().delete()
+        Course.objects.all().delete()
+
+        output = self.load('--bulk', '--batch-size', '2')
+        self.assertIn('Loaded 3 sessions', output)
+        self.assertIn('Skipping invalid section name: Invalid', output)
+        self.assertEqual(sorted(TimetableEntry.objects.values_list(
+            'cohort__name', 'section__name', 'instructor__name', 'course__code', 'session', 'time_interval',
+            'type', 'classroom',
+        )), expected)
+        self.assertEqual(Section.objects.count(), 2)
+
+    def test_bulk_is_idempotent(self):
+        """Test a second --bulk load creates nothing"""
+        self.load('--bulk')
+        with self.assertNumQueries(7):
+            output = self.load('--bulk', '--skip-conflict-check')
+        self.assertIn('0 entries', output)
+        self.assertEqual(TimetableEntry.objects.count(), 3)
+
+
+class SyncTimetableTests(TimetableFileTestCase):
+    """Test load_timetable --sync and --watch"""
+
+    def entries(self):
+        return dict(TimetableEntry.objects.values_list('id', 'classroom'))
+
+    def test_sync_applies_only_the_diff(self):
+        """Test --sync inserts, updates and deletes without touching other entries"""
+        output = self.load('--sync')
+        self.assertIn('3 created, 0 updated, 0 deleted', output)
+        before = self.entries()
+
+        section_a = self.data['Term_1']['BAPM_2023_Section_A']['Monday']
+        section_a['Session 1']['Classroom'] = 'Moved Classroom'
+        del section_a['Session 2']
+        section_a['Session 3'] = {'Course': 'Statistics', 'Instructor': 'Sam, B.',
+                                  'Classroom': 'Kirehe Classroom', 'Type': 'Lab', 'Time': '14:00-16:00'}
+        self.write()
+        output = self.load('--sync')
+        self.assertIn('1 created, 1 updated, 1 deleted (1 of 2 sections changed)', output)
+
+        after = self.entries()
+        self.assertEqual(len(after), 3)
+        moved = TimetableEntry.objects.get(section__name='A', time_interval='9:00-10:00')
+        self.assertEqual(moved.classroom, 'Moved Classroom')
+        # Updated in place and untouched entries keep their ids
+        self.assertEqual(before[moved.id], 'Nyanza Classroom')
+        section_b = TimetableEntry.objects.get(section__name='B')
+        self.assertEqual(after[section_b.id], before[section_b.id])
+
+    def test_unchanged_sync_skips_entries(self):
+        """Test a sync of an unchanged file reads no entries"""
+        self.load('--sync')
+        # Savepoint, one SELECT of the sections, release
+        with self.assertNumQueries(3):
+            output = self.load('--sync')
+        self.assertIn('0 created, 0 updated, 0 deleted (0 of 2 sections changed)', output)
+
+    def test_sync_removes_sections_left_out(self):
+        """Test entries of a section no longer in the JSON are deleted, once"""
+        self.load('--bulk')
+        del self.data['Term_1']['BAPM_2023_Section_B']
+        self.write()
+        self.assertIn('1 deleted', self.load('--sync'))
+        self.assertFalse(TimetableEntry.objects.filter(section__name='B').exists())
+        self.assertIn('(0 of 2 sections changed)', self.load('--sync'))
+
+    def test_full_sync_repairs_manual_edits(self):
+        """Test --full diffs sections whose digest did not change"""
+        self.load('--sync')
+        TimetableEntry.objects.filter(section__name='B').update(classroom='Edited')
+        self.assertIn('0 updated', self.load('--sync'))
+        self.assertIn('1 updated', self.load('--sync', '--full'))
+        self.assertEqual(TimetableEntry.objects.get(section__name='B').classroom, 'Nyanza Classroom')
+
+    def test_sync_bumps_version_only_on_change(self):
+        """Test the timetable data version changes only when entries do"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load('--sync')
+        version = get_version('timetable')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load('--sync')
+        self.assertEqual(get_version('timetable'), version)
+        self.data['Term_1']['BAPM_2023_Section_B']['Tuesday']['Session 1']['Type'] = 'Tutorial'
+        self.write()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load('--sync')
+        self.assertNotEqual(get_version('timetable'), version)
+
+    def test_sync_rejects_clear(self):
+        """Test --sync cannot be combined with --clear"""
+        with self.assertRaises(CommandError):
+            self.load('--sync', '--clear')
+
+    def test_watch_syncs_on_change(self):
+        """Test --watch syncs at start and again after the file changes"""
+        checks = []
+
+        def sleep(seconds):
+            checks.append(seconds)
+            if len(checks) == 1:
+                self.data['Term_1']['BAPM_2023_Section_B']['Tuesday']['Session 1']['Classroom'] = 'Moved'
+                self.write()
+                # Make sure the mtime moves even on coarse clocks
+                stat = os.stat(self.path)
+                os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            elif len(checks) == 3:
+                raise KeyboardInterrupt
+
+        with mock.patch('timetable.management.commands.load_timetable.time.sleep', sleep):
+            output = self.load('--watch', '--interval', '0.5')
+        self.assertEqual(output.count('Synced 3 sessions'), 2)
+        self.assertIn('Stopped watching', output)
+        self.assertEqual(checks, [0.5, 0.5, 0.5])
+        self.assertEqual(TimetableEntry.objects.get(section__name='B').classroom, 'Moved')
+
+    def test_watch_keeps_full_until_a_sync_succeeds(self):
+        """Test --watch --full still runs a full sync when the first read fails"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"Term_1": ')
+        checks = []
+
+        def sleep(seconds):
+            checks.append(seconds)
+            if len(checks) == 1:
+                self.write()
+                stat = os.stat(self.path)
+                os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            else:
+                raise KeyboardInterrupt
+
+        with mock.patch('timetable.management.commands.load_timetable.time.sleep', sleep), \
+                mock.patch('timetable.management.commands.load_timetable.sync', wraps=sync) as synced:
+            output = self.load('--watch', '--full', '--interval', '0.5')
+        self.assertIn('Synced 3 sessions', output)
+        self.assertEqual(synced.call_count, 1)
+        self.assertTrue(synced.call_args.kwargs['full'])
+
+
+class TimeColumnTests(TestCase):
+    """Test the parsed day_of_week / start_minute / end_minute columns and their filters"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cohort = Cohort.objects.create(name='BAPM_2023')
+        section = Section.objects.create(name='A', cohort=cohort)
+        instructor = Instructor.objects.create(name='Dieudonne, U.')
+        course = Course.objects.create(code='ME', name='Managerial Economics')
+        self.entries = {
+            (day, interval): TimetableEntry.objects.create(
+                cohort=cohort, section=section, instructor=instructor, course=course,
+                session=day, time_interval=interval,
+            )
+            for day, interval in [
+                ('Monday', '9:00-10:00'), ('Monday', '10:30-12:30'), ('Monday', '14:00-16:00'),
+                ('Tuesday', '14:00-15:00'), ('Tuesday', 'TBA'),
+            ]
+        }
+
+    def fetch(self, **params):
+        response = self.client.get('/api/v1/timetable/entries/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(entry['session'], entry['time_interval']) for entry in response.json()['results']]
+
+    def test_parse(self):
+        """Test weekday and interval parsing"""
+        self.assertEqual(day_of_week('Monday'), 0)
+        self.assertEqual(day_of_week('sun'), 6)
+        self.assertEqual(day_of_week('4'), 4)
+        self.assertIsNone(day_of_week('Someday'))
+        self.assertEqual(parse_interval('9:00-10:00'), (540, 600))
+        self.assertEqual(parse_interval('16:15 – 18:15'), (975, 1095))
+        self.assertEqual(parse_interval('2:00 pm to 3:30 PM'), (840, 930))
+        self.assertEqual(parse_interval('10:00-9:00'), (None, None))
+        self.assertEqual(parse_interval('TBA'), (None, None))
+
+    def test_save_fills_columns(self):
+        """Test save() fills the columns and keeps them in step with the text fields"""
+        entry = self.entries[('Monday', '10:30-12:30')]
+        self.assertEqual((entry.day_of_week, entry.start_minute, entry.end_minute), (0, 630, 750))
+        self.assertIsNone(self.entries[('Tuesday', 'TBA')].start_minute)
+
+        entry.session, entry.time_interval = 'Friday', '8:00-9:00'
+        entry.save(update_fields=['session', 'time_interval'])
+        entry.refresh_from_db()
+        self.assertEqual((entry.day_of_week, entry.start_minute, entry.end_minute), (4, 480, 540))
+
+    def test_data_migration(self):
+        """Test the data migration fills rows written without the columns"""
+        TimetableEntry.objects.update(day_of_week=None, start_minute=None, end_minute=None)
+        migration = importlib.import_module('timetable.migrations.0004_fill_entry_time_columns')
+        migration.fill_time_columns(apps, None)
+        entry = TimetableEntry.objects.get(pk=self.entries[('Tuesday', '14:00-15:00')].pk)
+        self.assertEqual((entry.day_of_week, entry.start_minute, entry.end_minute), (1, 840, 900))
+
+    def test_at_filter(self):
+        """Test ?day=&at= returns the sessions running at that time"""
+        self.assertEqual(self.fetch(day='Monday', at='11:00'), [('Monday', '10:30-12:30')])
+        self.assertEqual(self.fetch(day='monday', at='10:00'), [])
+        self.assertEqual(self.fetch(at='14:30'), [('Monday', '14:00-16:00'), ('Tuesday', '14:00-15:00')])
+
+    def test_overlap_and_range_filters(self):
+        """Test start/end overlap and the inclusive range filters"""
+        self.assertEqual(self.fetch(day='0', start='10:00', end='14:30'),
+                         [('Monday', '10:30-12:30'), ('Monday', '14:00-16:00')])
+        self.assertEqual(self.fetch(start='15:00'), [('Monday', '14:00-16:00')])
+        self.assertEqual(self.fetch(starts_after='10:00', ends_before='15:00'),
+                         [('Monday', '10:30-12:30'), ('Tuesday', '14:00-15:00')])
+
+    def test_invalid_filter_values(self):
+        """Test unparsable days and times are rejected with 400"""
+        for params in ({'day': 'Someday'}, {'at': '25:00'}, {'start': 'noon'}):
+            response = self.client.get('/api/v1/timetable/entries/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_loaders_fill_columns(self):
+        """Test bulk_load and sync fill the columns on the rows they insert"""
+        TimetableEntry.objects.all().delete()
+        rows, _ = parse_sessions({'Term_1': {'BAPM_2023_Section_B': {'Wednesday': {
+            'Session 1': {'Course': 'Statistics', 'Instructor': 'Sam, B.', 'Time': '8:00-10:00'},
+        }}}})
+        bulk_load(rows)
+        sync(rows, full=True)
+        entry = TimetableEntry.objects.get()
+        self.assertEqual((entry.day_of_week, entry.start_minute, entry.end_minute), (2, 480, 600))
+
+
+class FreeClassroomTests(TestCase):
+    """Test the classroom busy intervals and /classrooms/free/"""
+
+    def setUp(self):
+        def session(classroom, time):
+            return {'Course': 'Statistics', 'Instructor': 'Sam, B.', 'Classroom': classroom, 'Time': time}
+
+        self.snapshot = TimetableSnapshot.build({'Term_3_AY_2024': {
+            # An earlier term: its bookings must not show up in Term_1
+            'BAPM_2023_Section_A': {'Monday': {
+                'Session 1': session('Nyanza Classroom', '12:00-13:00'),
+                'Session 2': session('Huye Classroom', '12:00-13:00'),
+            }},
+        }, 'Term_1': {
+            'BAPM_2023_Section_A': {'Monday': {
+                'Session 1': session('Nyanza Classroom', '8:00-10:00'),
+                'Session 2': session('Nyanza Classroom', '14:00-16:00'),
+                'Session 3': session('Kirehe Classroom', '10:30-12:30'),
+                'Session 4': session('N/A', '8:00-9:00'),
+            }},
+            'BAPM_2023_Section_B': {'Monday': {
+                # Overlaps and touches Section A's sessions: merged into 8:00-11:00
+                'Session 1': session('Nyanza Classroom', '9:00-10:30'),
+                'Session 2': session('Nyanza Classroom', '10:30-11:00'),
+            }, 'Tuesday': {
+                'Session 1': session('Gasabo Classroom', '9:00-10:00'),
+            }},
+        }})
+        self.availability = self.snapshot.classroom_availability['Term_1']
+        patcher = mock.patch('timetable.views.store')
+        patcher.start().get.return_value = self.snapshot
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        # The store is patched, the versions of cached responses are not
+        cache.clear()
+
+    def slots(self, day, start, end):
+        return {slot.classroom: (slot.free, slot.start, slot.end)
+                for slot in self.availability.query(day, parse_clock(start), parse_clock(end))}
+
+    def test_merged_intervals(self):
+        """Test sessions are merged per classroom and day, skipping unnamed rooms"""
+        self.assertEqual(self.availability.classrooms, ['Gasabo Classroom', 'Kirehe Classroom', 'Nyanza Classroom'])
+        busy = self.availability.busy['Nyanza Classroom'][0]
+        self.assertEqual((busy.starts, busy.ends), ([480, 840], [660, 960]))
+
+    def test_query(self):
+        """Test free gaps and busy spans around the queried range"""
+        self.assertEqual(self.slots(0, '12:00', '14:00'), {
+            'Gasabo Classroom': (True, None, None),
+            'Kirehe Classroom': (False, 630, 750),
+            'Nyanza Classroom': (True, 660, 840),
+        })
+        # Ranges are half-open: ending when a session starts is free
+        self.assertEqual(self.slots(0, '12:30', '14:00')['Kirehe Classroom'], (True, 750, None))
+        self.assertEqual(self.slots(0, '7:00', '15:00')['Nyanza Classroom'], (False, 480, 960))
+        self.assertEqual(self.slots(1, '9:30', '9:45')['Gasabo Classroom'], (False, 540, 600))
+
+    def test_free_endpoint(self):
+        """Test /classrooms/free/ formats the answer and validates its parameters"""
+        response = self.client.get('/api/v1/classrooms/free/', {'day': 'mon', 'start': '12:00', 'end': '14:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['day'], 'Monday')
+        self.assertEqual(response.data['free'], [
+            {'classroom': 'Gasabo Classroom', 'free_from': None, 'free_until': None},
+            {'classroom': 'Nyanza Classroom', 'free_from': '11:00', 'free_until': '14:00'},
+        ])
+        self.assertEqual(response.data['busy'], [
+            {'classroom': 'Kirehe Classroom', 'busy_from': '10:30', 'busy_until': '12:30'},
+        ])
+        for params in ({'day': 'Monday'}, {'day': 'Someday', 'start': '9:00', 'end': '10:00'},
+                       {'day': 'Monday', 'start': '10:00', 'end': '9:00'}):
+            self.assertEqual(self.client.get('/api/v1/classrooms/free/', params).status_code, 400)
+
+        response = self.client.get('/api/v1/classrooms/')
+        self.assertEqual(response.json()[0], {'classroom': 'Gasabo Classroom', 'sessions': 1})
+        self.assertEqual(response.json()[-1], {'classroom': 'Nyanza Classroom', 'sessions': 4})
+
+    def test_terms_are_kept_apart(self):
+        """Test ?term= picks the term, defaulting to the last one of the JSON"""
+        params = {'day': 'Monday', 'start': '12:00', 'end': '12:30'}
+        response = self.client.get('/api/v1/classrooms/free/', params)
+        self.assertEqual(response.data['term'], 'Term_1')
+        self.assertIn('Nyanza Classroom', [slot['classroom'] for slot in response.data['free']])
+
+        response = self.client.get('/api/v1/classrooms/free/', dict(params, term='Term_3_AY_2024'))
+        self.assertEqual([slot['classroom'] for slot in response.data['busy']], ['Huye Classroom', 'Nyanza Classroom'])
+        self.assertEqual(response.data['free'], [])
+        response = self.client.get('/api/v1/classrooms/', {'term': 'Term_3_AY_2024'})
+        self.assertEqual([row['classroom'] for row in response.json()], ['Huye Classroom', 'Nyanza Classroom'])
+
+        self.assertEqual(self.client.get('/api/v1/classrooms/free/', dict(params, term='Term_9')).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/classrooms/', {'term': 'Term_9'}).status_code, 400)
+
+    def test_classroom_list_is_cached(self):
+        """Test the classroom list honours ?fields=, carries an ETag and is answered with 304"""
+        with mock.patch('timetable.views.timetable_json_path', return_value=__file__):
+            response = self.client.get('/api/v1/classrooms/', {'fields': 'classroom'})
+            self.assertEqual(response.json()[0], {'classroom': 'Gasabo Classroom'})
+            cached = self.client.get(
+                '/api/v1/classrooms/', {'fields': 'classroom'}, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            self.assertEqual(cached.status_code, 304)
+
+            response = self.client.get('/api/v1/classrooms/', {'fields': 'classroom', 'junk': 'x'})
+            self.assertIn('cache;desc="hit"', response['Server-Timing'])
+
+    @override_settings(CLASSROOM_EMPTY_MAX_AGE_SECONDS=300)
+    def test_scheduled_but_empty(self):
+        """Test busy classrooms whose camera sees nobody right now are reported"""
+        now = timezone.make_aware(datetime(2026, 10, 19, 11, 0))  # a Monday
+        Room.objects.create(name='kirehe classroom', camera_ip='10.0.0.2', latest_count=0, latest_count_at=now)
+        Room.objects.create(name='Nyanza Classroom', camera_ip='10.0.0.1', latest_count=0, latest_count_at=now)
+        Room.objects.create(name='Gasabo Classroom', camera_ip='10.0.0.3', latest_count=0,
+                            latest_count_at=now - timedelta(minutes=10))
+        params = {'day': 'Monday', 'start': '10:45', 'end': '11:15'}
+        with mock.patch('timetable.views.timezone.localtime', return_value=now):
+            # Nyanza is busy in the range, but its merged session ended at 11:00
+            empty = self.client.get('/api/v1/classrooms/free/', params).data['scheduled_but_empty']
+            self.assertEqual([room['classroom'] for room in empty], ['Kirehe Classroom'])
+        with mock.patch('timetable.views.timezone.localtime', return_value=now - timedelta(minutes=10)):
+            empty = self.client.get('/api/v1/classrooms/free/', params).data['scheduled_but_empty']
+            self.assertEqual([room['classroom'] for room in empty], ['Kirehe Classroom', 'Nyanza Classroom'])
+        with mock.patch('timetable.views.timezone.localtime', return_value=now):
+            params['day'] = 'Tuesday'
+            self.assertIsNone(self.client.get('/api/v1/classrooms/free/', params).data['scheduled_but_empty'])
+
+
+class ConflictTests(TestCase):
+    """Test the sweep-line conflict detector, its command and endpoint"""
+
+    def setUp(self):
+        self.cohort = Cohort.objects.create(name='BAPM_2025')
+        self.sections = {name: Section.objects.create(name=name, cohort=self.cohort) for name in 'ABCD'}
+        self.courses = {code: Course.objects.create(code=code, name=name)
+                        for code, name in [('S', 'Statistics'), ('EDT', 'Entrepreneurship and Design Thinking'),
+                                           ('FE', 'Fundamentals of Economics')]}
+        self.add('A', 'Judith, A.', 'S', 'Muhanga Classroom', '10:30-12:30')
+        # Same instructor, other room, overlapping: conflict
+        self.add('B', 'Judith, A.', 'S', 'Burera Classroom', '11:30-12:30')
+        # Joint session of three sections, co-taught: not a conflict
+        for section in 'ACD':
+            self.add(section, 'Jean De Dieu, H. / Irene, U.', 'EDT', 'Rubavu Classroom', '14:00-16:00')
+        # Co-teacher booked elsewhere at the same time: conflict for Irene only
+        self.add('B', 'Irene, U.', 'S', 'Nyanza Classroom', '15:00-16:00')
+        # Other courses in the same room, back to back then overlapping
+        self.add('B', 'Sam, B.', 'S', 'Rubavu Classroom', '16:00-17:00')
+        self.add('C', 'Aurore, U.', 'FE', 'Rubavu Classroom', '15:30-16:15')
+        # Joint session where one section stays longer: not a conflict
+        self.add('A', 'Sam, B.', 'FE', 'Kayonza Classroom', '8:00-9:00')
+        self.add('B', 'Sam, B.', 'FE', 'Kayonza Classroom', '8:00-10:00')
+        self.client = APIClient()
+        cache.clear()
+
+    def add(self, section, instructor, course, classroom, time, day='Monday'):
+        instructor, _ = Instructor.objects.get_or_create(name=instructor)
+        return TimetableEntry.objects.create(
+            cohort=self.cohort, section=self.sections[section], instructor=instructor,
+            course=self.courses[course], session=day, time_interval=time, classroom=classroom,
+        )
+
+    def summary(self, report):
+        return sorted(
+            (conflict.kind, conflict.resource, format_clock(conflict.start), format_clock(conflict.end),
+             tuple(sorted(booking.section for booking in conflict.bookings)))
+            for conflict in report.conflicts
+        )
+
+    def test_detect(self):
+        """Test overlaps are found per instructor and classroom, joint sessions excluded"""
+        report = detect()
+        self.assertEqual(report.sessions, 10)
+        self.assertEqual(self.summary(report), [
+            ('classroom', 'Rubavu Classroom', '15:30', '16:00', ('A', 'C')),
+            ('classroom', 'Rubavu Classroom', '15:30', '16:00', ('C', 'C')),
+            ('classroom', 'Rubavu Classroom', '15:30', '16:00', ('C', 'D')),
+            ('classroom', 'Rubavu Classroom', '16:00', '16:15', ('B', 'C')),
+            ('instructor', 'Irene, U.', '15:00', '16:00', ('A', 'B')),
+            ('instructor', 'Irene, U.', '15:00', '16:00', ('B', 'C')),
+            ('instructor', 'Irene, U.', '15:00', '16:00', ('B', 'D')),
+            ('instructor', 'Judith, A.', '11:30', '12:30', ('A', 'B')),
+        ])
+
+    def test_sweep_matches_pairwise(self):
+        """Test the sweep finds exactly the overlapping pairs a pairwise check finds"""
+        rng = random.Random(0)
+        bookings = [
+            Booking(index, rng.randrange(2), start, start + rng.choice([30, 60, 90]), f'I{rng.randrange(5)}',
+                    f'R{rng.randrange(5)}', f'C{index}', 'X', 'A')
+            for index, start in enumerate(rng.randrange(480, 1080, 15) for _ in range(200))
+        ]
+        expected = {
+            (a.instructor, a.id, b.id) for a in bookings for b in bookings
+            if a.id < b.id and a.instructor == b.instructor and a.day == b.day and a.start < b.end and b.start < a.end
+        }
+        found = {
+            (conflict.resource, *sorted(booking.id for booking in conflict.bookings))
+            for conflict in sweep(bookings, 'instructor', Booking.instructors)
+        }
+        self.assertEqual(found, expected)
+
+    def test_command(self):
+        """Test check_timetable_conflicts prints conflicts and fails on request"""
+        output = StringIO()
+        call_command('check_timetable_conflicts', '--kind', 'instructor', stdout=output)
+        self.assertIn('[instructor] Judith, A.: Monday 11:30-12:30', output.getvalue())
+        self.assertIn('4 conflicts in 10 sessions (4 instructor)', output.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('check_timetable_conflicts', '--fail', stdout=StringIO())
+
+    def test_endpoint_cached_per_version(self):
+        """Test /timetable/conflicts/ is computed once per timetable version"""
+        with mock.patch('timetable.conflicts.detect', wraps=detect) as wrapped:
+            response = self.client.get('/api/v1/timetable/conflicts/', {'kind': 'classroom'})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual((data['instructor_conflicts'], data['classroom_conflicts']), (4, 4))
+            self.assertEqual({conflict['kind'] for conflict in data['conflicts']}, {'classroom'})
+            self.client.get('/api/v1/timetable/conflicts/')
+            self.assertEqual(wrapped.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                TimetableEntry.objects.filter(section__name='B', instructor__name='Judith, A.').delete()
+            data = self.client.get('/api/v1/timetable/conflicts/').json()
+            self.assertEqual(data['instructor_conflicts'], 3)
+            self.assertEqual(wrapped.call_count, 2)
+
+        self.assertEqual(self.client.get('/api/v1/timetable/conflicts/', {'kind': 'room'}).status_code, 400)
+
+    def test_load_timetable_reports_conflicts(self):
+        """Test load_timetable ends with a conflict summary"""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'Term_1': {'BAPM_2025_Section_E': {'Tuesday': {
+                'Session 1': {'Course': 'Statistics', 'Instructor': 'Sam, B.', 'Time': '9:00-10:00'},
+            }}}}, f)
+        output = StringIO()
+        call_command('load_timetable', '--json-file', path, '--bulk', stdout=output)
+        self.assertIn('Conflicts: 4 instructor, 4 classroom', output.getvalue())
+        output = StringIO()
+        call_command('load_timetable', '--json-file', path, '--bulk', '--skip-conflict-check', stdout=output)
+        self.assertNotIn('Conflicts', output.getvalue())
@@ -0,0 +1,56 @@
+"""
+Timetable times
+Weekday names and "9:00-10:00" intervals as the integers stored on
+TimetableEntry (day_of_week 0 = Monday, like date.weekday(); minutes since
+midnight), so time ranges can be filtered and compared through an index.
+"""
+import re
+from typing import Optional, Tuple
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_INDEX = {day.lower(): index for index, day in enumerate(DAYS)}
+DAY_INDEX.update({day[:3].lower(): index for index, day in enumerate(DAYS)})
+
+# "9:00", "09.30", "2:15 pm", "14h00"
+CLOCK_RE = re.compile(r'^\s*(\d{1,2})(?:[:.h](\d{2}))?\s*([ap]\.?m\.?)?\s*$', re.IGNORECASE)
+# "9:00-10:00", "9:00 – 10:00", "9:00 to 10:00"
+INTERVAL_SPLIT_RE = re.compile(r'\s*(?:-|–|—|\bto\b)\s*', re.IGNORECASE)
+
+
+def day_of_week(day) -> Optional[int]:
+    """0-6 for a weekday name ("Monday", "mon") or number, else None"""
+    if isinstance(day, int) or (isinstance(day, str) and day.strip().isdigit()):
+        index = int(day)
+        return index if 0 <= index < len(DAYS) else None
+    return DAY_INDEX.get(str(day).strip().lower())
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """Minutes since midnight of "14:30" or "2:30 pm", or None"""
+    match = CLOCK_RE.match(text or '')
+    if not match:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if meridiem[0].lower() == 'p' else 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def parse_interval(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """(start, end) minutes of "9:00-10:00", or (None, None) if it does not parse or is empty"""
+    parts = INTERVAL_SPLIT_RE.split((text or '').strip())
+    if len(parts) != 2:
+        return None, None
+    start, end = parse_clock(parts[0]), parse_clock(parts[1])
+    if start is None or end is None or end <= start:
+        return None, None
+    return start, end
+
+
+def format_clock(minute: int) -> str:
+    """"14:30" for 870"""
+    return f'{minute // 60}:{minute % 60:02d}'
@@ -6,13 +6,22 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
 import logging
-import json
-import os
 
+from core.mixins import SparseFieldsetsMixin
+from core.response_cache import cache_rendered
+from core.versioning import ConditionalGetMixin, DataVersion, file_version, get_version
+from camera.models import Room
+from .availability import ClassroomAvailability
+from .conflicts import KINDS, cached_report
+from .filters import TimetableEntryFilter
 from .models import Cohort, Section, Instructor, Course, TimetableEntry
+from .store import store, timetable_json_path
+from .times import DAYS, day_of_week, format_clock, parse_clock
 from .serializers import (
     CohortSerializer, SectionSerializer, InstructorSerializer,
     CourseSerializer, TimetableEntrySerializer,
@@ -21,28 +30,16 @@ from .serializers import (
 
 logger = logging.getLogger(__name__)
 
+# Query parameters read by TimetableEntryViewSet.entries (filters, ordering, page, sparse fieldsets)
+ENTRY_PARAMS = (*TimetableEntryFilter.base_filters, 'ordering', 'page', 'fields', 'expand')
+
 
 def load_timetable_json():
-    """Load timetable data from JSON file"""
-    try:
-        # Try to load from Frontend/data/timetable.json
-        json_path = os.path.join(settings.BASE_DIR, '../Frontend/data/timetable.json')
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        # Fallback to Backend directory
-        json_path = os.path.join(settings.BASE_DIR, 'timetable.json')
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        logger.warning("Timetable JSON file not found")
-        return {}
-    except Exception as e:
-        logger.error(f"Error loading timetable JSON: {str(e)}")
-        return {}
+    """Timetable data from the JSON file (parsed once, see timetable/store.py)"""
+    return store.get().data
 
 
-class CohortViewSet(viewsets.ReadOnlyModelViewSet):
+class CohortViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Cohort ViewSet
     GET /api/v1/cohorts/ - List all cohorts
@@ -54,24 +51,26 @@ class CohortViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    data_versions = {'*': ('timetable',)}
 
 
-class SectionViewSet(viewsets.ReadOnlyModelViewSet):
+class SectionViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Section ViewSet
     GET /api/v1/sections/ - List all sections
     GET /api/v1/sections/?cohort_id={id} - Filter by cohort
     GET /api/v1/sections/{id}/ - Retrieve specific section
     """
-    queryset = Section.objects.all()
+    queryset = Section.objects.select_related('cohort')
     serializer_class = SectionSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['cohort']
     ordering_fields = ['name', 'created_at']
     ordering = ['cohort', 'name']
+    data_versions = {'*': ('timetable',)}
 
 
-class InstructorViewSet(viewsets.ReadOnlyModelViewSet):
+class InstructorViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Instructor ViewSet
     GET /api/v1/instructors/ - List all instructors
@@ -84,9 +83,10 @@ class InstructorViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name', 'email']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    data_versions = {'*': ('timetable',)}
 
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Course ViewSet
     GET /api/v1/courses/ - List all courses
@@ -99,25 +99,40 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['code', 'name']
     ordering_fields = ['code', 'name', 'created_at']
     ordering = ['code']
+    data_versions = {'*': ('timetable',)}
 
 
-class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
+class TimetableEntryViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ReadOnlyModelViewSet):
     """
     TimetableEntry ViewSet with custom actions for student and instructor views
     
     GET /api/v1/timetable/ - Get all timetable data from JSON
     GET /api/v1/timetable/by-term/ - Get timetable by term
     GET /api/v1/timetable/by-section/ - Get timetable by section (requires section parameter)
+    GET /api/v1/timetable/instructors/search/?q= - Instructor names matching a (misspelt) query
+    GET /api/v1/timetable/entries/ - Timetable entries from the database, filtered by day and time
+    GET /api/v1/timetable/conflicts/ - Double-booked instructors and classrooms
+    
+    Model-backed responses accept ?fields= and ?expand=cohort,section,instructor,course.
+    Every response carries an ETag and Last-Modified from the JSON file and
+    the timetable tables, and If-None-Match is answered with 304 Not Modified.
+    JSON responses are rendered and compressed once per timetable version
+    (see core/response_cache.py).
     """
     queryset = TimetableEntry.objects.select_related(
-        'cohort', 'section', 'instructor', 'course'
+        'cohort', 'section__cohort', 'instructor', 'course'
     )
     serializer_class = TimetableEntrySerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['cohort', 'section', 'instructor', 'course', 'session', 'type']
-    ordering_fields = ['session', 'time_interval', 'created_at']
-    ordering = ['session', 'time_interval']
+    filterset_class = TimetableEntryFilter
+    ordering_fields = ['session', 'time_interval', 'day_of_week', 'start_minute', 'end_minute', 'created_at']
+    ordering = ['day_of_week', 'start_minute', 'session', 'time_interval']
     
+    def get_data_version(self, request):
+        """Version of the JSON file combined with that of the timetable tables"""
+        return DataVersion.combine([file_version(timetable_json_path()), get_version('timetable')])
+    
+    @cache_rendered()
     def list(self, request, *args, **kwargs):
         """
         Override list to return timetable from JSON
@@ -136,6 +151,7 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
     
     @action(detail=False, methods=['get'])
+    @cache_rendered('term')
     def by_term(self, request):
         """
         Get timetable for a specific term
@@ -150,9 +166,9 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         try:
-            timetable_data = load_timetable_json()
-            if term in timetable_data:
-                return Response({term: timetable_data[term]})
+            sections = store.get().term(term)
+            if sections is not None:
+                return Response({term: sections})
             return Response(
                 {'error': f'Term "{term}" not found'},
                 status=HTTP_400_BAD_REQUEST
@@ -165,6 +181,7 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
     
     @action(detail=False, methods=['get'])
+    @cache_rendered('term', 'section')
     def by_section(self, request):
         """
         Get timetable for a specific section
@@ -180,12 +197,12 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         try:
-            timetable_data = load_timetable_json()
-            if term in timetable_data and section in timetable_data[term]:
+            days = store.get().section(term, section)
+            if days is not None:
                 return Response({
                     'term': term,
                     'section': section,
-                    'data': timetable_data[term][section]
+                    'data': days
                 })
             return Response(
                 {'error': f'Term "{term}" or section "{section}" not found'},
@@ -199,6 +216,7 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
     
     @action(detail=False, methods=['get'])
+    @cache_rendered('term', 'section', 'cohort_id', 'section_id', 'fields', 'expand')
     def student(self, request):
         """
         Student timetable view - returns section-specific timetable from JSON
@@ -221,12 +239,12 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
         try:
             # If using new parameters
             if term and section:
-                timetable_data = load_timetable_json()
-                if term in timetable_data and section in timetable_data[term]:
+                days = store.get().section(term, section)
+                if days is not None:
                     return Response({
                         'term': term,
                         'section': section,
-                        'timetable': timetable_data[term][section]
+                        'timetable': days
                     })
                 return Response(
                     {'error': f'Term "{term}" or section "{section}" not found'},
@@ -235,7 +253,7 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             # Legacy support
             else:
                 queryset = self.queryset.filter(cohort_id=cohort_id, section_id=section_id)
-                serializer = TimetableStudentViewSerializer(queryset, many=True)
+                serializer = TimetableStudentViewSerializer(queryset, many=True, **self.get_sparse_fieldsets())
                 return Response(serializer.data)
         except Exception as e:
             logger.error(f"Error in student timetable view: {str(e)}")
@@ -245,12 +263,76 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             )
     
     @action(detail=False, methods=['get'])
+    @cache_rendered(*ENTRY_PARAMS)
+    def entries(self, request):
+        """
+        Timetable entries from the database, paginated
+        Example: GET /api/v1/timetable/entries/?day=Monday&start=14:00&end=15:00
+        
+        Filters (see timetable/filters.py): day, at, start/end (overlap),
+        starts_after/starts_before/ends_after/ends_before, plus cohort,
+        section, instructor, course, session, type and classroom. For "what
+        is on now", pass the current day and time: ?day=Tuesday&at=14:30
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(queryset, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    @cache_rendered('kind')
+    def conflicts(self, request):
+        """
+        Instructors and classrooms booked for overlapping sessions
+        Example: GET /api/v1/timetable/conflicts/?kind=instructor
+        
+        Computed from the timetable entries once per timetable version
+        (see timetable/conflicts.py); kind is instructor or classroom.
+        """
+        kind = request.query_params.get('kind')
+        if kind is not None and kind not in KINDS:
+            return Response(
+                {'error': f'kind must be one of: {", ".join(KINDS)}'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        return Response(cached_report().as_dict(kind))
+    
+    @action(detail=False, methods=['get'], url_path='instructors/search')
+    @cache_rendered('q', 'limit')
+    def instructor_search(self, request):
+        """
+        Instructors of the timetable JSON matching a name, best first
+        Example: GET /api/v1/timetable/instructors/search/?q=dieudone&limit=5
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be at least 1'}, status=HTTP_400_BAD_REQUEST)
+        limit = min(limit, 100)
+        
+        snapshot = store.get()
+        return Response([
+            {'name': match.name, 'score': match.score, 'sessions': len(snapshot.by_instructor[match.name])}
+            for match in snapshot.instructor_index.search(query, limit=limit)
+        ])
+    
+    @action(detail=False, methods=['get'])
+    @cache_rendered('instructor_id', 'instructor_name', 'fields', 'expand')
     def instructor(self, request):
         """
         Instructor timetable view
         Required: instructor_id (legacy) or instructor_name
         
         Example: GET /api/v1/timetable/instructor/?instructor_name=Dieudonne, U.
+        
+        instructor_name may be misspelt or partial ("dieudone", "sam b"); the
+        closest instructor is used (see timetable/search.py), and the name it
+        resolved to is returned in the X-Instructor-Name header.
         """
         instructor_id = request.query_params.get('instructor_id')
         instructor_name = request.query_params.get('instructor_name')
@@ -264,24 +346,19 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
         try:
             # If using instructor_name, search in JSON
             if instructor_name:
-                timetable_data = load_timetable_json()
-                instructor_schedule = {}
-                
-                # Search through all terms and sections
-                for term, sections in timetable_data.items():
-                    for section, days in sections.items():
-                        for day, sessions in days.items():
-                            for session_key, session_data in sessions.items():
-                                if session_data.get('Instructor') == instructor_name:
-                                    key = f"{term} - {section}"
-                                    if key not in instructor_schedule:
-                                        instructor_schedule[key] = {}
-                                    if day not in instructor_schedule[key]:
-                                        instructor_schedule[key][day] = {}
-                                    instructor_schedule[key][day][session_key] = session_data
+                snapshot = store.get()
+                names = snapshot.instructor_index.resolve(instructor_name)
+                if len(names) > 1:
+                    return Response(
+                        {'error': f'Instructor name "{instructor_name}" is ambiguous', 'matches': names},
+                        status=HTTP_400_BAD_REQUEST
+                    )
                 
+                instructor_schedule = snapshot.instructor_schedule(names[0]) if names else {}
                 if instructor_schedule:
-                    return Response(instructor_schedule)
+                    response = Response(instructor_schedule)
+                    response['X-Instructor-Name'] = names[0]
+                    return response
                 return Response(
                     {'error': f'No schedule found for instructor "{instructor_name}"'},
                     status=HTTP_400_BAD_REQUEST
@@ -289,7 +366,7 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
             # Legacy support for instructor_id
             else:
                 queryset = self.queryset.filter(instructor_id=instructor_id)
-                serializer = TimetableInstructorViewSerializer(queryset, many=True)
+                serializer = TimetableInstructorViewSerializer(queryset, many=True, **self.get_sparse_fieldsets())
                 return Response(serializer.data)
         except Exception as e:
             logger.error(f"Error in instructor timetable view: {str(e)}")
@@ -297,3 +374,133 @@ class TimetableEntryViewSet(viewsets.ReadOnlyModelViewSet):
                 {'error': 'Failed to retrieve assignments'},
                 status=HTTP_400_BAD_REQUEST
             )
+
+
+class ClassroomViewSet(ConditionalGetMixin, SparseFieldsetsMixin, viewsets.ViewSet):
+    """
+    Classrooms of the timetable JSON and when they are free
+    
+    GET /api/v1/classrooms/?term= - Classroom names with their number of sessions
+    GET /api/v1/classrooms/free/?day=&start=&end=&term= - Free and busy classrooms over a time range
+    
+    Answers come from per-classroom busy intervals built once per term and
+    timetable version (see timetable/availability.py) plus one query of the
+    rooms' live counts. term defaults to the last term of the JSON, which is
+    the only one in a single-term file.
+    
+    Responses carry an ETag from the JSON file and the timetable tables (and
+    the rooms, whose live counts free reports); the list is rendered once per
+    version (see core/response_cache.py).
+    """
+    data_versions = {'*': ('timetable',), 'free': ('timetable', 'rooms')}
+    
+    def get_data_version(self, request):
+        """Version of the JSON file combined with that of the action's resources"""
+        return DataVersion.combine([file_version(timetable_json_path()), super().get_data_version(request)])
+    
+    def get_availability(self, request):
+        """(term, ClassroomAvailability) of ?term=, or None for an unknown term"""
+        snapshot = store.get()
+        term = request.query_params.get('term') or snapshot.latest_term
+        if term is None:
+            # No timetable loaded: every classroom list is empty
+            return None, ClassroomAvailability(())
+        return term, snapshot.classroom_availability.get(term)
+    
+    @cache_rendered('term', 'fields')
+    def list(self, request):
+        """
+        Classrooms of a term, in name order, with their number of sessions
+        Example: GET /api/v1/classrooms/?term=Term_1_AY_2025/2026_Timetable&fields=classroom
+        """
+        term, availability = self.get_availability(request)
+        if availability is None:
+            return Response({'error': f'Term "{term}" not found'}, status=HTTP_400_BAD_REQUEST)
+        fields = self.get_sparse_fieldsets().get('fields')
+        rows = [
+            {'classroom': classroom, 'sessions': availability.session_counts[classroom]}
+            for classroom in availability.classrooms
+        ]
+        if fields:
+            rows = [{key: value for key, value in row.items() if key in fields} for row in rows]
+        return Response(rows)
+    
+    @action(detail=False, methods=['get'])
+    def free(self, request):
+        """
+        Example: GET /api/v1/classrooms/free/?day=Monday&start=14:00&end=15:00&term=Term_1_AY_2025/2026_Timetable
+        
+        day is a name or 0-6, start and end are HH:MM, term is optional. Free classrooms come
+        with the gap they are free in (free_from/free_until, null at either end
+        of the day), busy ones with the span of their overlapping sessions.
+        When the range contains the current time, scheduled_but_empty lists the
+        classrooms with a session on right now whose camera reports nobody in
+        the room (count newer than CLASSROOM_EMPTY_MAX_AGE_SECONDS); otherwise
+        it is null. The current time is read in TIME_ZONE, which must be the
+        campus time zone of the timetable.
+        """
+        params = request.query_params
+        if not params.get('day') or not params.get('start') or not params.get('end'):
+            return Response(
+                {'error': 'day, start and end parameters are required'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        day, start, end = day_of_week(params['day']), parse_clock(params['start']), parse_clock(params['end'])
+        if day is None:
+            return Response({'error': f'Invalid day "{params["day"]}"'}, status=HTTP_400_BAD_REQUEST)
+        if start is None or end is None or end <= start:
+            return Response(
+                {'error': 'start and end must be HH:MM times with start before end'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        
+        term, availability = self.get_availability(request)
+        if availability is None:
+            return Response({'error': f'Term "{term}" not found'}, status=HTTP_400_BAD_REQUEST)
+        slots = availability.query(day, start, end)
+        free = [slot for slot in slots if slot.free]
+        busy = [slot for slot in slots if not slot.free]
+        
+        scheduled_but_empty = None
+        # Timetable clock times are campus local time, i.e. settings.TIME_ZONE
+        now = timezone.localtime()
+        now_minute = now.hour * 60 + now.minute
+        if now.weekday() == day and start <= now_minute < end:
+            rooms = {
+                room.name.lower(): room
+                for room in Room.objects.filter(
+                    is_active=True,
+                    latest_count=0,
+                    latest_count_at__gte=now - timedelta(seconds=settings.CLASSROOM_EMPTY_MAX_AGE_SECONDS),
+                )
+            }
+            scheduled_but_empty = []
+            for slot in busy:
+                room = rooms.get(slot.classroom.lower())
+                # Busy somewhere in the range is not enough: a session must be on now
+                if room is not None and not availability.slot(slot.classroom, day, now_minute, now_minute + 1).free:
+                    scheduled_but_empty.append({
+                        'classroom': slot.classroom,
+                        'room_id': room.id,
+                        'latest_count': room.latest_count,
+                        'latest_count_at': room.latest_count_at,
+                    })
+        
+        def clock(minute):
+            return None if minute is None else format_clock(minute)
+        
+        return Response({
+            'term': term,
+            'day': DAYS[day],
+            'start': format_clock(start),
+            'end': format_clock(end),
+            'free': [
+                {'classroom': slot.classroom, 'free_from': clock(slot.start), 'free_until': clock(slot.end)}
+                for slot in free
+            ],
+            'busy': [
+                {'classroom': slot.classroom, 'busy_from': clock(slot.start), 'busy_until': clock(slot.end)}
+                for slot in busy
+            ],
+            'scheduled_but_empty': scheduled_but_empty,
+        })
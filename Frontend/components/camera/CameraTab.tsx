@@ -25,7 +25,7 @@ const CameraTab: React.FC = () => {
     setIsLoading(true);
     setError("");
     try {
-      const data = await cameraApi.getRooms();
+      const { rooms: data } = await cameraApi.getRoomsSummary();
       setRooms(data || []);
       if (data && data.length > 0 && !selectedRoomId) {
         setSelectedRoomId(data[0].id);
@@ -1,4 +1,4 @@
-import { Room, CameraCount } from "../types/timetable";
+import { Room, RoomsSummary, CameraCount } from "../types/timetable";
 
 /**
  * Core API utility designed for seamless integration with Django REST Framework.
@@ -72,6 +72,12 @@ export const cameraApi = {
       method: "GET",
     }),
 
+  // Every room with its latest count and a sparkline, in one request
+  getRoomsSummary: (window = "1h", points = 60) =>
+    request<RoomsSummary>(`/rooms/summary/?window=${window}&points=${points}`, {
+      method: "GET",
+    }),
+
   getRoom: (roomId: string | number) =>
     request<Room>(`/rooms/${roomId}/`, {
       method: "GET",
@@ -42,6 +42,20 @@ export interface Room {
   created_at?: string;
 }
 
+// One room of the dashboard summary, with its recent average counts
+export interface RoomSummary extends Room {
+  latest_count_timestamp: string | null;
+  sparkline: (number | null)[];
+}
+
+export interface RoomsSummary {
+  start: string;
+  end: string;
+  bucket_seconds: number;
+  points: number;
+  rooms: RoomSummary[];
+}
+
 export interface CameraCount {
   id?: string;
   room_id?: string;